@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 from app.db.database import get_supabase_client
 from app.schemas.user import User
 from app.core.config import settings
+from app.core.identity_cache import identity_cache, identity_resolutions
+from starlette.concurrency import run_in_threadpool
 
 # Alias para mantener compatibilidad
 get_supabase = get_supabase_client
@@ -30,10 +32,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # Variable para modo de desarrollo (permitir acceso sin autenticación)
 DEV_MODE = os.environ.get("DEV_MODE", "false").lower() == "true"
 
-# Cache de usuarios para reducir consultas
-USER_CACHE = {}
-# Tiempo máximo de caché en segundos (5 minutos)
-USER_CACHE_TTL = 300
+# Verificación local del JWT (evita llamar a supabase.auth.get_user en cada petición).
+# La revalidación remota ocurre cada AUTH_REMOTE_REVALIDATION_SECONDS por token.
+LOCAL_JWT_VERIFICATION = settings.AUTH_LOCAL_JWT_VERIFICATION
 
 @lru_cache(maxsize=1)
 def get_db():
@@ -68,31 +69,6 @@ def create_dev_user() -> User:
         updated_at=None
     )
 
-def get_user_from_cache(token: str) -> Optional[User]:
-    """
-    Intenta obtener un usuario del caché
-    """
-    if token in USER_CACHE:
-        user_data, timestamp = USER_CACHE[token]
-        # Verificar si el caché ha expirado
-        if (datetime.now() - timestamp).total_seconds() < USER_CACHE_TTL:
-            return user_data
-        else:
-            # Eliminar entrada caducada
-            del USER_CACHE[token]
-    return None
-
-def add_user_to_cache(token: str, user: User) -> None:
-    """
-    Añade un usuario al caché
-    """
-    USER_CACHE[token] = (user, datetime.now())
-    # Limitar tamaño del caché (máximo 1000 usuarios)
-    if len(USER_CACHE) > 1000:
-        # Eliminar la entrada más antigua
-        oldest_token = min(USER_CACHE, key=lambda k: USER_CACHE[k][1])
-        del USER_CACHE[oldest_token]
-
 def verify_token(token: str) -> Optional[User]:
     """
     Verifica un token JWT y devuelve un usuario
@@ -119,6 +95,129 @@ def verify_token(token: str) -> Optional[User]:
     except jwt.PyJWTError:
         return None
 
+def decode_supabase_token(token: str) -> Dict[str, Any]:
+    """
+    Verifica localmente la firma y expiración de un JWT de Supabase
+    y devuelve sus claims. Lanza jwt.PyJWTError si el token no es válido.
+    """
+    return jwt.decode(
+        token,
+        JWT_SECRET,
+        algorithms=[ALGORITHM],
+        options={"verify_aud": False, "require": ["exp", "sub"]}
+    )
+
+def get_profile(supabase, user_id: str, user_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Obtiene el perfil del usuario, usando la caché compartida de perfiles si está vigente
+    """
+    profile = identity_cache.get_profile(user_id)
+    if profile is not None:
+        return profile
+
+    profile_response = supabase.table("profiles").select("*").eq("id", user_id).execute()
+
+    if not profile_response.data:
+        logger.warning(f"No profile found for user {user_id}, creating basic profile")
+        # No se cachea para volver a buscarlo cuando se cree el perfil
+        return {
+            "full_name": (user_metadata or {}).get("full_name", ""),
+            "avatar_url": "",
+            "email_notifications": True,
+            "subscription_tier": "free",
+        }
+
+    profile = profile_response.data[0]
+    identity_cache.set_profile(user_id, profile)
+    return profile
+
+def build_user(user_id: str, email: Optional[str], profile: Dict[str, Any], created_at: Any = None) -> User:
+    """
+    Construye el objeto User a partir de la identidad y el perfil
+    """
+    return User(
+        id=user_id,
+        email=email or "",
+        full_name=profile.get("full_name"),
+        avatar_url=profile.get("avatar_url"),
+        email_notifications=profile.get("email_notifications", True),
+        subscription_tier=profile.get("subscription_tier", "free"),
+        created_at=created_at or profile.get("created_at"),
+        updated_at=profile.get("updated_at")
+    )
+
+def resolve_user_remote(supabase, token: str) -> User:
+    """
+    Valida el token contra Supabase Auth y construye el usuario
+    """
+    user_response = supabase.auth.get_user(token)
+    user = user_response.user
+
+    if not user:
+        logger.error("No user found in Supabase response")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    identity_cache.mark_revalidated(token)
+    profile = get_profile(supabase, user.id, user.user_metadata)
+    return build_user(user.id, user.email, profile, user.created_at)
+
+def resolve_user_local(supabase, token: str, claims: Dict[str, Any]) -> User:
+    """
+    Construye el usuario a partir de los claims del JWT ya verificado.
+    Solo consulta Supabase Auth si venció el intervalo de revalidación.
+    """
+    if not identity_cache.is_revalidated(token):
+        return resolve_user_remote(supabase, token)
+
+    user_id = claims["sub"]
+    profile = get_profile(supabase, user_id, claims.get("user_metadata"))
+    return build_user(user_id, claims.get("email"), profile)
+
+def verify_token_locally(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verifica el token con SUPABASE_JWT_SECRET usando la caché de claims.
+    Devuelve None si la firma no se puede verificar localmente.
+    """
+    claims = identity_cache.get_claims(token)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = decode_supabase_token(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except jwt.PyJWTError as e:
+        # Si la firma no coincide (p. ej. secreto rotado), Supabase decide
+        logger.warning(f"Local token verification failed, falling back to Supabase: {str(e)}")
+        return None
+
+    identity_cache.set_claims(token, claims)
+    return claims
+
+def resolve_user(token: str) -> User:
+    """
+    Resuelve el usuario de un token no cacheado y lo guarda en identity_cache
+    """
+    supabase = get_supabase_client()
+    claims = verify_token_locally(token) if LOCAL_JWT_VERIFICATION else None
+
+    if claims:
+        user = resolve_user_local(supabase, token, claims)
+    else:
+        # Usar el cliente de Supabase para verificar el token
+        user = resolve_user_remote(supabase, token)
+
+    identity_cache.set_user(token, user)
+    return user
+
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     authorization: Optional[str] = None
@@ -144,43 +243,16 @@ async def get_current_user(
         )
     
     try:
-        # Usar el cliente de Supabase para verificar el token
-        supabase = get_supabase_client()
-        user_response = supabase.auth.get_user(token)
-        user = user_response.user
-        
-        if not user:
-            logger.error("No user found in Supabase response")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token inválido o expirado",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Obtener datos del perfil
-        profile_response = supabase.table("profiles").select("*").eq("id", user.id).execute()
-        
-        if not profile_response.data:
-            logger.warning(f"No profile found for user {user.id}, creating basic profile")
-            profile = {
-                "full_name": user.user_metadata.get("full_name", ""),
-                "avatar_url": "",
-                "email_notifications": True,
-                "subscription_tier": "free",
-            }
-        else:
-            profile = profile_response.data[0]
-        
-        # Crear objeto de usuario
-        return User(
-            id=user.id,
-            email=user.email,
-            full_name=profile.get("full_name"),
-            avatar_url=profile.get("avatar_url"),
-            email_notifications=profile.get("email_notifications", True),
-            subscription_tier=profile.get("subscription_tier", "free"),
-            created_at=user.created_at,
-            updated_at=profile.get("updated_at")
+        # Token ya resuelto y revalidado dentro del intervalo
+        cached_user = identity_cache.get_user(token)
+        if cached_user is not None:
+            return cached_user
+
+        # Peticiones concurrentes con el mismo token comparten una sola resolución,
+        # que se ejecuta fuera del event loop porque el cliente de Supabase es síncrono
+        return await identity_resolutions.do(
+            ("deps", token),
+            lambda: run_in_threadpool(resolve_user, token)
         )
     except Exception as e:
         logger.error(f"Error validating token: {str(e)}")
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from typing import List, Dict, Any, Optional
 from uuid import uuid4
 from datetime import datetime
+import logging
 
 from app.api.deps import get_current_user
 from app.schemas.ai import MessageRole, ChatMessage as AIChatMessage, ChatResponse as AIChatResponse
-from app.utils.logger import logger
-from app.utils.supabase_client import supabase_client
+from app.db.async_client import get_async_service_client
+from app.utils.pagination import apply_keyset, finish_page, page_limit
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -56,7 +59,7 @@ async def get_conversations(
             )
 
         # Obtener conversaciones desde Supabase
-        result = supabase_client.table('conversations')\
+        result = await get_async_service_client().table('conversations')\
             .select('*')\
             .eq('user_id', user_id)\
             .order('updated_at', desc=True)\
@@ -78,11 +81,17 @@ async def get_conversations(
 @router.get("/conversations/{conversation_id}", response_model=List[Dict[str, Any]])
 async def get_conversation_messages(
     conversation_id: str,
+    http_response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
     current_user=Depends(get_current_user)
 ):
     """
-    Obtiene los mensajes de una conversación específica.
+    Obtiene los mensajes de una conversación específica, del más antiguo al más
+    reciente. Con `limit` o `cursor` devuelve una página y el cursor de la
+    siguiente en la cabecera X-Next-Cursor.
     """
+    limit = page_limit(limit, cursor)
     try:
         if not current_user:
             raise HTTPException(
@@ -97,8 +106,10 @@ async def get_conversation_messages(
                 detail="ID de usuario no encontrado en el token"
             )
 
+        supabase_client = get_async_service_client()
+        
         # Verificar que la conversación pertenece al usuario
-        conversation = supabase_client.table('conversations')\
+        conversation = await supabase_client.table('conversations')\
             .select('*')\
             .eq('id', conversation_id)\
             .eq('user_id', user_id)\
@@ -112,14 +123,21 @@ async def get_conversation_messages(
             )
 
         # Obtener mensajes de la conversación
-        messages = supabase_client.table('messages')\
+        query = supabase_client.table('messages')\
             .select('*')\
-            .eq('conversation_id', conversation_id)\
-            .order('created_at')\
-            .execute()
+            .eq('conversation_id', conversation_id)
+
+        if limit is None:
+            query = query.order('created_at')
+        else:
+            query = apply_keyset(query, 'created_at', False, cursor, limit)
+
+        messages = await query.execute()
 
-        return messages.data or []
+        return finish_page(messages.data or [], 'created_at', limit, http_response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al obtener mensajes: {str(e)}")
         raise HTTPException(
@@ -171,7 +189,7 @@ async def create_conversation(current_user = Depends(get_current_user)):
         logger.info(f"Intentando crear conversación con datos: {data}")
         
         # Crear la conversación
-        result = supabase_client.table('conversations').insert(data).execute()
+        result = await get_async_service_client().table('conversations').insert(data).execute()
         
         if not result.data:
             raise HTTPException(
@@ -1,47 +1,190 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Any, List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, List, Optional
+from datetime import date, datetime
+import csv
+import io
+import json
+import logging
 import uuid
 
 from app.services.auth import get_current_user
 from app.schemas.user import User
-from app.schemas.finance import Transaction, TransactionCreate, TransactionUpdate, FinancialGoal, FinancialGoalCreate, FinancialGoalUpdate
-from app.db.database import get_supabase_client
+from app.schemas.finance import Transaction, TransactionCreate, TransactionUpdate, FinancialGoal, FinancialGoalCreate, FinancialGoalUpdate, ExportFormat, ImportFormat, TransactionImportReport, FinanceSummary
+from app.db.database import get_supabase_client, run_query, update_owned
+from app.db import pg_pool
+from app.core.resource_versions import conditional_get, resource_versions
+from app.services.finance_summary import finance_summaries
+from app.services.transaction_import import TransactionImporter
+from app.utils.pagination import apply_keyset, cursor_params, encode_cursor, finish_page, keyset_sql, page_limit
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Filas por lectura al exportar: la memoria usada no depende del total
+EXPORT_PAGE_SIZE = 1000
+
+# Meses máximos por resumen
+SUMMARY_MAX_MONTHS = 120
+
+EXPORT_COLUMNS = (
+    "id", "date", "type", "category", "amount", "description",
+    "payment_method", "created_at", "updated_at"
+)
+
+async def _fetch_transactions(
+    user_id: str,
+    transaction_type: Optional[str],
+    cursor: Optional[str],
+    limit: Optional[int]
+) -> List[dict]:
+    """
+    Transacciones del usuario por (date, id) descendente a partir del cursor.
+    Con `limit` lee una fila de más para saber si hay página siguiente.
+    """
+    if pg_pool.pg_pool_available():
+        cursor_date, cursor_id = cursor_params(cursor)
+        return await pg_pool.fetch(
+            "SELECT * FROM transactions"
+            " WHERE user_id = $1 AND is_deleted = false AND ($2::text IS NULL OR type = $2)"
+            f" AND {keyset_sql('date', True, 3, 'timestamptz')}"
+            " ORDER BY date DESC, id DESC LIMIT $5",
+            user_id,
+            transaction_type,
+            cursor_date,
+            cursor_id,
+            None if limit is None else limit + 1,
+        )
+    
+    supabase = get_supabase_client()
+    query = supabase.table("transactions") \
+        .select("*") \
+        .eq("user_id", user_id) \
+        .eq("is_deleted", False)
+    
+    if transaction_type:
+        query = query.eq("type", transaction_type)
+    
+    if limit is not None:
+        query = apply_keyset(query, "date", True, cursor, limit)
+    
+    response = await run_query(query)
+    return response.data
+
 # Endpoints para transacciones
 @router.get("/transactions/", response_model=List[Transaction])
 async def read_transactions(
+    request: Request,
+    http_response: Response,
     transaction_type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Obtiene todas las transacciones del usuario actual
+    Obtiene las transacciones del usuario actual, de la más reciente a la más
+    antigua. Con `limit` o `cursor` devuelve una página y el cursor de la
+    siguiente en la cabecera X-Next-Cursor.
     """
-    supabase = get_supabase_client()
+    not_modified = conditional_get(request, http_response, current_user.id, "transactions")
+    if not_modified is not None:
+        return not_modified
+    
+    limit = page_limit(limit, cursor)
+    # Un cursor mal formado es un 400, no un error de la consulta
+    cursor_params(cursor)
     
     try:
-        query = supabase.table("transactions") \
-            .select("*") \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False)
-        
-        if transaction_type:
-            query = query.eq("type", transaction_type)
+        transactions = await _fetch_transactions(current_user.id, transaction_type, cursor, limit)
         
-        response = query.execute()
-        
-        if not response.data:
+        if not transactions:
             return []
         
-        return [Transaction(**transaction) for transaction in response.data]
+        transactions = finish_page(transactions, "date", limit, http_response)
+        return [Transaction(**transaction) for transaction in transactions]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener transacciones: {str(e)}"
         )
 
+def _csv_safe(value: Any) -> Any:
+    # Evita que las hojas de cálculo interpreten textos como fórmulas
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+def _export_chunk(rows: List[dict], export_format: ExportFormat) -> str:
+    if export_format == ExportFormat.ndjson:
+        return "".join(
+            json.dumps({column: row.get(column) for column in EXPORT_COLUMNS}, default=str, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            row.get(column) if column in ("amount", "date", "created_at", "updated_at") else _csv_safe(row.get(column))
+            for column in EXPORT_COLUMNS
+        ])
+    return buffer.getvalue()
+
+async def _export_transactions(
+    user_id: str,
+    transaction_type: Optional[str],
+    export_format: ExportFormat,
+    first_page: List[dict]
+) -> AsyncIterator[str]:
+    """
+    Genera la exportación página a página; solo hay una página en memoria
+    """
+    if export_format == ExportFormat.csv:
+        yield ",".join(EXPORT_COLUMNS) + "\r\n"
+    
+    rows = first_page
+    exported = 0
+    try:
+        while rows:
+            page = rows[:EXPORT_PAGE_SIZE]
+            yield _export_chunk(page, export_format)
+            exported += len(page)
+            if len(rows) <= EXPORT_PAGE_SIZE:
+                break
+            cursor = encode_cursor([page[-1]["date"], str(page[-1]["id"])])
+            rows = await _fetch_transactions(user_id, transaction_type, cursor, EXPORT_PAGE_SIZE)
+    except Exception as e:
+        # La respuesta ya ha empezado: solo se puede cortar el flujo
+        logger.error(f"Exportación de transacciones interrumpida tras {exported} filas: {str(e)}")
+        raise
+
+@router.get("/transactions/export")
+async def export_transactions(
+    export_format: ExportFormat = Query(ExportFormat.csv, alias="format"),
+    transaction_type: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Exporta todas las transacciones del usuario en CSV o NDJSON, leyéndolas por
+    páginas y enviándolas a medida que se leen
+    """
+    try:
+        # La primera página se lee antes de responder para poder devolver un error HTTP
+        first_page = await _fetch_transactions(current_user.id, transaction_type, None, EXPORT_PAGE_SIZE)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al exportar transacciones: {str(e)}"
+        )
+    
+    media_type = "text/csv" if export_format == ExportFormat.csv else "application/x-ndjson"
+    filename = f"transacciones-{date.today().isoformat()}.{export_format.value}"
+    return StreamingResponse(
+        _export_transactions(current_user.id, transaction_type, export_format, first_page),
+        media_type=f"{media_type}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.post("/transactions/", response_model=Transaction)
 async def create_transaction(
     transaction_in: TransactionCreate,
@@ -67,7 +210,7 @@ async def create_transaction(
             "is_deleted": False
         }
         
-        response = supabase.table("transactions").insert(transaction_db).execute()
+        response = await run_query(supabase.table("transactions").insert(transaction_db))
         
         if not response.data:
             raise HTTPException(
@@ -75,6 +218,7 @@ async def create_transaction(
                 detail="Error al crear la transacción"
             )
         
+        resource_versions.bump(current_user.id, "transactions")
         return Transaction(**response.data[0])
     except Exception as e:
         raise HTTPException(
@@ -82,6 +226,41 @@ async def create_transaction(
             detail=f"Error al crear la transacción: {str(e)}"
         )
 
+@router.post("/transactions/import", response_model=TransactionImportReport)
+async def import_transactions(
+    file: UploadFile = File(...),
+    import_format: Optional[ImportFormat] = Query(None, alias="format"),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Importa un extracto bancario CSV u OFX por bloques y devuelve un informe con
+    las filas importadas, duplicadas y rechazadas. Si no se indica `format` se
+    deduce de la extensión del fichero.
+    """
+    if import_format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        import_format = ImportFormat.ofx if extension in ("ofx", "qfx") else ImportFormat.csv
+    
+    try:
+        report = await TransactionImporter(current_user.id).run(import_format, file.file)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Fichero no válido: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"Error al importar transacciones: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al importar transacciones: {str(e)}"
+        )
+    finally:
+        await file.close()
+    
+    if report.imported:
+        resource_versions.bump(current_user.id, "transactions")
+    return report
+
 @router.get("/transactions/{transaction_id}", response_model=Transaction)
 async def read_transaction(
     transaction_id: str,
@@ -93,12 +272,13 @@ async def read_transaction(
     supabase = get_supabase_client()
     
     try:
-        response = supabase.table("transactions") \
-            .select("*") \
-            .eq("id", transaction_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
+        response = await run_query(
+            supabase.table("transactions")
+            .select("*")
+            .eq("id", transaction_id)
+            .eq("user_id", current_user.id)
+            .eq("is_deleted", False)
+        )
         
         if not response.data:
             raise HTTPException(
@@ -127,37 +307,16 @@ async def update_transaction(
     supabase = get_supabase_client()
     
     try:
-        # Verificar que la transacción existe y pertenece al usuario
-        get_response = supabase.table("transactions") \
-            .select("*") \
-            .eq("id", transaction_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
-        
-        if not get_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Transacción no encontrada"
-            )
-        
-        # Actualizar la transacción
         transaction_data = transaction_in.dict(exclude_unset=True)
         transaction_data["updated_at"] = datetime.utcnow().isoformat()
         
-        update_response = supabase.table("transactions") \
-            .update(transaction_data) \
-            .eq("id", transaction_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
-        
-        if not update_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al actualizar la transacción"
-            )
+        transaction = await update_owned(
+            supabase, "transactions", transaction_id, current_user.id, transaction_data,
+            "Transacción no encontrada", is_deleted=False
+        )
         
-        return Transaction(**update_response.data[0])
+        resource_versions.bump(current_user.id, "transactions")
+        return Transaction(**transaction)
     except HTTPException:
         raise
     except Exception as e:
@@ -177,39 +336,19 @@ async def delete_transaction(
     supabase = get_supabase_client()
     
     try:
-        # Verificar que la transacción existe y pertenece al usuario
-        get_response = supabase.table("transactions") \
-            .select("*") \
-            .eq("id", transaction_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
-        
-        if not get_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Transacción no encontrada"
-            )
-        
-        # Realizar soft delete de la transacción
+        # Soft delete: solo si sigue sin borrar
         delete_data = {
             "is_deleted": True,
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        delete_response = supabase.table("transactions") \
-            .update(delete_data) \
-            .eq("id", transaction_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
-        
-        if not delete_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al eliminar la transacción"
-            )
+        transaction = await update_owned(
+            supabase, "transactions", transaction_id, current_user.id, delete_data,
+            "Transacción no encontrada", is_deleted=False
+        )
         
-        return Transaction(**delete_response.data[0])
+        resource_versions.bump(current_user.id, "transactions")
+        return Transaction(**transaction)
     except HTTPException:
         raise
     except Exception as e:
@@ -218,6 +357,45 @@ async def delete_transaction(
             detail=f"Error al eliminar la transacción: {str(e)}"
         )
 
+@router.get("/summary", response_model=FinanceSummary)
+async def read_finance_summary(
+    request: Request,
+    http_response: Response,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Totales mensuales de ingresos y gastos, desglose por categoría y saldo
+    acumulado entre dos fechas (por defecto, los últimos 12 meses)
+    """
+    to_date = to_date or date.today()
+    if from_date is None:
+        months_back = to_date.year * 12 + to_date.month - 1 - 11
+        from_date = date(months_back // 12, months_back % 12 + 1, 1)
+    
+    months = (to_date.year - from_date.year) * 12 + to_date.month - from_date.month + 1
+    if from_date > to_date or months > SUMMARY_MAX_MONTHS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Rango de fechas no válido (máximo {SUMMARY_MAX_MONTHS} meses)"
+        )
+    
+    not_modified = conditional_get(
+        request, http_response, current_user.id, "transactions", ("summary", from_date, to_date)
+    )
+    if not_modified is not None:
+        return not_modified
+    
+    try:
+        return await finance_summaries.get_or_compute(current_user.id, from_date, to_date)
+    except Exception as e:
+        logger.error(f"Error al calcular el resumen financiero: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al calcular el resumen financiero: {str(e)}"
+        )
+
 # Endpoints para metas financieras
 @router.get("/goals/", response_model=List[FinancialGoal])
 async def read_financial_goals(
@@ -229,11 +407,12 @@ async def read_financial_goals(
     supabase = get_supabase_client()
     
     try:
-        response = supabase.table("finance_goals") \
-            .select("*") \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
+        response = await run_query(
+            supabase.table("finance_goals")
+            .select("*")
+            .eq("user_id", current_user.id)
+            .eq("is_deleted", False)
+        )
         
         if not response.data:
             return []
@@ -271,7 +450,7 @@ async def create_financial_goal(
             "current_amount": goal_data.get("current_amount", 0)
         }
         
-        response = supabase.table("finance_goals").insert(goal_db).execute()
+        response = await run_query(supabase.table("finance_goals").insert(goal_db))
         
         if not response.data:
             raise HTTPException(
@@ -298,37 +477,15 @@ async def update_financial_goal(
     supabase = get_supabase_client()
     
     try:
-        # Verificar que la meta existe y pertenece al usuario
-        get_response = supabase.table("finance_goals") \
-            .select("*") \
-            .eq("id", goal_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
-        
-        if not get_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meta financiera no encontrada"
-            )
-        
-        # Actualizar la meta
         goal_data = goal_in.dict(exclude_unset=True)
         goal_data["updated_at"] = datetime.utcnow().isoformat()
         
-        update_response = supabase.table("finance_goals") \
-            .update(goal_data) \
-            .eq("id", goal_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
-        
-        if not update_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al actualizar la meta financiera"
-            )
+        goal = await update_owned(
+            supabase, "finance_goals", goal_id, current_user.id, goal_data,
+            "Meta financiera no encontrada", is_deleted=False
+        )
         
-        return FinancialGoal(**update_response.data[0])
+        return FinancialGoal(**goal)
     except HTTPException:
         raise
     except Exception as e:
@@ -348,39 +505,18 @@ async def delete_financial_goal(
     supabase = get_supabase_client()
     
     try:
-        # Verificar que la meta existe y pertenece al usuario
-        get_response = supabase.table("finance_goals") \
-            .select("*") \
-            .eq("id", goal_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
-        
-        if not get_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Meta financiera no encontrada"
-            )
-        
-        # Realizar soft delete de la meta
+        # Soft delete: solo si sigue sin borrar
         delete_data = {
             "is_deleted": True,
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        delete_response = supabase.table("finance_goals") \
-            .update(delete_data) \
-            .eq("id", goal_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
-        
-        if not delete_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al eliminar la meta financiera"
-            )
+        goal = await update_owned(
+            supabase, "finance_goals", goal_id, current_user.id, delete_data,
+            "Meta financiera no encontrada", is_deleted=False
+        )
         
-        return FinancialGoal(**delete_response.data[0])
+        return FinancialGoal(**goal)
     except HTTPException:
         raise
     except Exception as e:
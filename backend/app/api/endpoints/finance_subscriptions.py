@@ -1,6 +1,10 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from app.api.deps import get_db, get_current_user
+from app.core.resource_versions import resource_versions
+from app.db.database import delete_owned, run_query, update_owned
+from app.schemas.finance import SubscriptionProjection
+from app.services.subscription_projection import subscription_projections
 from sqlalchemy.orm import Session
 from app.models.user import User
 from pydantic import BaseModel, UUID4
@@ -87,6 +91,7 @@ async def create_subscription(
     # Convertir resultado a un diccionario
     subscription_dict = {column: getattr(result, column) for column in result._fields}
     
+    resource_versions.bump(str(current_user.id), "subscriptions")
     return subscription_dict
 
 @router.get("/", response_model=List[Subscription])
@@ -114,6 +119,20 @@ async def get_subscriptions(
     
     return subscriptions
 
+@router.get("/projection", response_model=SubscriptionProjection)
+async def get_subscription_projection(
+    months: int = Query(12, ge=1, le=36),
+    current_user: User = Depends(get_current_user)
+):
+    """Cobros previstos de las suscripciones activas en los próximos meses y totales mensuales"""
+    try:
+        return await subscription_projections.get_or_compute(str(current_user.id), months)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al proyectar las suscripciones: {str(e)}"
+        )
+
 @router.get("/{subscription_id}", response_model=Subscription)
 async def get_subscription(
     subscription_id: str,
@@ -150,58 +169,42 @@ async def update_subscription(
     current_user: User = Depends(get_current_user)
 ):
     """Actualizar una suscripción financiera"""
-    # Verificar que la suscripción existe y pertenece al usuario
-    query = db.execute(
-        """
-        SELECT * FROM subscriptions_tracker
-        WHERE id = :id AND user_id = :user_id
-        """,
-        {"id": subscription_id, "user_id": str(current_user.id)}
-    )
-    
-    result = query.fetchone()
-    
-    if not result:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Suscripción no encontrada"
+    try:
+        # Filtrar campos no nulos para actualizar
+        update_data = subscription.model_dump(mode="json", exclude_none=True)
+        
+        if not update_data:
+            # Si no hay datos para actualizar, devolver la suscripción actual
+            response = await run_query(
+                db.table("subscriptions_tracker")
+                .select("*")
+                .eq("id", subscription_id)
+                .eq("user_id", str(current_user.id))
+            )
+            if not response.data:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Suscripción no encontrada"
+                )
+            return response.data[0]
+        
+        update_data["updated_at"] = datetime.utcnow().isoformat()
+        
+        # Actualizar solo si existe y pertenece al usuario, en una sola petición
+        updated = await update_owned(
+            db, "subscriptions_tracker", subscription_id, current_user.id, update_data,
+            "Suscripción no encontrada"
         )
-    
-    # Filtrar campos no nulos para actualizar
-    update_data = {k: v for k, v in subscription.model_dump().items() if v is not None}
-    
-    if not update_data:
-        # Si no hay datos para actualizar, devolver la suscripción actual
-        subscription_dict = {column: getattr(result, column) for column in result._fields}
-        return subscription_dict
-    
-    # Construir la consulta de actualización dinámicamente
-    set_clause = ", ".join([f"{k} = :{k}" for k in update_data.keys()])
-    update_data["id"] = subscription_id
-    update_data["user_id"] = str(current_user.id)
-    
-    query = db.execute(
-        f"""
-        UPDATE subscriptions_tracker
-        SET {set_clause}
-        WHERE id = :id AND user_id = :user_id
-        RETURNING *
-        """,
-        update_data
-    )
-    
-    updated_result = query.fetchone()
-    
-    if not updated_result:
+        
+        resource_versions.bump(str(current_user.id), "subscriptions")
+        return updated
+    except HTTPException:
+        raise
+    except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al actualizar la suscripción"
+            detail=f"Error al actualizar la suscripción: {str(e)}"
         )
-    
-    # Convertir resultado a un diccionario
-    subscription_dict = {column: getattr(updated_result, column) for column in updated_result._fields}
-    
-    return subscription_dict
 
 @router.delete("/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_subscription(
@@ -210,35 +213,21 @@ async def delete_subscription(
     current_user: User = Depends(get_current_user)
 ):
     """Eliminar una suscripción financiera"""
-    # Verificar que la suscripción existe y pertenece al usuario
-    query = db.execute(
-        """
-        SELECT * FROM subscriptions_tracker
-        WHERE id = :id AND user_id = :user_id
-        """,
-        {"id": subscription_id, "user_id": str(current_user.id)}
-    )
-    
-    result = query.fetchone()
-    
-    if not result:
+    try:
+        await delete_owned(
+            db, "subscriptions_tracker", subscription_id, current_user.id,
+            "Suscripción no encontrada"
+        )
+        
+        resource_versions.bump(str(current_user.id), "subscriptions")
+        return None
+    except HTTPException:
+        raise
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Suscripción no encontrada"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al eliminar la suscripción: {str(e)}"
         )
-    
-    # Eliminar la suscripción
-    db.execute(
-        """
-        DELETE FROM subscriptions_tracker
-        WHERE id = :id AND user_id = :user_id
-        """,
-        {"id": subscription_id, "user_id": str(current_user.id)}
-    )
-    
-    db.commit()
-    
-    return None
 
 @router.post("/{subscription_id}/toggle", response_model=Subscription)
 async def toggle_subscription_status(
@@ -247,47 +236,43 @@ async def toggle_subscription_status(
     current_user: User = Depends(get_current_user)
 ):
     """Alternar el estado de una suscripción entre 'active' y 'cancelled'"""
-    # Obtener la suscripción
-    query = db.execute(
-        """
-        SELECT * FROM subscriptions_tracker
-        WHERE id = :id AND user_id = :user_id
-        """,
-        {"id": subscription_id, "user_id": str(current_user.id)}
-    )
-    
-    result = query.fetchone()
-    
-    if not result:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Suscripción no encontrada"
+    try:
+        # El nuevo estado depende del actual: PostgREST no permite calcularlo en el UPDATE
+        response = await run_query(
+            db.table("subscriptions_tracker")
+            .select("status")
+            .eq("id", subscription_id)
+            .eq("user_id", str(current_user.id))
         )
-    
-    # Determinar el nuevo estado
-    current_status = getattr(result, "status")
-    new_status = "cancelled" if current_status == "active" else "active"
-    
-    # Actualizar el estado
-    query = db.execute(
-        """
-        UPDATE subscriptions_tracker
-        SET status = :status
-        WHERE id = :id AND user_id = :user_id
-        RETURNING *
-        """,
-        {"id": subscription_id, "user_id": str(current_user.id), "status": new_status}
-    )
-    
-    updated_result = query.fetchone()
-    
-    if not updated_result:
+        
+        if not response.data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Suscripción no encontrada"
+            )
+        
+        current_status = response.data[0]["status"]
+        new_status = "cancelled" if current_status == "active" else "active"
+        
+        # Solo se aplica si el estado no cambió desde la lectura
+        try:
+            updated = await update_owned(
+                db, "subscriptions_tracker", subscription_id, current_user.id,
+                {"status": new_status, "updated_at": datetime.utcnow().isoformat()},
+                "Suscripción no encontrada", status=current_status
+            )
+        except HTTPException:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="La suscripción cambió mientras se actualizaba su estado"
+            )
+        
+        resource_versions.bump(str(current_user.id), "subscriptions")
+        return updated
+    except HTTPException:
+        raise
+    except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al actualizar el estado de la suscripción"
+            detail=f"Error al actualizar el estado de la suscripción: {str(e)}"
         )
-    
-    # Convertir resultado a un diccionario
-    subscription_dict = {column: getattr(updated_result, column) for column in updated_result._fields}
-    
-    return subscription_dict 
\ No newline at end of file
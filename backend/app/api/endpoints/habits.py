@@ -1,27 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from typing import Any, List, Optional
 from datetime import datetime, date, timedelta
 import uuid
 import logging
-from functools import lru_cache
 
 from app.services.auth import get_current_user
 from app.schemas.user import User
 # Verificar qué imports se están usando
 # Comentaré el import original para ver cuál es
-from app.schemas.habits import Habit, HabitCreate, HabitUpdate, HabitLog, HabitLogCreate
+from app.schemas.habits import (
+    Habit, HabitCreate, HabitUpdate, HabitLog, HabitLogCreate,
+    HabitLogBulkCreate, HabitLogBulkResult, HabitLogBulkResponse, HabitLogBulkStatus
+)
 # from app.schemas.habit import Habit, HabitCreate, HabitUpdate, HabitLog, HabitLogCreate
-from app.db.database import get_supabase_client
-from app.core.config import settings
-from supabase import create_client
+from app.db.database import get_supabase_client, get_service_client, run_query, update_owned, delete_owned
+from app.db import pg_pool
+from app.db.schema_cache import table_columns, is_undefined_column_error
+from app.services.habit_rollups import habit_rollups, ordinal_to_iso
+from app.core.resource_versions import conditional_get, resource_versions
+from app.utils.pagination import apply_keyset, finish_page, page_limit
 
 router = APIRouter()
 
-# Crear una función con caché para el cliente con rol de servicio
-@lru_cache(maxsize=1)
-def get_service_client():
-    """Obtiene un cliente Supabase con rol de servicio (con caché)"""
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+def _active_filter() -> dict:
+    """
+    Filtro is_active=True, solo si la columna existe en este esquema
+    """
+    return {"is_active": True} if table_columns.has_column("habits", "is_active") else {}
 
 @router.get("/analytics", response_model=dict)
 async def get_habits_analytics(
@@ -37,80 +42,60 @@ async def get_habits_analytics(
         supabase_service = get_service_client()
         
         # Obtener todos los hábitos activos del usuario
-        habits_response = supabase_service.table("habits") \
-            .select("*") \
-            .eq("user_id", current_user.id) \
-            .eq("is_active", True) \
-            .execute()
+        habits_response = await run_query(
+            supabase_service.table("habits")
+            .select("id, title")
+            .eq("user_id", current_user.id)
+            .eq("is_active", True)
+        )
             
         habits = habits_response.data
         
-        # Obtener los logs de los últimos 30 días para todos los hábitos
-        today = datetime.now().date()
-        thirty_days_ago = today - timedelta(days=30)
+        # Ventana de los últimos 30 días (más hoy) sobre el rollup incremental del usuario
+        today = datetime.now().date().toordinal()
+        total_days = 30
+        rollup = await habit_rollups.get_or_load(current_user.id)
         
         habit_streaks = []
-        daily_completions = []
-        completion_heatmap = []
-        
-        for habit in habits:
-            # Obtener logs del hábito
-            logs_response = supabase_service.table("habit_logs") \
-                .select("*") \
-                .eq("habit_id", habit["id"]) \
-                .gte("completed_date", thirty_days_ago.isoformat()) \
-                .order("completed_date") \
-                .execute()
-                
-            logs = logs_response.data
-            
-            # Calcular racha actual y mejor racha
-            current_streak = habit.get("current_streak", 0)
-            best_streak = habit.get("best_streak", 0)
-            
-            # Calcular tasa de completado
-            total_days = (today - thirty_days_ago).days
-            completed_days = len(logs)
-            completion_rate = (completed_days / total_days) * 100 if total_days > 0 else 0
-            
+        habit_days = []
+        for position, habit in enumerate(habits):
+            habit_rollup = rollup.habit(habit["id"])
+            window = habit_rollup.window(today, total_days + 1)
+            completed_days = sum(count for _, count in window)
+            # Rachas calculadas sobre los logs, no las columnas guardadas en habits
             habit_streaks.append({
                 "habit_name": habit["title"],
-                "current_streak": current_streak,
-                "best_streak": best_streak,
-                "completion_rate": round(completion_rate, 2)
+                "current_streak": habit_rollup.current_streak(today),
+                "best_streak": habit_rollup.best_streak,
+                "completion_rate": round((completed_days / total_days) * 100, 2)
             })
-            
-            # Agregar datos para el heatmap
-            for log in logs:
-                completion_heatmap.append({
-                    "date": log["completed_date"],
-                    "value": 1
-                })
-            
-            # Calcular completados por día
-            daily_counts = {}
-            for log in logs:
-                date = log["completed_date"]
-                if date not in daily_counts:
-                    daily_counts[date] = {
-                        "completed_count": 0,
-                        "total_count": len(habits)
-                    }
-                daily_counts[date]["completed_count"] += 1
-            
-            # Convertir daily_counts a lista
-            for date, counts in daily_counts.items():
-                daily_completions.append({
-                    "date": date,
-                    "completed_count": counts["completed_count"],
-                    "total_count": counts["total_count"],
-                    "completion_rate": (counts["completed_count"] / counts["total_count"]) * 100
-                })
+            habit_days.extend((day, position, count) for day, count in window)
+        
+        # Ordenados por fecha y, a igual fecha, por hábito
+        habit_days.sort()
+        
+        # Heatmap: una entrada por log
+        completion_heatmap = [
+            {"date": ordinal_to_iso(day), "value": 1}
+            for day, _, count in habit_days
+            for _ in range(count)
+        ]
+        
+        # Completados por hábito y día
+        daily_completions = [
+            {
+                "date": ordinal_to_iso(day),
+                "completed_count": count,
+                "total_count": len(habits),
+                "completion_rate": (count / len(habits)) * 100
+            }
+            for day, _, count in habit_days
+        ]
         
         return {
             "habit_streaks": habit_streaks,
-            "daily_completions": sorted(daily_completions, key=lambda x: x["date"]),
-            "completion_heatmap": sorted(completion_heatmap, key=lambda x: x["date"])
+            "daily_completions": daily_completions,
+            "completion_heatmap": completion_heatmap
         }
         
     except Exception as e:
@@ -122,11 +107,17 @@ async def get_habits_analytics(
 
 @router.get("/", response_model=List[Habit])
 async def read_habits(
+    request: Request,
+    http_response: Response,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Obtiene todos los hábitos del usuario actual
     """
+    not_modified = conditional_get(request, http_response, current_user.id, "habits")
+    if not_modified is not None:
+        return not_modified
+    
     logger = logging.getLogger(__name__)
     logger.info(f"Obteniendo hábitos para el usuario: {current_user.id}")
     
@@ -134,22 +125,21 @@ async def read_habits(
         # Usar directamente el cliente con rol de servicio para evitar consultas redundantes
         supabase_service = get_service_client()
         
-        # Intentar primero con is_active
-        try:
-            response = supabase_service.table("habits") \
-                .select("*") \
-                .eq("user_id", current_user.id) \
-                .eq("is_active", True) \
-                .execute()
-        except Exception as e:
-            # Si falla, probablemente is_active no existe, intentar sin el filtro
-            if "42703" in str(e):  # Código de error PostgreSQL para columna no existente
-                response = supabase_service.table("habits") \
-                    .select("*") \
-                    .eq("user_id", current_user.id) \
-                    .execute()
-            else:
-                raise e
+        query = supabase_service.table("habits") \
+            .select("*") \
+            .eq("user_id", current_user.id)
+        
+        # Filtrar por is_active solo si la columna existe en este esquema
+        if table_columns.has_column("habits", "is_active"):
+            try:
+                response = await run_query(query.eq("is_active", True))
+            except Exception as e:
+                if not is_undefined_column_error(e):
+                    raise e
+                await table_columns.refresh()
+                response = await run_query(query)
+        else:
+            response = await run_query(query)
         
         logger.info(f"Hábitos encontrados: {len(response.data)}")
         return [Habit(**habit) for habit in response.data]
@@ -208,46 +198,39 @@ async def create_habit(
         # Usar el cliente con rol de servicio
         supabase_service = get_service_client()
         
-        # Intentar insertar primero solo con campos requeridos
+        # Una sola inserción con los campos opcionales que existen en la tabla;
+        # la respuesta devuelve la fila creada
+        habit_db = {
+            **required_fields,
+            **table_columns.filter_fields(
+                "habits",
+                {field: value for field, value in optional_fields.items() if value is not None}
+            )
+        }
         try:
-            response = supabase_service.table("habits").insert(required_fields).execute()
-            habit_id = response.data[0]["id"]
-            
-            # Si la inserción básica fue exitosa, intentar actualizar con campos opcionales
-            # uno por uno para identificar cuáles existen
-            for field, value in optional_fields.items():
-                if value is not None:
-                    try:
-                        update_data = {field: value}
-                        supabase_service.table("habits") \
-                            .update(update_data) \
-                            .eq("id", habit_id) \
-                            .execute()
-                    except Exception as field_error:
-                        logger.warning(f"Campo {field} no pudo ser actualizado: {str(field_error)}")
-                        continue
-            
-            # Obtener el hábito actualizado
-            final_response = supabase_service.table("habits") \
-                .select("*") \
-                .eq("id", habit_id) \
-                .execute()
-            
-            if not final_response.data:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Error al obtener el hábito creado"
-                )
-            
-            return Habit(**final_response.data[0])
-            
+            response = await run_query(supabase_service.table("habits").insert(habit_db))
         except Exception as e:
-            logger.error(f"Error al crear el hábito: {str(e)}")
+            if not is_undefined_column_error(e):
+                raise
+            # El esquema cambió desde el último refresco: releerlo y reintentar una vez
+            logger.warning(f"Columna inexistente al crear el hábito, refrescando esquema: {str(e)}")
+            await table_columns.refresh()
+            if table_columns.columns("habits") is not None:
+                habit_db = table_columns.filter_fields("habits", habit_db)
+            else:
+                habit_db = required_fields
+            response = await run_query(supabase_service.table("habits").insert(habit_db))
+        
+        if not response.data:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al crear el hábito: {str(e)}"
+                detail="Error al obtener el hábito creado"
             )
-            
+        
+        resource_versions.bump(current_user.id, "habits")
+        return Habit(**response.data[0])
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al crear el hábito: {str(e)}")
         raise HTTPException(
@@ -269,12 +252,13 @@ async def read_habit(
         # Usar el cliente con rol de servicio
         supabase_service = get_service_client()
         
-        response = supabase_service.table("habits") \
-            .select("*") \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_active", True) \
-            .execute()
+        response = await run_query(
+            supabase_service.table("habits")
+            .select("*")
+            .eq("id", habit_id)
+            .eq("user_id", current_user.id)
+            .eq("is_active", True)
+        )
         
         if not response.data:
             raise HTTPException(
@@ -307,37 +291,17 @@ async def update_habit(
         # Usar el cliente con rol de servicio
         supabase_service = get_service_client()
         
-        # Verificar que el hábito existe y pertenece al usuario
-        get_response = supabase_service.table("habits") \
-            .select("*") \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_active", True) \
-            .execute()
-        
-        if not get_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Hábito no encontrado"
-            )
-        
-        # Actualizar el hábito
         habit_data = habit_in.dict(exclude_unset=True)
         habit_data["updated_at"] = datetime.utcnow().isoformat()
         
-        update_response = supabase_service.table("habits") \
-            .update(habit_data) \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
-        
-        if not update_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al actualizar el hábito"
-            )
+        # Actualizar el hábito si existe, está activo y pertenece al usuario
+        habit = await update_owned(
+            supabase_service, "habits", habit_id, current_user.id, habit_data,
+            "Hábito no encontrado", **_active_filter()
+        )
         
-        return Habit(**update_response.data[0])
+        resource_versions.bump(current_user.id, "habits")
+        return Habit(**habit)
     except HTTPException:
         raise
     except Exception as e:
@@ -362,32 +326,19 @@ async def delete_habit(
         # Usar el cliente con rol de servicio
         supabase_service = get_service_client()
         
-        # Verificar que el hábito existe y pertenece al usuario
-        get_response = supabase_service.table("habits") \
-            .select("*") \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_active", True) \
-            .execute()
-        
-        if not get_response.data:
-            logger.error(f"Hábito {habit_id} no encontrado para el usuario {current_user.id}")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Hábito no encontrado"
-            )
-        
-        # Realizar una eliminación física directa
-        delete_response = supabase_service.table("habits") \
-            .delete() \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
+        # Eliminación física; devuelve la fila borrada
+        habit = await delete_owned(
+            supabase_service, "habits", habit_id, current_user.id,
+            "Hábito no encontrado", **_active_filter()
+        )
         
         logger.info(f"Hábito {habit_id} eliminado correctamente")
+        # Los logs se borran en cascada: regenerar el rollup en la próxima lectura
+        habit_rollups.invalidate(current_user.id)
+        resource_versions.bump(current_user.id, "habits", "habit_logs")
         
         # Devolver el hábito eliminado
-        return Habit(**get_response.data[0])
+        return Habit(**habit)
     except HTTPException:
         raise
     except Exception as e:
@@ -398,18 +349,28 @@ async def delete_habit(
         )
 
 # Endpoints para registros de hábitos
+
+# Índice único de habit_logs (un log por hábito y día) para ON CONFLICT
+HABIT_LOG_CONFLICT_COLUMNS = "habit_id,completed_date"
+
 @router.get("/{habit_id}/logs", response_model=List[HabitLog])
 @router.get("/{habit_id}/logs/", response_model=List[HabitLog])
 async def read_habit_logs(
     habit_id: str,
+    http_response: Response,
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Obtiene los registros de un hábito específico, con filtros opcionales por fecha
+    Obtiene los registros de un hábito específico, con filtros opcionales por fecha.
+    Con `limit` o `cursor` devuelve una página y el cursor de la siguiente en la
+    cabecera X-Next-Cursor.
     """
     logger = logging.getLogger(__name__)
+    limit = page_limit(limit, cursor)
     logger.info(f"Obteniendo logs para el hábito: {habit_id} del usuario: {current_user.id}")
     
     try:
@@ -417,12 +378,13 @@ async def read_habit_logs(
         supabase_service = get_service_client()
         
         # Verificar que el hábito existe y pertenece al usuario
-        habit_response = supabase_service.table("habits") \
-            .select("id") \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_active", True) \
-            .execute()
+        habit_response = await run_query(
+            supabase_service.table("habits")
+            .select("id")
+            .eq("id", habit_id)
+            .eq("user_id", current_user.id)
+            .eq("is_active", True)
+        )
         
         logger.info(f"Respuesta al verificar hábito: {habit_response.data}")
         
@@ -445,11 +407,17 @@ async def read_habit_logs(
         if to_date:
             query = query.lte("completed_date", to_date.isoformat())
         
-        response = query.order("completed_date", desc=True).execute()
+        if limit is None:
+            query = query.order("completed_date", desc=True)
+        else:
+            query = apply_keyset(query, "completed_date", True, cursor, limit)
+        
+        response = await run_query(query)
         
         logger.info(f"Logs obtenidos: {len(response.data)}")
         
-        return [HabitLog(**log) for log in response.data]
+        logs = finish_page(response.data, "completed_date", limit, http_response)
+        return [HabitLog(**log) for log in logs]
     except HTTPException:
         raise
     except Exception as e:
@@ -477,11 +445,12 @@ async def create_habit_log(
         supabase_service = get_service_client()
         
         # Verificar primero que el hábito existe y pertenece al usuario
-        habit_response = supabase_service.table("habits") \
-            .select("id") \
-            .eq("id", habit_id) \
-            .eq("user_id", current_user.id) \
-            .execute()
+        habit_response = await run_query(
+            supabase_service.table("habits")
+            .select("id")
+            .eq("id", habit_id)
+            .eq("user_id", current_user.id)
+        )
         
         if not habit_response.data:
             logger.warning(f"Hábito no encontrado o no pertenece al usuario: {habit_id}")
@@ -507,16 +476,36 @@ async def create_habit_log(
             "created_at": now
         }
         
-        # Insertar el log
-        response = supabase_service.table("habit_logs").insert(log_db).execute()
+        # Insertar el log; si el día ya estaba registrado se devuelve el existente
+        response = await run_query(
+            supabase_service.table("habit_logs").upsert(
+                log_db,
+                on_conflict=HABIT_LOG_CONFLICT_COLUMNS,
+                ignore_duplicates=True
+            )
+        )
         
         if not response.data:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error al crear el registro del hábito: No se recibieron datos"
+            existing_response = await run_query(
+                supabase_service.table("habit_logs")
+                .select("*")
+                .eq("habit_id", habit_id)
+                .eq("completed_date", log_db["completed_date"])
             )
+            if not existing_response.data:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Error al crear el registro del hábito: No se recibieron datos"
+                )
+            return HabitLog(**existing_response.data[0])
         
-        return HabitLog(**response.data[0])
+        # Actualizar los contadores incrementales del usuario
+        log = response.data[0]
+        habit_rollups.record_log(current_user.id, log["habit_id"], log["completed_date"])
+        # Los triggers de habit_logs actualizan los contadores del hábito
+        resource_versions.bump(current_user.id, "habit_logs", "habits")
+        
+        return HabitLog(**log)
     except HTTPException:
         raise
     except Exception as e:
@@ -526,6 +515,150 @@ async def create_habit_log(
             detail=f"Error al crear el registro del hábito: {str(e)}"
         )
 
+# Máximo de logs aceptados por petición en la ingesta por lotes
+BULK_LOGS_MAX_ITEMS = 500
+
+def _iso_date(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+@router.post("/logs/bulk", response_model=HabitLogBulkResponse)
+async def create_habit_logs_bulk(
+    bulk_in: HabitLogBulkCreate,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Registra en lote los logs pendientes de clientes offline.
+    Verifica la propiedad de todos los hábitos en una consulta y hace una sola
+    inserción que ignora los (habit_id, completed_date) ya registrados.
+    Devuelve el resultado de cada elemento en el orden recibido.
+    """
+    logger = logging.getLogger(__name__)
+    logger.info(f"Ingesta por lotes de {len(bulk_in.logs)} logs para el usuario: {current_user.id}")
+    
+    if len(bulk_in.logs) > BULK_LOGS_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se admiten como máximo {BULK_LOGS_MAX_ITEMS} logs por petición"
+        )
+    
+    results: List[Optional[HabitLogBulkResult]] = [None] * len(bulk_in.logs)
+    
+    # Normalizar fechas (hoy si no se indica)
+    today = date.today().isoformat()
+    candidates = []
+    for index, item in enumerate(bulk_in.logs):
+        try:
+            completed_date = _iso_date(item.completed_date) if item.completed_date else today
+        except ValueError:
+            results[index] = HabitLogBulkResult(
+                index=index,
+                habit_id=item.habit_id,
+                completed_date=item.completed_date,
+                status=HabitLogBulkStatus.invalid,
+                detail="Fecha no válida"
+            )
+            continue
+        candidates.append((index, item, completed_date))
+    
+    try:
+        supabase_service = get_service_client()
+        
+        # Propiedad de todos los hábitos del lote en una sola consulta
+        owned_ids = set()
+        habit_ids = list({item.habit_id for _, item, _ in candidates})
+        if habit_ids:
+            owned_response = await run_query(
+                supabase_service.table("habits")
+                .select("id")
+                .eq("user_id", current_user.id)
+                .in_("id", habit_ids)
+            )
+            owned_ids = {habit["id"] for habit in owned_response.data}
+        
+        owned = []
+        for index, item, completed_date in candidates:
+            if item.habit_id in owned_ids:
+                owned.append((index, item, completed_date))
+            else:
+                results[index] = HabitLogBulkResult(
+                    index=index,
+                    habit_id=item.habit_id,
+                    completed_date=completed_date,
+                    status=HabitLogBulkStatus.not_found,
+                    detail="Hábito no encontrado o no pertenece al usuario"
+                )
+        
+        now = datetime.utcnow().isoformat()
+        seen = set()
+        to_insert = []
+        for index, item, completed_date in owned:
+            key = (item.habit_id, completed_date)
+            if key in seen:
+                results[index] = HabitLogBulkResult(
+                    index=index,
+                    habit_id=item.habit_id,
+                    completed_date=completed_date,
+                    status=HabitLogBulkStatus.duplicate
+                )
+                continue
+            seen.add(key)
+            to_insert.append((index, {
+                **item.dict(exclude={"habit_id"}),
+                "id": str(uuid.uuid4()),
+                "habit_id": item.habit_id,
+                "user_id": current_user.id,
+                "completed_date": completed_date,
+                "created_at": now
+            }))
+        
+        if to_insert:
+            # ON CONFLICT DO NOTHING sobre el índice único (habit_id, completed_date):
+            # solo vuelven las filas insertadas, el resto ya existía (reenvíos del cliente)
+            response = await run_query(
+                supabase_service.table("habit_logs").upsert(
+                    [log_db for _, log_db in to_insert],
+                    on_conflict=HABIT_LOG_CONFLICT_COLUMNS,
+                    ignore_duplicates=True
+                )
+            )
+            created = {log["id"]: log for log in response.data}
+            if created:
+                resource_versions.bump(current_user.id, "habit_logs", "habits")
+            for index, log_db in to_insert:
+                log = created.get(log_db["id"])
+                if log is None:
+                    results[index] = HabitLogBulkResult(
+                        index=index,
+                        habit_id=log_db["habit_id"],
+                        completed_date=log_db["completed_date"],
+                        status=HabitLogBulkStatus.duplicate
+                    )
+                    continue
+                habit_rollups.record_log(current_user.id, log["habit_id"], log["completed_date"])
+                results[index] = HabitLogBulkResult(
+                    index=index,
+                    habit_id=log["habit_id"],
+                    completed_date=log["completed_date"],
+                    status=HabitLogBulkStatus.created,
+                    log=HabitLog(**log)
+                )
+        
+        statuses = [result.status for result in results]
+        return HabitLogBulkResponse(
+            created=statuses.count(HabitLogBulkStatus.created),
+            duplicates=statuses.count(HabitLogBulkStatus.duplicate),
+            rejected=statuses.count(HabitLogBulkStatus.not_found) + statuses.count(HabitLogBulkStatus.invalid),
+            results=results
+        )
+    except Exception as e:
+        logger.error(f"Error en la ingesta por lotes de logs: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al registrar los logs: {str(e)}"
+        )
+
 @router.get("/diagnostic", response_model=dict)
 async def diagnostic_habits(
     current_user: User = Depends(get_current_user)
@@ -540,17 +673,19 @@ async def diagnostic_habits(
         supabase_service = get_service_client()
         
         # Consultar hábitos con rol de servicio (bypass RLS)
-        service_response = supabase_service.table("habits") \
-            .select("*") \
-            .eq("user_id", current_user.id) \
-            .execute()
+        service_response = await run_query(
+            supabase_service.table("habits")
+            .select("*")
+            .eq("user_id", current_user.id)
+        )
         
         # Consultar con cliente normal
         supabase = get_supabase_client()
-        normal_response = supabase.table("habits") \
-            .select("*") \
-            .eq("user_id", current_user.id) \
-            .execute()
+        normal_response = await run_query(
+            supabase.table("habits")
+            .select("*")
+            .eq("user_id", current_user.id)
+        )
         
         return {
             "user_id": current_user.id,
@@ -591,7 +726,7 @@ async def setup_habits_table(
         response = supabase_service.table("habits").execute(sql)
         
         # Verificar que la tabla existe consultando un registro
-        test_response = supabase_service.table("habits").select("*").limit(1).execute()
+        test_response = await run_query(supabase_service.table("habits").select("*").limit(1))
         
         return {
             "status": "success",
@@ -610,28 +745,47 @@ async def setup_habits_table(
 
 @router.get("/logs/today", response_model=List[dict])
 async def get_today_habits_logs(
+    request: Request,
+    http_response: Response,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Obtiene los logs de hoy para todos los hábitos del usuario en una sola consulta
     """
     logger = logging.getLogger(__name__)
+    
+    today = date.today()
+    # La respuesta cambia también al cambiar de día
+    not_modified = conditional_get(request, http_response, current_user.id, "habit_logs", today.isoformat())
+    if not_modified is not None:
+        return not_modified
+    
     logger.info(f"Obteniendo logs de hoy para el usuario: {current_user.id}")
     
     try:
-        supabase_service = get_service_client()
-        today = date.today().isoformat()
         
         # Obtener todos los logs de hoy en una sola consulta
-        response = supabase_service.table("habit_logs") \
-            .select("habit_id, completed_date") \
-            .eq("completed_date", today) \
-            .execute()
+        if pg_pool.pg_pool_available():
+            logs = await pg_pool.fetch(
+                "SELECT habit_id, completed_date FROM habit_logs"
+                " WHERE user_id = $1 AND completed_date = $2",
+                current_user.id,
+                today,
+            )
+        else:
+            supabase_service = get_service_client()
+            response = await run_query(
+                supabase_service.table("habit_logs")
+                .select("habit_id, completed_date")
+                .eq("user_id", current_user.id)
+                .eq("completed_date", today.isoformat())
+            )
+            logs = response.data
             
         # Crear un mapa de hábitos completados
         completed_habits = {
             log["habit_id"]: True 
-            for log in response.data
+            for log in logs
         }
         
         return [{"habit_id": habit_id, "completed": True} for habit_id in completed_habits]
@@ -1,26 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from typing import Any, List, Optional
 from datetime import datetime
 import uuid
 
 from app.services.auth import get_current_user
 from app.schemas.user import User
-from app.schemas.task import Task, TaskCreate, TaskUpdate
-from app.db.database import get_supabase_client
+from app.schemas.task import Task, TaskCreate, TaskUpdate, TaskReorder
+from app.db.database import get_supabase_client, run_query, update_owned
+from app.db import pg_pool
+from app.utils.fractional_index import append_key, key_between
+from app.core.resource_versions import conditional_get, resource_versions
+from app.utils.pagination import apply_keyset, cursor_params, finish_page, keyset_sql, order_by_key, page_limit
 
 router = APIRouter()
 
+# Máximo de movimientos por sesión de arrastre
+REORDER_MAX_MOVES = 200
+
+def _sort_key(after_key: Optional[str], before_key: Optional[str]) -> str:
+    """
+    Clave de orden entre dos vecinas; sin vecinas, al final de la columna
+    """
+    if after_key is None and before_key is None:
+        return append_key()
+    try:
+        return key_between(after_key, before_key)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Posición no válida: {str(e)}"
+        )
+
 @router.get("/", response_model=List[Task])
 async def read_tasks(
+    request: Request,
+    http_response: Response,
     status: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
-    Obtiene todas las tareas del usuario actual
+    Obtiene las tareas del usuario actual en su orden. Con `limit` o `cursor`
+    devuelve una página y el cursor de la siguiente en la cabecera X-Next-Cursor.
     """
-    supabase = get_supabase_client()
+    not_modified = conditional_get(request, http_response, current_user.id, "tasks")
+    if not_modified is not None:
+        return not_modified
+    
+    limit = page_limit(limit, cursor)
+    cursor_key, cursor_id = cursor_params(cursor)
     
     try:
+        if pg_pool.pg_pool_available():
+            tasks = await pg_pool.fetch(
+                "SELECT * FROM tasks"
+                " WHERE user_id = $1 AND is_deleted = false AND ($2::text IS NULL OR status = $2)"
+                f" AND {keyset_sql('sort_key', False, 3)}"
+                " ORDER BY sort_key ASC, id ASC LIMIT $5",
+                current_user.id,
+                status,
+                cursor_key,
+                cursor_id,
+                None if limit is None else limit + 1,
+            )
+            return finish_page(tasks, "sort_key", limit, http_response)
+        
+        supabase = get_supabase_client()
         query = supabase.table("tasks") \
             .select("*") \
             .eq("user_id", current_user.id) \
@@ -29,9 +75,14 @@ async def read_tasks(
         if status:
             query = query.eq("status", status)
         
-        response = query.order("column_order", desc=False).execute()
+        if limit is None:
+            query = order_by_key(query, "sort_key")
+        else:
+            query = apply_keyset(query, "sort_key", False, cursor, limit)
         
-        return response.data
+        response = await run_query(query)
+        
+        return finish_page(response.data, "sort_key", limit, http_response)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -49,20 +100,6 @@ async def create_task(
     supabase = get_supabase_client()
     
     try:
-        # Obtener el orden máximo actual para la columna
-        max_order_response = supabase.table("tasks") \
-            .select("column_order") \
-            .eq("user_id", current_user.id) \
-            .eq("status", task_in.status) \
-            .eq("is_deleted", False) \
-            .order("column_order", desc=True) \
-            .limit(1) \
-            .execute()
-        
-        max_order = 0
-        if max_order_response.data:
-            max_order = max_order_response.data[0].get("column_order", 0)
-        
         # Crear la tarea
         task_data = {
             "id": str(uuid.uuid4()),
@@ -73,13 +110,14 @@ async def create_task(
             "priority": task_in.priority,
             "due_date": task_in.due_date.isoformat() if task_in.due_date else None,
             "tags": task_in.tags,
-            "column_order": max_order + 1,
+            # Clave fraccional: no hace falta leer el orden actual de la columna
+            "sort_key": _sort_key(task_in.after_key, task_in.before_key),
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat(),
             "is_deleted": False
         }
         
-        response = supabase.table("tasks").insert(task_data).execute()
+        response = await run_query(supabase.table("tasks").insert(task_data))
         
         if not response.data:
             raise HTTPException(
@@ -87,13 +125,91 @@ async def create_task(
                 detail="Error al crear la tarea"
             )
         
+        resource_versions.bump(current_user.id, "tasks")
         return response.data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear tarea: {str(e)}"
         )
 
+@router.post("/reorder", response_model=List[Task])
+async def reorder_tasks(
+    reorder_in: TaskReorder,
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Aplica en una petición todos los movimientos de una sesión de arrastre.
+    Cada movimiento indica la tarea, la columna destino y sus vecinas; las
+    claves se calculan en orden, así una vecina puede ser una tarea movida antes.
+    """
+    moves = reorder_in.moves
+    if not moves:
+        return []
+    if len(moves) > REORDER_MAX_MOVES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se admiten como máximo {REORDER_MAX_MOVES} movimientos por petición"
+        )
+    
+    supabase = get_supabase_client()
+    
+    try:
+        # Claves actuales de las tareas movidas y de sus vecinas en una sola consulta
+        referenced = {move.id for move in moves}
+        referenced.update(move.after_id for move in moves if move.after_id)
+        referenced.update(move.before_id for move in moves if move.before_id)
+        response = await run_query(
+            supabase.table("tasks")
+            .select("id, sort_key")
+            .eq("user_id", current_user.id)
+            .eq("is_deleted", False)
+            .in_("id", list(referenced))
+        )
+        keys = {task["id"]: task["sort_key"] for task in response.data}
+        
+        missing = referenced - set(keys)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tareas no encontradas: {', '.join(sorted(missing))}"
+            )
+        
+        # El último movimiento de cada tarea es el que se guarda
+        updates = {}
+        for move in moves:
+            keys[move.id] = _sort_key(
+                keys[move.after_id] if move.after_id else None,
+                keys[move.before_id] if move.before_id else None
+            )
+            previous = updates.pop(move.id, {})
+            updates[move.id] = {
+                "id": move.id,
+                "status": move.status.value if move.status else previous.get("status"),
+                "sort_key": keys[move.id]
+            }
+        
+        result = await run_query(
+            supabase.rpc("reorder_tasks", {
+                "p_user_id": current_user.id,
+                "p_moves": list(updates.values())
+            })
+        )
+        
+        resource_versions.bump(current_user.id, "tasks")
+        
+        # Devolver las tareas en el orden en que quedaron
+        return sorted(result.data, key=lambda task: (task["status"], task["sort_key"]))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al reordenar tareas: {str(e)}"
+        )
+
 @router.get("/{task_id}", response_model=Task)
 async def read_task(
     task_id: str,
@@ -105,12 +221,13 @@ async def read_task(
     supabase = get_supabase_client()
     
     try:
-        response = supabase.table("tasks") \
-            .select("*") \
-            .eq("id", task_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
+        response = await run_query(
+            supabase.table("tasks")
+            .select("*")
+            .eq("id", task_id)
+            .eq("user_id", current_user.id)
+            .eq("is_deleted", False)
+        )
         
         if not response.data:
             raise HTTPException(
@@ -137,35 +254,30 @@ async def update_task(
     supabase = get_supabase_client()
     
     try:
-        # Verificar que la tarea existe y pertenece al usuario
-        task_response = supabase.table("tasks") \
-            .select("*") \
-            .eq("id", task_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
-        
-        if not task_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tarea no encontrada"
-            )
-        
         # Preparar datos para actualizar
         update_data = {k: v for k, v in task_in.dict(exclude_unset=True).items()}
         update_data["updated_at"] = datetime.now().isoformat()
         
+        # Mover entre dos vecinas: solo cambia la clave de esta tarea
+        after_key = update_data.pop("after_key", None)
+        before_key = update_data.pop("before_key", None)
+        if after_key is not None or before_key is not None:
+            update_data["sort_key"] = _sort_key(after_key, before_key)
+        
         # Si hay una fecha de vencimiento, convertirla a ISO
         if "due_date" in update_data and update_data["due_date"]:
             update_data["due_date"] = update_data["due_date"].isoformat()
         
-        # Actualizar la tarea
-        response = supabase.table("tasks") \
-            .update(update_data) \
-            .eq("id", task_id) \
-            .execute()
+        # Actualizar la tarea si existe y pertenece al usuario
+        task = await update_owned(
+            supabase, "tasks", task_id, current_user.id, update_data,
+            "Tarea no encontrada", is_deleted=False
+        )
         
-        return response.data[0]
+        resource_versions.bump(current_user.id, "tasks")
+        return task
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -183,30 +295,20 @@ async def delete_task(
     supabase = get_supabase_client()
     
     try:
-        # Verificar que la tarea existe y pertenece al usuario
-        task_response = supabase.table("tasks") \
-            .select("*") \
-            .eq("id", task_id) \
-            .eq("user_id", current_user.id) \
-            .eq("is_deleted", False) \
-            .execute()
-        
-        if not task_response.data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Tarea no encontrada"
-            )
-        
-        # Marcar como eliminada
-        response = supabase.table("tasks") \
-            .update({
+        # Marcar como eliminada si sigue sin borrar
+        task = await update_owned(
+            supabase, "tasks", task_id, current_user.id,
+            {
                 "is_deleted": True,
                 "updated_at": datetime.now().isoformat()
-            }) \
-            .eq("id", task_id) \
-            .execute()
+            },
+            "Tarea no encontrada", is_deleted=False
+        )
         
-        return response.data[0]
+        resource_versions.bump(current_user.id, "tasks")
+        return task
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
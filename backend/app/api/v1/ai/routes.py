@@ -6,7 +6,8 @@ from fastapi.responses import StreamingResponse
 from jose import JWTError, jwt
 from app.core.config import settings
 from app.core.ai_config import CHAT_SYSTEM_PROMPT
-from app.db.supabase import supabase_client
+from app.db.async_client import get_async_service_client
+from app.services.ai.chat_context import build_conversation_context
 import logging
 import json
 from typing import Optional, Dict, Any
@@ -25,8 +26,10 @@ async def save_message(user_id: str, conversation_id: str, content: str, sender:
     Guarda un mensaje en la base de datos
     """
     try:
+        supabase_client = get_async_service_client()
+        
         # Primero verificamos que la conversación existe y pertenece al usuario
-        conversation = supabase_client.table('conversations')\
+        conversation = await supabase_client.table('conversations')\
             .select('*')\
             .eq('id', conversation_id)\
             .eq('user_id', user_id)\
@@ -44,11 +47,11 @@ async def save_message(user_id: str, conversation_id: str, content: str, sender:
             "created_at": datetime.utcnow().isoformat()
         }
         
-        result = supabase_client.table('messages').insert(data).execute()
+        result = await supabase_client.table('messages').insert(data).execute()
         
         if result.data:
             # Actualizar el timestamp de la conversación
-            supabase_client.table('conversations')\
+            await supabase_client.table('conversations')\
                 .update({"updated_at": datetime.utcnow().isoformat()})\
                 .eq('id', conversation_id)\
                 .execute()
@@ -101,9 +104,11 @@ async def create_conversation(current_user = Depends(get_current_user)):
         
         logger.info(f"Intentando crear conversación con datos: {data}")
         
+        supabase_client = get_async_service_client()
+        
         # Verificar la conexión con Supabase
         try:
-            test_query = supabase_client.table('conversations').select("id").limit(1).execute()
+            test_query = await supabase_client.table('conversations').select("id").limit(1).execute()
             logger.info("Conexión con Supabase verificada")
         except Exception as e:
             logger.error(f"Error al verificar conexión con Supabase: {str(e)}")
@@ -113,7 +118,7 @@ async def create_conversation(current_user = Depends(get_current_user)):
             )
         
         # Intentar crear la conversación
-        result = supabase_client.table('conversations').insert(data).execute()
+        result = await supabase_client.table('conversations').insert(data).execute()
         
         if not result.data:
             logger.error("No se recibieron datos después de la inserción")
@@ -226,28 +231,14 @@ async def openrouter_chat_stream(
                 detail="No se encontró la conversación o no tienes permiso para acceder a ella"
             )
             
-        # Convertir el mensaje a formato ChatMessage
-        messages = [
-            ChatMessage(role=MessageRole.SYSTEM, content=CHAT_SYSTEM_PROMPT),
-            ChatMessage(role=MessageRole.USER, content=request.message)
-        ]
-        
-        # Obtener historial de mensajes
-        history_result = supabase_client.table('messages')\
-            .select('*')\
-            .eq('conversation_id', request.conversation_id)\
-            .order('created_at', desc=False)\
-            .limit(10)\
-            .execute()
-                
-        if history_result.data:
-            messages.extend([
-                ChatMessage(
-                    role=MessageRole.USER if msg["sender"] == "user" else MessageRole.ASSISTANT,
-                    content=msg["content"]
-                )
-                for msg in history_result.data
-            ])
+        # Prompt de sistema, historial más reciente y mensaje actual dentro del
+        # presupuesto de tokens (CHAT_CONTEXT_MAX_TOKENS)
+        messages = await build_conversation_context(
+            request.conversation_id,
+            CHAT_SYSTEM_PROMPT,
+            ChatMessage(role=MessageRole.USER, content=request.message),
+            exclude_id=user_message.get("id")
+        )
 
         async def generate():
             try:
@@ -3,11 +3,9 @@ from pydantic import BaseModel
 from enum import Enum
 from typing import List, Optional, Tuple, Dict, Any
 import json
-import os
 from app.api.deps import get_current_user
-from openai import AsyncOpenAI
-from app.core.config import settings
-import dotenv
+from app.services.ai.llm_gateway import LLMGateway, llm_gateway
+from app.services.ai.response_cache import ai_response_cache
 import logging
 
 # Configure logging
@@ -60,54 +58,20 @@ class WorkoutRecommendation(BaseModel):
 class WorkoutRecommendationResponse(BaseModel):
     recommendations: str
 
+WORKOUT_SYSTEM_PROMPT = "Eres un API que SOLO genera JSON de planes de entrenamiento. NO des explicaciones ni razonamientos."
+WORKOUT_TEMPERATURE = 0.3  # Temperatura baja para respuestas más consistentes
+WORKOUT_MAX_TOKENS = 2000
+
 class OpenRouterClient:
     """
-    Cliente para manejar las peticiones a OpenRouter
+    Peticiones de recomendaciones de entrenamiento a OpenRouter, a través del
+    cliente compartido de llm_gateway (misma API key y pool de conexiones)
     """
-    def __init__(self):
-        self.api_key = None
-        self.api_key_source = None
-        self.base_url = "https://openrouter.ai/api/v1"
+    def __init__(self, gateway: LLMGateway = llm_gateway):
+        self.gateway = gateway
         self.referer = "https://www.presentandflow.cl/"
         self.title = "SoulDream Workout Recommendations"
         self.model = "mistralai/mistral-7b-instruct"
-        
-        # Inicializar la API key
-        self._initialize_api_key()
-
-    def _initialize_api_key(self) -> None:
-        """
-        Inicializa la API key intentando diferentes fuentes
-        """
-        # 1. Intentar desde .env
-        env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))), '.env')
-        logger.info(f"Intentando cargar API key desde: {env_path}")
-        dotenv.load_dotenv(env_path)
-        
-        try:
-            with open(env_path, 'r') as f:
-                env_content = f.read()
-                for line in env_content.split('\n'):
-                    if line.startswith('OPENROUTER_API_KEY='):
-                        self.api_key = line.split('=', 1)[1].strip().strip('"').strip("'")
-                        self.api_key_source = '.env file'
-                        logger.info("API key encontrada en archivo .env")
-                        return
-        except Exception as e:
-            logger.error(f"Error leyendo archivo .env: {str(e)}")
-
-        # 2. Intentar desde settings
-        try:
-            settings_key = settings.OPENROUTER_API_KEY
-            if settings_key:
-                self.api_key = settings_key
-                self.api_key_source = 'settings'
-                logger.info("API key encontrada en settings")
-                return
-        except Exception as e:
-            logger.error(f"Error obteniendo API key desde settings: {str(e)}")
-
-        logger.error("No se encontró API key en ninguna fuente")
 
     def check_api_key_status(self) -> Tuple[bool, str]:
         """
@@ -116,60 +80,28 @@ class OpenRouterClient:
         Returns:
             Tuple[bool, str]: (está_configurada, mensaje_de_estado)
         """
-        if not self.api_key:
-            return False, "API key no configurada"
-        
-        return True, f"API key configurada (fuente: {self.api_key_source})"
-
-    async def _create_client(self) -> AsyncOpenAI:
-        """
-        Crea un cliente de OpenAI con la configuración correcta
-        """
-        is_configured, status = self.check_api_key_status()
-        if not is_configured:
-            raise ValueError(status)
-            
-        headers = {
-            "HTTP-Referer": self.referer,
-            "X-Title": self.title
-        }
-        
-        return AsyncOpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url,
-            default_headers=headers
-        )
+        return self.gateway.check_api_key_status()
 
     async def _send_request(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 2000, stream: bool = False) -> Any:
         """
         Envía una solicitud a la API de OpenRouter
         """
-        if not self.api_key:
+        if not self.gateway.api_key:
             raise ValueError("OpenRouter API key no configurada")
-            
-        client = await self._create_client()
-        
-        try:
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream,
-                extra_body={
-                    "provider": {
-                        "order": ["Groq", "Fireworks"],
-                        "allow_fallbacks": True
-                    }
-                }
-            )
-            
-            return response
-        except Exception as e:
-            logger.error(f"Error en OpenRouter API: {str(e)}")
-            raise
-        finally:
-            await client.close()
+
+        return await self.gateway.chat_completion(
+            messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=stream,
+            title=self.title,
+            referer=self.referer,
+            allow_fallbacks=True
+        )
+
+# Sin estado por petición: una instancia para todo el proceso
+workout_client = OpenRouterClient()
 
 @router.post("/workout-recommendations", response_model=WorkoutRecommendationResponse)
 async def generate_workout_recommendations(
@@ -191,8 +123,8 @@ async def generate_workout_recommendations(
             
         logger.debug(f"User authenticated successfully: {current_user.id}")
         
-        # Inicializar el cliente OpenRouter
-        client_manager = OpenRouterClient()
+        # Cliente OpenRouter compartido
+        client_manager = workout_client
         is_configured, status = client_manager.check_api_key_status()
         
         if not is_configured:
@@ -205,7 +137,8 @@ async def generate_workout_recommendations(
         logger.debug(f"OpenRouter client configured: {status}")
 
         # Creamos un prompt más directo y estructurado
-        muscle_groups_str = ", ".join(request.muscle_groups)
+        # Orden estable: la misma selección en otro orden reutiliza la respuesta cacheada
+        muscle_groups_str = ", ".join(sorted(request.muscle_groups))
         
         prompt = f"""[INSTRUCCIÓN]
 Genera exactamente 3 planes de entrenamiento en JSON. NO INCLUYAS EXPLICACIONES.
@@ -247,14 +180,17 @@ REGLAS:
         
         logger.debug("Prompt created, calling OpenRouter API...")
         
-        try:
+        async def generate() -> str:
+            """
+            Llama a OpenRouter y devuelve el JSON de planes ya validado
+            """
             response = await client_manager._send_request(
                 messages=[
-                    {"role": "system", "content": "Eres un API que SOLO genera JSON de planes de entrenamiento. NO des explicaciones ni razonamientos."},
+                    {"role": "system", "content": WORKOUT_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3,  # Reducimos la temperatura para respuestas más consistentes
-                max_tokens=2000,
+                temperature=WORKOUT_TEMPERATURE,
+                max_tokens=WORKOUT_MAX_TOKENS,
                 stream=False
             )
             
@@ -283,22 +219,22 @@ REGLAS:
                 content = content[7:-3].strip()
             elif content.startswith("```") and content.endswith("```"):
                 content = content[3:-3].strip()
-                
+            
             logger.debug(f"Cleaned content before JSON parsing: {content}")
-                
+            
             # Intentar validar el JSON
             try:
                 parsed_json = json.loads(content)
                 logger.debug("Successfully parsed JSON response")
-                
+            
                 # Validación adicional para asegurar formato correcto
                 if isinstance(parsed_json, list) and len(parsed_json) > 0:
                     logger.debug(f"JSON validation passed: found {len(parsed_json)} recommendations")
-                    return WorkoutRecommendationResponse(recommendations=content)
+                    return content
                 else:
                     logger.error(f"JSON validation failed: unexpected format")
                     raise ValueError("Formato de respuesta inesperado")
-                    
+                
             except json.JSONDecodeError as json_err:
                 logger.error(f"Error parsing JSON response: {str(json_err)}")
                 # Intentar limpiar el contenido para recuperar JSON válido
@@ -306,18 +242,27 @@ REGLAS:
                 # Buscar el inicio y fin del array JSON
                 start_idx = content.find('[')
                 end_idx = content.rfind(']') + 1
-                
+            
                 if start_idx >= 0 and end_idx > start_idx:
                     cleaned_json = content[start_idx:end_idx]
                     try:
                         json.loads(cleaned_json)
                         logger.debug("JSON recuperado después de limpieza")
-                        return WorkoutRecommendationResponse(recommendations=cleaned_json)
+                        return cleaned_json
                     except:
                         logger.error("No se pudo recuperar JSON válido después de limpieza")
-                
+            
                 raise ValueError("No se pudo obtener JSON válido de la respuesta")
-                
+            
+
+        try:
+            # Misma entrada normalizada -> misma respuesta (temperatura baja)
+            recommendations = await ai_response_cache.get_or_call(
+                client_manager.model, WORKOUT_SYSTEM_PROMPT, prompt, WORKOUT_TEMPERATURE, generate,
+                max_tokens=WORKOUT_MAX_TOKENS
+            )
+            return WorkoutRecommendationResponse(recommendations=recommendations)
+
         except Exception as e:
             logger.error(f"Error calling OpenRouter API: {str(e)}")
             raise ValueError(f"Error en la llamada a la API: {str(e)}")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from supabase import Client
 from ...deps import get_supabase, get_current_user
+from app.core.identity_cache import identity_cache
 from .paypal_client import paypal_client
 from datetime import datetime
 from typing import Dict, Any
@@ -86,6 +87,9 @@ async def cancel_subscription(
         if "error" in profile_result:
             print(f"Error al actualizar perfil: {profile_result['error']}")
 
+        # El nivel de suscripción cacheado del usuario ya no es válido
+        identity_cache.invalidate_user(user_id)
+
         return {
             "success": True,
             "message": "Suscripción cancelada exitosamente"
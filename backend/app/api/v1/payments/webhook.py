@@ -12,6 +12,7 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.serialization import load_pem_public_key
 from cryptography.exceptions import InvalidSignature
 from app.core.config import settings
+from app.core.identity_cache import identity_cache
 from app.services.payments import PayPalService
 from app.db.database import get_supabase_client
 import hmac
@@ -376,6 +377,9 @@ async def handle_subscription_activated(resource: Dict[str, Any], supabase):
             }
             
             history_result = supabase.table("payment_history").insert(history_data).execute()
+            
+            # El trigger de subscriptions actualiza el perfil; descartar la identidad cacheada
+            identity_cache.invalidate_user(subscription_result.data["user_id"])
     except Exception as e:
         print(f"[PayPal Debug] Error procesando activación de suscripción: {str(e)}")
         raise
@@ -778,6 +782,9 @@ async def handle_subscription_cancelled(resource: Dict[str, Any], supabase):
             history_result = supabase.table("payment_history").insert(history_data).execute()
             print(f"[PayPal Debug] Resultado del registro en historial: {json.dumps(history_result.data if history_result else 'No data', indent=2)}")
             
+            if subscription_data.get("user_id"):
+                identity_cache.invalidate_user(subscription_data["user_id"])
+            
             print(f"[PayPal Debug] Suscripción {subscription_id} cancelada exitosamente")
         else:
             print(f"[PayPal Debug] No se encontró la suscripción con ID: {subscription_id}")
@@ -36,7 +36,27 @@ class AISettings(BaseSettings):
     # Parámetros para control de frecuencia/limitaciones
     MAX_REQUESTS_PER_MINUTE: int = 10
     REQUEST_TIMEOUT_SECONDS: int = 30
-    
+
+    # Pool de conexiones keep-alive compartido (app.services.ai.llm_gateway)
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+
+    # Caché de respuestas deterministas (app.services.ai.response_cache): solo
+    # llamadas con temperatura <= AI_RESPONSE_CACHE_MAX_TEMPERATURE. Con
+    # AI_RESPONSE_CACHE_PATH se guarda en disco al apagar y se carga al arrancar
+    AI_RESPONSE_CACHE_ENABLED: bool = True
+    AI_RESPONSE_CACHE_MAX_SIZE: int = 1000
+    AI_RESPONSE_CACHE_TTL_SECONDS: int = 86400
+    AI_RESPONSE_CACHE_MAX_TEMPERATURE: float = 0.5
+    AI_RESPONSE_CACHE_PATH: str = ""
+
+    # Contexto del chat (app.services.ai.chat_context): prompt de sistema más el
+    # historial reciente que quepa en CHAT_CONTEXT_MAX_TOKENS, contado con tiktoken
+    CHAT_CONTEXT_MAX_TOKENS: int = 4000
+    CHAT_CONTEXT_MAX_MESSAGES: int = 50
+    CHAT_CONTEXT_ENCODING: str = "cl100k_base"
+
     class Config:
         env_file = os.path.join(BACKEND_DIR, ".env")
         case_sensitive = True
@@ -4,6 +4,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from app.core.config import settings
+from app.core.identity_cache import identity_cache
 from app.schemas.user import User
 import logging
 import base64
@@ -20,6 +21,32 @@ def decode_base64(key: str) -> str:
         key += '=' * padding
     return base64.b64decode(key).decode('utf-8')
 
+def decode_supabase_token(token: str) -> Dict[str, Any]:
+    """
+    Decodifica el JWT de Supabase, reutilizando el payload de la caché compartida
+    """
+    payload = identity_cache.get_claims(token)
+    if payload is not None:
+        return payload
+
+    if not settings.SUPABASE_JWT_SECRET:
+        logger.error("SUPABASE_JWT_SECRET no está configurado")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error de configuración del servidor"
+        )
+
+    logger.debug(f"Intentando decodificar token con algoritmo HS256")
+    payload = jwt.decode(
+        token, 
+        settings.SUPABASE_JWT_SECRET,
+        algorithms=["HS256"],
+        options={"verify_aud": False}  # No verificar el audience por ahora
+    )
+    logger.debug(f"Token decodificado exitosamente")
+    identity_cache.set_claims(token, payload)
+    return payload
+
 async def get_current_user(
     request: Request,
     token: Optional[str] = Depends(oauth2_scheme)
@@ -44,22 +71,7 @@ async def get_current_user(
 
     try:
         # Usar la clave JWT de Supabase para decodificar el token
-        if not settings.SUPABASE_JWT_SECRET:
-            logger.error("SUPABASE_JWT_SECRET no está configurado")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error de configuración del servidor"
-            )
-        
-        logger.debug(f"Intentando decodificar token con algoritmo HS256")
-        payload = jwt.decode(
-            token, 
-            settings.SUPABASE_JWT_SECRET,
-            algorithms=["HS256"],
-            options={"verify_aud": False}  # No verificar el audience por ahora
-        )
-        logger.debug(f"Token decodificado exitosamente")
-        return payload
+        return decode_supabase_token(token)
     except JWTError as e:
         logger.error(f"Error al decodificar token: {str(e)}")
         raise HTTPException(
@@ -102,21 +114,7 @@ async def get_current_user_from_token(
         raise credentials_exception
     
     try:
-        if not settings.SUPABASE_JWT_SECRET:
-            logger.error("SUPABASE_JWT_SECRET no está configurado")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Error de configuración del servidor"
-            )
-            
-        logger.debug(f"Intentando decodificar token con algoritmo HS256")
-        payload = jwt.decode(
-            token, 
-            settings.SUPABASE_JWT_SECRET,
-            algorithms=["HS256"],
-            options={"verify_aud": False}  # No verificar el audience por ahora
-        )
-        logger.debug(f"Token decodificado exitosamente")
+        payload = decode_supabase_token(token)
         
         user_id: str = payload.get("sub")
         if user_id is None:
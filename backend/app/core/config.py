@@ -14,6 +14,15 @@ class Settings(BaseSettings):
     
     # Configuración de base de datos
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+    # Pool asyncpg opcional para lecturas frecuentes (app.db.pg_pool); solo se crea si hay DATABASE_URL.
+    # Con PgBouncer en modo transacción usar DATABASE_STATEMENT_CACHE_SIZE=0
+    DATABASE_POOL_ENABLED: bool = True
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    DATABASE_STATEMENT_CACHE_SIZE: int = 100
+    DATABASE_COMMAND_TIMEOUT_SECONDS: float = 10.0
+    # Refresco de la caché de columnas (app.db.schema_cache)
+    SCHEMA_CACHE_REFRESH_SECONDS: int = 600
     
     # Configuración de JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your_secret_key_here")
@@ -45,7 +54,65 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
     SUPABASE_JWT_SECRET: str = os.getenv("SUPABASE_JWT_SECRET", "")
-    
+
+    # Pool HTTP del cliente asíncrono de PostgREST (app.db.async_client)
+    SUPABASE_HTTP_MAX_CONNECTIONS: int = 100
+    SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SUPABASE_HTTP_TIMEOUT_SECONDS: float = 10.0
+
+    # Pool de hilos para las consultas síncronas de supabase-py (app.db.database.run_query)
+    SUPABASE_SYNC_POOL_SIZE: int = 16
+    SUPABASE_SYNC_POOL_WAIT_WARNING_MS: float = 250.0
+
+    # Autenticación: verificar el JWT localmente y consultar Supabase Auth solo
+    # cada AUTH_REMOTE_REVALIDATION_SECONDS por token
+    AUTH_LOCAL_JWT_VERIFICATION: bool = True
+    AUTH_REMOTE_REVALIDATION_SECONDS: int = 300
+    AUTH_PROFILE_CACHE_TTL_SECONDS: int = 300
+    AUTH_CACHE_MAX_SIZE: int = 1000
+
+    # Rollups de hábitos en memoria (app.services.habit_rollups); el TTL acota
+    # la desincronización con escrituras de otros procesos o triggers
+    HABIT_ROLLUP_TTL_SECONDS: int = 600
+    HABIT_ROLLUP_MAX_USERS: int = 1000
+
+    # Caché de /finance/summary (app.services.finance_summary); se invalida al
+    # escribir transacciones y el TTL acota escrituras de otros procesos
+    FINANCE_SUMMARY_CACHE_TTL_SECONDS: int = 300
+    FINANCE_SUMMARY_CACHE_MAX_SIZE: int = 1000
+
+    # Caché de proyecciones de suscripciones (app.services.subscription_projection)
+    SUBSCRIPTION_PROJECTION_CACHE_TTL_SECONDS: int = 3600
+    SUBSCRIPTION_PROJECTION_CACHE_MAX_SIZE: int = 1000
+
+    # Insights precalculados en user_analytics (app.services.insights_snapshots).
+    # Una instantánea con más de INSIGHTS_SNAPSHOT_MAX_AGE_SECONDS se sirve igualmente
+    # mientras se recalcula en segundo plano; pasado INSIGHTS_SNAPSHOT_STALE_SECONDS
+    # se recalcula antes de responder. El planificador refresca cada día a
+    # INSIGHTS_REFRESH_HOUR_UTC a los usuarios con actividad (updated_at en tasks,
+    # transactions o habits, ver ACTIVITY_TABLES) en los últimos
+    # INSIGHTS_ACTIVE_DAYS días; con varios workers basta con uno
+    INSIGHTS_SNAPSHOT_MAX_AGE_SECONDS: int = 86400
+    INSIGHTS_SNAPSHOT_STALE_SECONDS: int = 7 * 86400
+    INSIGHTS_SCHEDULER_ENABLED: bool = int(os.getenv("WORKERS", 1)) == 1
+    INSIGHTS_REFRESH_HOUR_UTC: int = 4
+    INSIGHTS_REFRESH_BATCH_SIZE: int = 100
+    INSIGHTS_REFRESH_CONCURRENCY: int = 8
+    INSIGHTS_ACTIVE_DAYS: int = 30
+
+    # GET condicionales (app.core.resource_versions): las versiones viven en memoria
+    # del proceso, así que con varios workers hay que desactivarlo. El ETag caduca
+    # cada CONDITIONAL_GET_MAX_AGE_SECONDS para recoger escrituras hechas fuera de la API
+    CONDITIONAL_GET_ENABLED: bool = int(os.getenv("WORKERS", 1)) == 1
+    CONDITIONAL_GET_MAX_AGE_SECONDS: int = 300
+    CONDITIONAL_GET_MAX_USERS: int = 10000
+
+    # Paginación por cursor de los listados (app.utils.pagination). Con
+    # PAGINATION_LEGACY_UNPAGED las peticiones sin limit ni cursor reciben la lista completa
+    PAGINATION_LEGACY_UNPAGED: bool = True
+    PAGINATION_DEFAULT_LIMIT: int = 50
+    PAGINATION_MAX_LIMIT: int = 200
+
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
@@ -0,0 +1,241 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+import logging
+import time
+import jwt
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+def token_remaining_seconds(token: str) -> Optional[float]:
+    """
+    Segundos hasta el `exp` del JWT (sin verificar la firma). None si no se puede leer.
+    """
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+    if not claims.get("exp"):
+        return None
+    return max(float(claims["exp"]) - time.time(), 0)
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por entrada y desalojo LRU en O(1)
+    """
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Devuelve el valor si existe y no ha expirado, marcándolo como usado recientemente
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            expired = expires_at <= time.monotonic()
+            if expired:
+                del self._data[key]
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+
+        if expired:
+            self._notify_evict(key, value)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Guarda un valor. `ttl` permite acortar la vida de una entrada concreta
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        evicted = []
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False))
+                self.evictions += 1
+
+        for old_key, (old_value, _) in evicted:
+            self._notify_evict(old_key, old_value)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Elimina una entrada si existe
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is not None:
+            self._notify_evict(key, entry[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def snapshot(self) -> List[Tuple[Hashable, Any, float]]:
+        """
+        (clave, valor, segundos de vida restantes) de las entradas vigentes, de
+        la menos a la más usada; set() en ese orden reconstruye la caché
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, expires_at - now)
+                for key, (value, expires_at) in self._data.items()
+                if expires_at > now
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _notify_evict(self, key: Hashable, value: Any) -> None:
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class IdentityCache:
+    """
+    Caché compartida de identidad para los tres puntos de entrada de autenticación
+    (app.api.deps, app.services.auth y app.core.auth):
+
+    - users: token -> User ya resuelto
+    - claims: token -> payload del JWT verificado localmente
+    - revalidations: tokens validados contra Supabase Auth dentro del intervalo
+    - profiles: user_id -> fila de `profiles`
+    """
+    def __init__(self, maxsize: int, token_ttl: float, profile_ttl: float):
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._index_lock = Lock()
+        self.users = TTLCache(maxsize, token_ttl, on_evict=self._forget_token)
+        self.claims = TTLCache(maxsize, token_ttl)
+        self.revalidations = TTLCache(maxsize, token_ttl)
+        self.profiles = TTLCache(maxsize, profile_ttl)
+
+    def get_user(self, token: str) -> Optional[Any]:
+        return self.users.get(token)
+
+    def set_user(self, token: str, user: Any) -> None:
+        """
+        Guarda el usuario resuelto para un token; la entrada nunca sobrevive al `exp` del JWT
+        """
+        self._remember_token(str(user.id), token)
+        self.users.set(token, user, token_remaining_seconds(token))
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        return self.claims.get(token)
+
+    def set_claims(self, token: str, claims: Dict[str, Any]) -> None:
+        """
+        Guarda el payload de un token; la entrada nunca sobrevive al `exp` del JWT
+        """
+        ttl = None
+        if claims.get("exp"):
+            ttl = max(float(claims["exp"]) - time.time(), 0)
+        self.claims.set(token, claims, ttl)
+
+    def is_revalidated(self, token: str) -> bool:
+        return self.revalidations.get(token) is not None
+
+    def mark_revalidated(self, token: str) -> None:
+        self.revalidations.set(token, True, token_remaining_seconds(token))
+
+    def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.profiles.get(user_id)
+
+    def set_profile(self, user_id: str, profile: Dict[str, Any]) -> None:
+        self.profiles.set(user_id, profile)
+
+    def invalidate_token(self, token: str) -> None:
+        self.users.delete(token)
+        self.claims.delete(token)
+        self.revalidations.delete(token)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """
+        Elimina el perfil y los usuarios cacheados de todos sus tokens.
+        Debe llamarse cuando cambia su fila en `profiles`; los tokens siguen
+        siendo válidos, solo se vuelve a leer el perfil.
+        """
+        user_id = str(user_id)
+        self.profiles.delete(user_id)
+        with self._index_lock:
+            tokens = self._tokens_by_user.pop(user_id, set())
+        for token in tokens:
+            self.users.delete(token)
+        logger.debug(f"Identidad invalidada para el usuario {user_id} ({len(tokens)} tokens)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": self.users.stats(),
+            "claims": self.claims.stats(),
+            "revalidations": self.revalidations.stats(),
+            "profiles": self.profiles.stats(),
+        }
+
+    def clear(self) -> None:
+        self.users.clear()
+        self.claims.clear()
+        self.revalidations.clear()
+        self.profiles.clear()
+        with self._index_lock:
+            self._tokens_by_user.clear()
+
+    def _remember_token(self, user_id: str, token: str) -> None:
+        with self._index_lock:
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+
+    def _forget_token(self, token: str, user: Any) -> None:
+        user_id = getattr(user, "id", None)
+        if user_id is None or token in self.users:
+            return
+        with self._index_lock:
+            tokens = self._tokens_by_user.get(str(user_id))
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[str(user_id)]
+
+# Instancia global compartida por todos los módulos de autenticación
+identity_cache = IdentityCache(
+    maxsize=settings.AUTH_CACHE_MAX_SIZE,
+    token_ttl=settings.AUTH_REMOTE_REVALIDATION_SECONDS,
+    profile_ttl=settings.AUTH_PROFILE_CACHE_TTL_SECONDS,
+)
+
+# Resoluciones token -> usuario en curso, compartidas entre peticiones concurrentes
+identity_resolutions = SingleFlight("identity")
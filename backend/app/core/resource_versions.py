@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Hashable, Optional, Tuple
+import hashlib
+import itertools
+import logging
+import secrets
+import time
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ResourceVersions:
+    """
+    Versión por (usuario, recurso) que los handlers de escritura incrementan.
+    Con ella se calculan ETags fuertes para los listados sin consultar la base
+    de datos: si la versión no ha cambiado, la respuesta tampoco.
+    """
+    def __init__(self, maxsize: int, max_age: float = 0):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        # Distingue las versiones de este proceso de las de un arranque anterior
+        self._epoch = secrets.token_hex(4)
+        self._counter = itertools.count(1)
+        self._versions: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        # Versión de las claves desalojadas o nunca escritas: al desalojar sube,
+        # así un ETag antiguo nunca vuelve a coincidir
+        self._floor = 0
+        self._lock = Lock()
+        self.not_modified = 0
+
+    def version(self, user_id: str, resource: str) -> int:
+        with self._lock:
+            return self._versions.get((str(user_id), resource), self._floor)
+
+    def bump(self, user_id: str, *resources: str) -> None:
+        """
+        Marca los recursos del usuario como modificados
+        """
+        with self._lock:
+            for resource in resources:
+                key = (str(user_id), resource)
+                self._versions[key] = next(self._counter)
+                self._versions.move_to_end(key)
+            while len(self._versions) > self.maxsize:
+                _, evicted = self._versions.popitem(last=False)
+                self._floor = max(self._floor, evicted)
+
+    def etag(self, user_id: str, resource: str, variant: Hashable = None) -> str:
+        """
+        ETag fuerte del recurso; `variant` distingue respuestas del mismo recurso
+        (parámetros de la consulta, fecha de hoy...)
+        """
+        parts = [self._epoch, str(user_id), resource, str(self.version(user_id, resource)), repr(variant)]
+        if self.max_age > 0:
+            parts.append(str(int(time.time() // self.max_age)))
+        digest = hashlib.sha256("\x1f".join(parts).encode()).hexdigest()[:32]
+        return f'"{digest}"'
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"tracked": len(self._versions), "not_modified": self.not_modified}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._versions.clear()
+            self._floor = 0
+            self.not_modified = 0
+
+resource_versions = ResourceVersions(
+    maxsize=settings.CONDITIONAL_GET_MAX_USERS,
+    max_age=settings.CONDITIONAL_GET_MAX_AGE_SECONDS,
+)
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag in candidates
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    user_id: str,
+    resource: str,
+    variant: Hashable = None,
+) -> Optional[Response]:
+    """
+    Pone el ETag en la respuesta y, si el cliente ya tiene esa versión, devuelve
+    un 304 que el handler debe retornar sin consultar la base de datos.
+
+    La versión se lee antes de la consulta: si hay una escritura mientras tanto,
+    el ETag enviado es el antiguo y el siguiente GET vuelve a leer.
+    """
+    if not settings.CONDITIONAL_GET_ENABLED:
+        return None
+
+    if variant is None:
+        variant = str(request.url.query)
+    etag = resource_versions.etag(user_id, resource, variant)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        resource_versions.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,49 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesce llamadas asíncronas concurrentes con la misma clave: la primera
+    ejecuta la función y el resto espera su resultado (o su excepción).
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta `fn` una sola vez por clave mientras haya una llamada en curso
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"[{self.name}] Llamada coalescida con una resolución en curso")
+
+        # shield: si la petición que inició la llamada se cancela, las demás siguen esperando
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Marcar la excepción como recuperada aunque todos los que esperaban se hayan cancelado
+        if not task.cancelled():
+            task.exception()
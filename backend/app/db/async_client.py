@@ -0,0 +1,117 @@
+from typing import Any, Dict, Optional, Union
+import logging
+
+from httpx import AsyncClient, Limits, Timeout
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Clientes asíncronos por tipo (normal, service) - uno por proceso
+ASYNC_CLIENTS: Dict[str, "PooledPostgrestClient"] = {}
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """
+    Cliente PostgREST asíncrono sobre un httpx.AsyncClient con pool de conexiones
+    persistentes. Expone el mismo builder que supabase-py:
+
+        client.table("tasks").select("*").eq("user_id", user_id)
+
+    pero `execute()` es awaitable y no bloquea el event loop. Una instancia se
+    comparte entre todas las peticiones del proceso, así que la autenticación de
+    un usuario se añade por consulta con with_access_token.
+    """
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        *,
+        limits: Limits,
+        timeout: Union[int, float, Timeout],
+        schema: str = "public",
+    ):
+        # create_session se llama desde el constructor base, por eso se asigna antes
+        self.limits = limits
+        headers = {
+            **DEFAULT_POSTGREST_CLIENT_HEADERS,
+            "apiKey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+        }
+        super().__init__(
+            f"{supabase_url.rstrip('/')}/rest/v1",
+            schema=schema,
+            headers=headers,
+            timeout=timeout,
+        )
+
+    def create_session(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        timeout: Union[int, float, Timeout],
+    ) -> AsyncClient:
+        return AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=self.limits,
+        )
+
+    def auth(self, token: Optional[str], **kwargs: Any) -> "PooledPostgrestClient":
+        # El cliente se comparte entre peticiones: auth() cambiaría las cabeceras de todas
+        raise RuntimeError("PooledPostgrestClient es compartido: usa with_access_token(query, token)")
+
+def with_access_token(query: Any, access_token: str) -> Any:
+    """
+    Autentica solo esta consulta con el JWT del usuario (para que aplique RLS).
+    Las cabeceras van en el builder, no en la sesión compartida del pool.
+    """
+    query.headers["Authorization"] = f"Bearer {access_token}"
+    return query
+
+def _create_client(supabase_key: str) -> PooledPostgrestClient:
+    return PooledPostgrestClient(
+        settings.SUPABASE_URL,
+        supabase_key,
+        limits=Limits(
+            max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=settings.SUPABASE_HTTP_TIMEOUT_SECONDS,
+    )
+
+def get_async_supabase_client() -> PooledPostgrestClient:
+    """
+    Cliente asíncrono equivalente a get_supabase_client() (SUPABASE_KEY o SUPABASE_ANON_KEY)
+    """
+    client = ASYNC_CLIENTS.get("normal")
+    if client is None:
+        supabase_key = settings.SUPABASE_KEY or settings.SUPABASE_ANON_KEY
+        if not supabase_key:
+            raise ValueError("Se requiere una clave de Supabase válida (SUPABASE_KEY o SUPABASE_ANON_KEY)")
+        client = ASYNC_CLIENTS["normal"] = _create_client(supabase_key)
+    return client
+
+def get_async_service_client() -> PooledPostgrestClient:
+    """
+    Cliente asíncrono con rol de servicio (bypass RLS)
+    """
+    client = ASYNC_CLIENTS.get("service")
+    if client is None:
+        client = ASYNC_CLIENTS["service"] = _create_client(
+            settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
+        )
+    return client
+
+async def close_async_clients() -> None:
+    """
+    Cierra las conexiones persistentes. Se llama al apagar la aplicación.
+    """
+    for name, client in list(ASYNC_CLIENTS.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"Error al cerrar el cliente asíncrono {name}: {e}")
+    ASYNC_CLIENTS.clear()
@@ -1,5 +1,10 @@
 from supabase import create_client
+from fastapi import HTTPException, status
 from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Union
+import asyncio
 import logging
 from functools import lru_cache
 import time
@@ -43,6 +48,12 @@ def get_supabase_admin_client():
         logger.error(f"Error al conectar con Supabase (admin): {e}")
         raise e
 
+def get_service_client():
+    """
+    Alias de get_supabase_admin_client() usado por los endpoints con rol de servicio
+    """
+    return get_supabase_admin_client()
+
 def reset_client_cache():
     """
     Resetea la caché de clientes. Útil después de cambios de configuración.
@@ -50,3 +61,153 @@ def reset_client_cache():
     get_supabase_client.cache_clear()
     get_supabase_admin_client.cache_clear()
     logger.info("Caché de clientes Supabase reseteada")
+
+class QueryExecutorMetrics:
+    """
+    Métricas del pool de consultas síncronas: profundidad de cola, consultas
+    activas y tiempo de espera hasta obtener un hilo
+    """
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self._lock = Lock()
+        self.queued = 0
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.slow_waits = 0
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self.queued += 1
+            self.submitted += 1
+
+    def on_start(self, wait_ms: float, slow: bool) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if slow:
+                self.slow_waits += 1
+
+    def on_cancel(self) -> None:
+        with self._lock:
+            self.queued -= 1
+            self.submitted -= 1
+
+    def on_finish(self, failed: bool) -> None:
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+            if failed:
+                self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.submitted - self.queued
+            return {
+                "pool_size": self.pool_size,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait_ms / started, 2) if started else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 2),
+                "slow_waits": self.slow_waits,
+            }
+
+# Pool dedicado para las llamadas bloqueantes de supabase-py, separado del
+# threadpool por defecto de Starlette para que su saturación sea medible
+QUERY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=settings.SUPABASE_SYNC_POOL_SIZE,
+    thread_name_prefix="supabase-sync",
+)
+query_executor_metrics = QueryExecutorMetrics(settings.SUPABASE_SYNC_POOL_SIZE)
+
+async def run_query(query: Union[Any, Callable[[], Any]]) -> Any:
+    """
+    Ejecuta una consulta síncrona de supabase-py en el pool dedicado sin
+    bloquear el event loop. Acepta un builder (se llama a su `execute()`)
+    o cualquier callable sin argumentos:
+
+        response = await run_query(supabase.table("tasks").select("*").eq("user_id", user_id))
+    """
+    fn = query.execute if hasattr(query, "execute") else query
+    submitted_at = time.perf_counter()
+    query_executor_metrics.on_submit()
+
+    def run() -> Any:
+        wait_ms = (time.perf_counter() - submitted_at) * 1000
+        slow = wait_ms >= settings.SUPABASE_SYNC_POOL_WAIT_WARNING_MS
+        query_executor_metrics.on_start(wait_ms, slow)
+        if slow:
+            logger.warning(
+                f"Pool de consultas Supabase saturado: {wait_ms:.0f} ms de espera "
+                f"({query_executor_metrics.queued} en cola)"
+            )
+        failed = True
+        try:
+            result = fn()
+            failed = False
+            return result
+        finally:
+            query_executor_metrics.on_finish(failed)
+
+    future = QUERY_EXECUTOR.submit(run)
+    # Si la petición se cancela antes de que la consulta obtenga un hilo, no llega a ejecutarse
+    future.add_done_callback(lambda f: f.cancelled() and query_executor_metrics.on_cancel())
+    return await asyncio.wrap_future(future)
+
+def _owned(query: Any, record_id: str, user_id: str, filters: Dict[str, Any]) -> Any:
+    query = query.eq("id", record_id).eq("user_id", user_id)
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    return query
+
+async def update_owned(
+    client: Any,
+    table: str,
+    record_id: str,
+    user_id: str,
+    data: Dict[str, Any],
+    not_found_detail: str,
+    **filters: Any
+) -> Dict[str, Any]:
+    """
+    UPDATE ... WHERE id AND user_id [AND filtros] RETURNING * en una sola
+    petición. Si no se actualiza ninguna fila (no existe, es de otro usuario o
+    no cumple los filtros, p. ej. is_deleted=False) responde 404.
+    """
+    response = await run_query(_owned(client.table(table).update(data), record_id, str(user_id), filters))
+    if not response.data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+    return response.data[0]
+
+async def delete_owned(
+    client: Any,
+    table: str,
+    record_id: str,
+    user_id: str,
+    not_found_detail: str,
+    **filters: Any
+) -> Dict[str, Any]:
+    """
+    DELETE ... RETURNING * acotado al usuario, con la misma semántica que update_owned
+    """
+    response = await run_query(_owned(client.table(table).delete(), record_id, str(user_id), filters))
+    if not response.data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found_detail)
+    return response.data[0]
+
+def get_query_executor_stats() -> Dict[str, Any]:
+    return query_executor_metrics.stats()
+
+def shutdown_query_executor() -> None:
+    """
+    Libera los hilos del pool. Se llama al apagar la aplicación.
+    """
+    QUERY_EXECUTOR.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,96 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+import logging
+
+import asyncpg
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pool de conexiones directas a Postgres - uno por proceso, creado en el lifespan
+PG_POOL: Optional[asyncpg.Pool] = None
+
+async def init_pg_pool() -> Optional[asyncpg.Pool]:
+    """
+    Crea el pool si hay DATABASE_URL. Si no se puede conectar, la aplicación
+    sigue funcionando sobre PostgREST.
+    """
+    global PG_POOL
+    if PG_POOL is not None:
+        return PG_POOL
+    if not settings.DATABASE_POOL_ENABLED or not settings.DATABASE_URL:
+        logger.info("Pool asyncpg deshabilitado: las lecturas usarán PostgREST")
+        return None
+
+    try:
+        PG_POOL = await asyncpg.create_pool(
+            dsn=settings.DATABASE_URL,
+            min_size=settings.DATABASE_POOL_MIN_SIZE,
+            max_size=settings.DATABASE_POOL_MAX_SIZE,
+            statement_cache_size=settings.DATABASE_STATEMENT_CACHE_SIZE,
+            command_timeout=settings.DATABASE_COMMAND_TIMEOUT_SECONDS,
+            timeout=settings.DATABASE_COMMAND_TIMEOUT_SECONDS,
+        )
+        logger.info(f"Pool asyncpg creado (max {settings.DATABASE_POOL_MAX_SIZE} conexiones)")
+    except Exception as e:
+        logger.error(f"No se pudo crear el pool asyncpg, se usará PostgREST: {e}")
+        PG_POOL = None
+    return PG_POOL
+
+async def close_pg_pool() -> None:
+    """
+    Cierra el pool. Se llama al apagar la aplicación.
+    """
+    global PG_POOL
+    if PG_POOL is None:
+        return
+    try:
+        await PG_POOL.close()
+    except Exception as e:
+        logger.error(f"Error al cerrar el pool asyncpg: {e}")
+    PG_POOL = None
+
+def pg_pool_available() -> bool:
+    return PG_POOL is not None
+
+def _to_json_value(value: Any) -> Any:
+    # Mismos tipos que devuelve PostgREST en JSON
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, list):
+        return [_to_json_value(item) for item in value]
+    return value
+
+def record_to_dict(record: asyncpg.Record) -> Dict[str, Any]:
+    return {key: _to_json_value(value) for key, value in record.items()}
+
+async def fetch(query: str, *args: Any) -> List[Dict[str, Any]]:
+    """
+    Ejecuta una consulta parametrizada ($1, $2...) y devuelve las filas como dicts.
+    asyncpg prepara y cachea la sentencia por conexión.
+    """
+    if PG_POOL is None:
+        raise RuntimeError("El pool asyncpg no está inicializado")
+    async with PG_POOL.acquire() as connection:
+        records = await connection.fetch(query, *args)
+    return [record_to_dict(record) for record in records]
+
+async def fetchrow(query: str, *args: Any) -> Optional[Dict[str, Any]]:
+    if PG_POOL is None:
+        raise RuntimeError("El pool asyncpg no está inicializado")
+    async with PG_POOL.acquire() as connection:
+        record = await connection.fetchrow(query, *args)
+    return record_to_dict(record) if record is not None else None
+
+async def fetchval(query: str, *args: Any) -> Any:
+    if PG_POOL is None:
+        raise RuntimeError("El pool asyncpg no está inicializado")
+    async with PG_POOL.acquire() as connection:
+        return _to_json_value(await connection.fetchval(query, *args))
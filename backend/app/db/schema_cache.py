@@ -0,0 +1,108 @@
+from typing import Dict, FrozenSet, Iterable, Optional
+import asyncio
+import logging
+
+from app.db import pg_pool
+from app.db.async_client import get_async_service_client
+
+logger = logging.getLogger(__name__)
+
+# Columna inexistente: código de PostgreSQL y, en escrituras, el de la caché de esquema de PostgREST
+UNDEFINED_COLUMN_CODES = ("42703", "PGRST204")
+
+# Tablas cuyo esquema varía entre entornos según las migraciones aplicadas
+INTROSPECTED_TABLES = ("habits",)
+
+class TableColumnsCache:
+    """
+    Conjunto de columnas por tabla, leído al arrancar y refrescado periódicamente.
+    Sustituye a sondear columna a columna con UPDATEs o a reintentar tras un 42703.
+    """
+    def __init__(self, tables: Iterable[str]):
+        self.tables = tuple(tables)
+        self._columns: Dict[str, FrozenSet[str]] = {}
+        self._refresh_task: Optional["asyncio.Task[None]"] = None
+
+    def columns(self, table: str) -> Optional[FrozenSet[str]]:
+        """
+        Columnas conocidas de la tabla, o None si aún no se han podido leer
+        """
+        return self._columns.get(table)
+
+    def has_column(self, table: str, column: str) -> bool:
+        """
+        Si no se conoce el esquema se asume que la columna existe
+        """
+        columns = self._columns.get(table)
+        return columns is None or column in columns
+
+    def filter_fields(self, table: str, data: Dict) -> Dict:
+        """
+        Descarta de `data` las claves que no son columnas de la tabla
+        """
+        columns = self._columns.get(table)
+        if columns is None:
+            return dict(data)
+        dropped = set(data) - columns
+        if dropped:
+            logger.debug(f"Campos sin columna en {table}: {sorted(dropped)}")
+        return {field: value for field, value in data.items() if field in columns}
+
+    async def refresh(self) -> None:
+        """
+        Lee las columnas de las tablas, por asyncpg si hay pool o por el OpenAPI de PostgREST
+        """
+        try:
+            if pg_pool.pg_pool_available():
+                rows = await pg_pool.fetch(
+                    "SELECT table_name, column_name FROM information_schema.columns"
+                    " WHERE table_schema = 'public' AND table_name = ANY($1::text[])",
+                    list(self.tables),
+                )
+                found: Dict[str, set] = {}
+                for row in rows:
+                    found.setdefault(row["table_name"], set()).add(row["column_name"])
+            else:
+                response = await get_async_service_client().session.get("/")
+                response.raise_for_status()
+                definitions = response.json().get("definitions", {})
+                found = {
+                    table: set(definitions[table].get("properties", {}))
+                    for table in self.tables
+                    if table in definitions
+                }
+        except Exception as e:
+            logger.warning(f"No se pudo leer el esquema de {self.tables}: {e}")
+            return
+
+        for table, columns in found.items():
+            if columns and self._columns.get(table) != columns:
+                logger.info(f"Columnas de {table}: {sorted(columns)}")
+                self._columns[table] = frozenset(columns)
+
+    async def _refresh_loop(self, interval: float) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float) -> None:
+        """
+        Lanza el refresco periódico (la primera lectura es inmediata)
+        """
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval))
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+table_columns = TableColumnsCache(INTROSPECTED_TABLES)
+
+def is_undefined_column_error(error: Exception) -> bool:
+    message = str(error)
+    return any(code in message for code in UNDEFINED_COLUMN_CODES)
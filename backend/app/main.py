@@ -5,12 +5,20 @@ from fastapi.responses import JSONResponse
 import logging
 import os
 import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from app.api.v1 import api_router
 from app.core.config import settings
 from starlette.middleware.base import BaseHTTPMiddleware
 from app.core.logging_config import setup_logging
 from app.api.v1.payments.webhook import router as webhook_router
+from app.db.async_client import close_async_clients
+from app.db.database import get_query_executor_stats, shutdown_query_executor
+from app.db.pg_pool import init_pg_pool, close_pg_pool
+from app.db.schema_cache import table_columns
+from app.services.insights_snapshots import insights_scheduler, insights_snapshots
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.response_cache import ai_response_cache
 
 # Cargar variables de entorno
 load_dotenv()
@@ -34,6 +42,32 @@ class TimingMiddleware(BaseHTTPMiddleware):
         
         return response
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la aplicación: crea los recursos compartidos al arrancar
+    y los libera al apagar
+    """
+    # Pool asyncpg opcional para lecturas frecuentes (sin DATABASE_URL se usa PostgREST)
+    await init_pg_pool()
+    # Columnas de las tablas con esquema variable (p. ej. habits), refrescadas periódicamente
+    table_columns.start(settings.SCHEMA_CACHE_REFRESH_SECONDS)
+    # Refresco diario de los insights precalculados (uno por despliegue)
+    if settings.INSIGHTS_SCHEDULER_ENABLED:
+        insights_scheduler.start(settings.INSIGHTS_REFRESH_HOUR_UTC)
+    # Respuestas de IA guardadas en el apagado anterior (si AI_RESPONSE_CACHE_PATH)
+    ai_response_cache.load()
+    yield
+    ai_response_cache.save()
+    await insights_scheduler.stop()
+    await table_columns.stop()
+    await close_pg_pool()
+    # Cerrar las conexiones persistentes del cliente asíncrono de Supabase
+    await close_async_clients()
+    # Cerrar el pool keep-alive hacia OpenRouter
+    await llm_gateway.close()
+    shutdown_query_executor()
+
 # Crear la aplicación FastAPI
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -42,6 +76,7 @@ app = FastAPI(
     openapi_url="/api/openapi.json",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    lifespan=lifespan,
 )
 
 # Determinar CORS basado en entorno
@@ -61,7 +96,7 @@ if os.environ.get("ENV", "development") == "production":
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["Authorization", "Content-Type"],
-        expose_headers=["Content-Type", "Accept", "Authorization"],
+        expose_headers=["Content-Type", "Accept", "Authorization", "ETag", "X-Next-Cursor"],
         max_age=3600,  # Cache preflight requests for 1 hour
     )
 else:
@@ -81,7 +116,7 @@ else:
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["*"],
-        expose_headers=["Content-Type", "Accept", "Authorization"],
+        expose_headers=["Content-Type", "Accept", "Authorization", "ETag", "X-Next-Cursor"],
     )
 
 # Añadir middleware de timing
@@ -92,6 +127,21 @@ app.add_middleware(TimingMiddleware)
 async def health_check():
     return {"status": "ok"}
 
+# Estado del pool de consultas síncronas de Supabase (cola, esperas)
+@app.get("/health/db-pool")
+async def db_pool_health():
+    return get_query_executor_stats()
+
+# Instantáneas de insights (frescas, servidas caducadas, recalculadas) y último refresco diario
+@app.get("/health/insights")
+async def insights_health():
+    return {**insights_snapshots.stats(), "last_run": insights_scheduler.last_run}
+
+# Caché de respuestas de IA deterministas (aciertos, tasa de acierto, desalojos)
+@app.get("/health/ai-cache")
+async def ai_cache_health():
+    return ai_response_cache.stats()
+
 # Ruta raíz
 @app.get("/")
 async def root():
@@ -7,6 +7,14 @@ class TransactionType(str, Enum):
     income = "income"
     expense = "expense"
 
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+class ImportFormat(str, Enum):
+    csv = "csv"
+    ofx = "ofx"
+
 class TransactionCreate(BaseModel):
     amount: float
     type: TransactionType
@@ -39,6 +47,69 @@ class Transaction(BaseModel):
     class Config:
         from_attributes = True
 
+class TransactionImportError(BaseModel):
+    row: int
+    error: str
+
+class TransactionImportChunk(BaseModel):
+    index: int
+    rows: int
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+
+class TransactionImportReport(BaseModel):
+    total_rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    truncated: bool = False
+    chunks: List[TransactionImportChunk] = []
+    errors: List[TransactionImportError] = []
+
+class FinanceMonthSummary(BaseModel):
+    month: str
+    income: float
+    expense: float
+    net: float
+    balance: float
+
+class FinanceCategoryTotal(BaseModel):
+    category: str
+    type: TransactionType
+    total: float
+    count: int
+
+class FinanceSummary(BaseModel):
+    from_date: date
+    to_date: date
+    opening_balance: float
+    closing_balance: float
+    income: float
+    expense: float
+    months: List[FinanceMonthSummary] = []
+    categories: List[FinanceCategoryTotal] = []
+
+class SubscriptionCharge(BaseModel):
+    subscription_id: str
+    name: str
+    date: date
+    amount: float
+    currency: str
+    category: Optional[str] = None
+
+class SubscriptionMonthTotal(BaseModel):
+    month: str
+    currency: str
+    total: float
+    count: int
+
+class SubscriptionProjection(BaseModel):
+    from_date: date
+    to_date: date
+    charges: List[SubscriptionCharge] = []
+    monthly_totals: List[SubscriptionMonthTotal] = []
+
 class FinancialGoalCreate(BaseModel):
     title: str
     target_amount: float
@@ -94,4 +94,34 @@ class HabitLog(BaseModel):
 
     class Config:
         from_attributes = True
-        populate_by_name = True 
\ No newline at end of file
+        populate_by_name = True 
+
+class HabitLogBulkItem(HabitLogCreate):
+    habit_id: str
+
+
+class HabitLogBulkCreate(BaseModel):
+    logs: List[HabitLogBulkItem]
+
+
+class HabitLogBulkStatus(str, Enum):
+    created = "created"
+    duplicate = "duplicate"  # Ya existía un log del hábito para esa fecha (o se repite en el lote)
+    not_found = "not_found"  # El hábito no existe o no pertenece al usuario
+    invalid = "invalid"
+
+
+class HabitLogBulkResult(BaseModel):
+    index: int  # Posición en la lista enviada
+    habit_id: str
+    completed_date: Optional[Union[date, str]] = None
+    status: HabitLogBulkStatus
+    log: Optional[HabitLog] = None
+    detail: Optional[str] = None
+
+
+class HabitLogBulkResponse(BaseModel):
+    created: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    results: List[HabitLogBulkResult] = []
@@ -23,6 +23,9 @@ class TaskBase(BaseModel):
 
 class TaskCreate(TaskBase):
     user_id: str
+    # Claves de orden de las tareas vecinas en la columna destino (sin ellas se añade al final)
+    after_key: Optional[str] = None
+    before_key: Optional[str] = None
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
@@ -32,11 +35,15 @@ class TaskUpdate(BaseModel):
     due_date: Optional[datetime] = None
     tags: Optional[List[str]] = None
     column_order: Optional[int] = None
+    # Mover la tarea entre dos vecinas (claves de orden)
+    after_key: Optional[str] = None
+    before_key: Optional[str] = None
 
 class TaskInDB(TaskBase):
     id: str
     user_id: str
-    column_order: int = 0
+    column_order: Optional[int] = 0
+    sort_key: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     is_deleted: bool = False
@@ -44,4 +51,14 @@ class TaskInDB(TaskBase):
     category: Optional[str] = None
 
 class Task(TaskInDB):
-    pass 
\ No newline at end of file
+    pass
+
+class TaskMove(BaseModel):
+    id: str
+    status: Optional[TaskStatus] = None
+    # Vecinas tras el movimiento; pueden ser tareas movidas antes en la misma sesión
+    after_id: Optional[str] = None
+    before_id: Optional[str] = None
+
+class TaskReorder(BaseModel):
+    moves: List[TaskMove]
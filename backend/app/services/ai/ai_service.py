@@ -4,7 +4,6 @@ import os
 from typing import Dict, List, Any, Optional, AsyncGenerator, Tuple
 from datetime import datetime
 from pydantic import BaseModel
-from openai import AsyncOpenAI
 from app.core.ai_config import (
     get_ai_settings,
     GOAL_DETECTION_PROMPT,
@@ -16,7 +15,8 @@ from app.core.ai_config import (
 )
 from app.schemas.ai import ChatMessage, MessageRole, StreamingResponse
 from app.schemas.goal import GoalMetadata
-import dotenv
+from app.services.ai.llm_gateway import llm_gateway
+from app.services.ai.response_cache import ai_response_cache
 
 # Configuración mejorada del logger
 logger = logging.getLogger(__name__)
@@ -42,55 +42,27 @@ console_handler.setFormatter(formatter)
 logger.addHandler(file_handler)
 logger.addHandler(console_handler)
 
+AI_ASSISTANT_TITLE = "SoulDream AI Assistant"
+
+class GoalPlanError(Exception):
+    """
+    Respuesta del modelo que no sirve como plan (no se cachea)
+    """
+
 class AIService:
     """
     Servicio para interactuar con la API de OpenRouter
     """
     def __init__(self):
         """
-        Inicializa el servicio con la configuración desde variables de entorno
-        """
-        self.api_key = None
-        self.api_key_source = None
-        self._initialize_api_key()
-        
-        self.base_url = get_ai_settings().OPENROUTER_BASE_URL
-        self.model = get_ai_settings().OPENROUTER_DEFAULT_MODEL
-        self.referer = get_ai_settings().OPENROUTER_REFERER
-            
-    def _initialize_api_key(self) -> None:
-        """
-        Inicializa la API key intentando diferentes fuentes
+        Usa la configuración y el cliente compartidos de llm_gateway
         """
-        # 1. Intentar desde .env
-        env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), '.env')
-        logger.info(f"Intentando cargar API key desde: {env_path}")
-        dotenv.load_dotenv(env_path)
-        
-        try:
-            with open(env_path, 'r') as f:
-                env_content = f.read()
-                for line in env_content.split('\n'):
-                    if line.startswith('OPENROUTER_API_KEY='):
-                        self.api_key = line.split('=', 1)[1].strip()
-                        self.api_key_source = '.env file'
-                        logger.info("API key encontrada en archivo .env")
-                        return
-        except Exception as e:
-            logger.error(f"Error leyendo archivo .env: {str(e)}")
-
-        # 2. Intentar desde settings
-        try:
-            settings_key = get_ai_settings().OPENROUTER_API_KEY
-            if settings_key:
-                self.api_key = settings_key
-                self.api_key_source = 'settings'
-                logger.info("API key encontrada en settings")
-                return
-        except Exception as e:
-            logger.error(f"Error obteniendo API key desde settings: {str(e)}")
+        self.gateway = llm_gateway
+        self.model = llm_gateway.default_model
 
-        logger.error("No se encontró API key en ninguna fuente")
+    @property
+    def api_key(self) -> Optional[str]:
+        return self.gateway.api_key
 
     def check_api_key_status(self) -> Tuple[bool, str]:
         """
@@ -99,30 +71,7 @@ class AIService:
         Returns:
             Tuple[bool, str]: (está_configurada, mensaje_de_estado)
         """
-        if not self.api_key:
-            return False, "API key no configurada"
-        
-        return True, f"API key configurada (fuente: {self.api_key_source})"
-
-    async def _create_client(self) -> AsyncOpenAI:
-        """
-        Crea un cliente de OpenAI con la configuración correcta
-        """
-        is_configured, status = self.check_api_key_status()
-        if not is_configured:
-            raise ValueError(status)
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": self.referer,
-            "X-Title": "SoulDream AI Assistant"
-        }
-        
-        return AsyncOpenAI(
-            api_key="ANON",
-            base_url=self.base_url,
-            default_headers=headers
-        )
+        return self.gateway.check_api_key_status()
 
     async def _send_request(self, messages: List[Dict[str, str]], temperature: float = 0.7, max_tokens: int = 800, stream: bool = False) -> Any:
         """
@@ -130,66 +79,59 @@ class AIService:
         """
         if not self.api_key:
             raise ValueError("OpenRouter API key no configurada")
-            
-        client = await self._create_client()
-        
-        try:
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream,
-                extra_body={
-                    "provider": {
-                        "order": ["Groq", "Fireworks"],
-                        "allow_fallbacks": False
-                    }
-                }
-            )
-            
-            return response
-        except Exception as e:
-            logger.error(f"Error en OpenRouter API: {str(e)}")
-            raise
-        finally:
-            await client.close()
+
+        return await self.gateway.chat_completion(
+            messages,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=stream,
+            title=AI_ASSISTANT_TITLE
+        )
 
     async def detect_goal_from_message(self, message: str) -> Optional[Dict[str, Any]]:
         """
-        Detecta si un mensaje contiene una meta
+        Detecta si un mensaje contiene una meta (cacheado: temperatura baja)
         """
         try:
-            messages = [
-                {"role": "system", "content": GOAL_DETECTION_PROMPT},
-                {"role": "user", "content": message}
-            ]
-            
-            response = await self._send_request(
-                messages=messages,
-                temperature=get_ai_settings().TEMPERATURE_GOAL_DETECTION,
-                max_tokens=get_ai_settings().MAX_TOKENS_GOAL_DETECTION
-            )
-            
-            if response and response.choices:
-                content = response.choices[0].message.content.strip()
+            temperature = get_ai_settings().TEMPERATURE_GOAL_DETECTION
+            max_tokens = get_ai_settings().MAX_TOKENS_GOAL_DETECTION
+
+            async def detect() -> Optional[Dict[str, Any]]:
+                messages = [
+                    {"role": "system", "content": GOAL_DETECTION_PROMPT},
+                    {"role": "user", "content": message}
+                ]
                 
-                try:
-                    data = json.loads(content)
-                    logger.info("Meta detectada y parseada correctamente")
-                    return data
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error parseando respuesta JSON: {str(e)}")
-                    return None
-            
-            return None
+                response = await self._send_request(
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                
+                if response and response.choices:
+                    content = response.choices[0].message.content.strip()
+                    
+                    try:
+                        data = json.loads(content)
+                        logger.info("Meta detectada y parseada correctamente")
+                        return data
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Error parseando respuesta JSON: {str(e)}")
+                        return None
+                
+                return None
+
+            return await ai_response_cache.get_or_call(
+                self.model, GOAL_DETECTION_PROMPT, message, temperature, detect, max_tokens=max_tokens
+            )
         except Exception as e:
             logger.error(f"Error detectando meta: {str(e)}")
             return None
 
     async def generate_goal_plan(self, goal_metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Genera un plan detallado para una meta
+        Genera un plan detallado para una meta (cacheado: temperatura baja)
         """
         try:
             if not goal_metadata.get("has_goal", False) or "goal" not in goal_metadata:
@@ -197,30 +139,40 @@ class AIService:
                 return {"error": "No hay información de meta válida"}
                 
             goal = goal_metadata["goal"]
-            
-            messages = [
-                {"role": "system", "content": GOAL_PLAN_PROMPT},
-                {"role": "user", "content": json.dumps(goal)}
-            ]
-            
-            response = await self._send_request(
-                messages=messages,
-                temperature=get_ai_settings().TEMPERATURE_GOAL_PLAN,
-                max_tokens=get_ai_settings().MAX_TOKENS_GOAL_PLAN
-            )
-            
-            if response and response.choices:
-                content = response.choices[0].message.content.strip()
+            temperature = get_ai_settings().TEMPERATURE_GOAL_PLAN
+            max_tokens = get_ai_settings().MAX_TOKENS_GOAL_PLAN
+
+            async def plan() -> Dict[str, Any]:
+                messages = [
+                    {"role": "system", "content": GOAL_PLAN_PROMPT},
+                    {"role": "user", "content": json.dumps(goal)}
+                ]
                 
-                try:
-                    data = json.loads(content)
-                    logger.info("Plan generado correctamente")
-                    return data
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error parseando respuesta JSON: {str(e)}")
-                    return {"error": f"Error procesando respuesta: {str(e)}"}
-            
-            return {"error": "No se pudo generar el plan"}
+                response = await self._send_request(
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                
+                if response and response.choices:
+                    content = response.choices[0].message.content.strip()
+                    
+                    try:
+                        data = json.loads(content)
+                        logger.info("Plan generado correctamente")
+                        return data
+                    except json.JSONDecodeError as e:
+                        logger.error(f"Error parseando respuesta JSON: {str(e)}")
+                        raise GoalPlanError(f"Error procesando respuesta: {str(e)}")
+                
+                raise GoalPlanError("No se pudo generar el plan")
+
+            # Los que esperan la misma llamada en curso reciben la misma excepción
+            return await ai_response_cache.get_or_call(
+                self.model, GOAL_PLAN_PROMPT, goal, temperature, plan, max_tokens=max_tokens
+            )
+        except GoalPlanError as e:
+            return {"error": str(e)}
         except Exception as e:
             logger.error(f"Error generando plan: {str(e)}")
             return {"error": f"Error generando plan: {str(e)}"}
@@ -240,31 +192,23 @@ class AIService:
                 )
                 return
 
-            # Formatear mensajes
+            # Formatear mensajes; el prompt de sistema solo se añade si no viene ya en el contexto
             formatted_messages = [
-                {"role": "system", "content": CHAT_SYSTEM_PROMPT}
-            ] + [
                 {"role": msg.role, "content": msg.content}
                 for msg in messages
             ]
-            
-            # Crear cliente
-            client = await self._create_client()
+            if not formatted_messages or formatted_messages[0]["role"] != MessageRole.SYSTEM:
+                formatted_messages.insert(0, {"role": "system", "content": CHAT_SYSTEM_PROMPT})
             
             try:
                 # Obtener respuesta streaming
-                response = await client.chat.completions.create(
+                response = await self.gateway.chat_completion(
+                    formatted_messages,
                     model=self.model,
-                    messages=formatted_messages,
                     temperature=get_ai_settings().TEMPERATURE_CHAT,
                     max_tokens=get_ai_settings().MAX_TOKENS_RESPONSE,
                     stream=True,
-                    extra_body={
-                        "provider": {
-                            "order": ["Groq", "Fireworks"],
-                            "allow_fallbacks": False
-                        }
-                    }
+                    title=AI_ASSISTANT_TITLE
                 )
                 
                 async for chunk in response:
@@ -292,8 +236,6 @@ class AIService:
                     is_error=True,
                     is_complete=True
                 )
-            finally:
-                await client.close()
                 
         except Exception as e:
             logger.error(f"Error general en chat_stream: {str(e)}")
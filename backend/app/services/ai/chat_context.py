@@ -0,0 +1,121 @@
+"""
+Contexto de las conversaciones con presupuesto de tokens.
+
+Se leen los CHAT_CONTEXT_MAX_MESSAGES mensajes más recientes de la
+conversación y se empaqueta el prompt de sistema, el mensaje actual y tanto
+historial reciente como quepa en CHAT_CONTEXT_MAX_TOKENS. Los tokens se
+cuentan con tiktoken; los modelos de OpenRouter usan otros tokenizadores, así
+que el recuento es una aproximación que basta para acotar coste y latencia.
+"""
+from typing import Any, Dict, List, Optional
+import logging
+
+import tiktoken
+
+from app.core.ai_config import get_ai_settings
+from app.db.async_client import get_async_service_client
+from app.schemas.ai import ChatMessage, MessageRole
+from app.utils.pagination import order_by_key
+
+logger = logging.getLogger(__name__)
+
+# Tokens de formato por mensaje (rol y separadores) y para iniciar la respuesta
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# Caracteres por token cuando no se puede cargar la codificación
+CHARS_PER_TOKEN = 4
+
+class TokenCounter:
+    """
+    Cuenta tokens con la codificación de tiktoken, cargada una vez. tiktoken
+    descarga el fichero BPE la primera vez: si no está disponible se estima
+    por longitud en lugar de fallar la petición.
+    """
+    def __init__(self, encoding_name: str):
+        self.encoding_name = encoding_name
+        self._encoding: Optional[Any] = None
+        self._unavailable = False
+
+    def _get_encoding(self) -> Optional[Any]:
+        if self._encoding is None and not self._unavailable:
+            try:
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                self._unavailable = True
+                logger.warning(f"Codificación {self.encoding_name} no disponible, se estimarán los tokens: {e}")
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, message: ChatMessage) -> int:
+        return TOKENS_PER_MESSAGE + self.count(message.content)
+
+token_counter = TokenCounter(get_ai_settings().CHAT_CONTEXT_ENCODING)
+
+def build_chat_context(
+    system_prompt: str,
+    history: List[ChatMessage],
+    current: ChatMessage,
+    max_tokens: int,
+    counter: TokenCounter = token_counter
+) -> List[ChatMessage]:
+    """
+    [sistema, historial reciente en orden cronológico..., mensaje actual]. El
+    historial se recorre del más nuevo al más antiguo y se corta en el primer
+    mensaje que ya no cabe, así que nunca quedan huecos en la conversación.
+    El sistema y el mensaje actual se incluyen siempre.
+    """
+    system = ChatMessage(role=MessageRole.SYSTEM, content=system_prompt)
+    used = TOKENS_PER_REPLY + counter.count_message(system) + counter.count_message(current)
+
+    recent: List[ChatMessage] = []
+    for message in reversed(history):
+        tokens = counter.count_message(message)
+        if used + tokens > max_tokens:
+            break
+        used += tokens
+        recent.append(message)
+
+    logger.debug(f"Contexto de chat: {len(recent)}/{len(history)} mensajes previos, ~{used} tokens")
+    return [system, *reversed(recent), current]
+
+def _to_chat_message(row: Dict[str, Any]) -> ChatMessage:
+    return ChatMessage(
+        role=MessageRole.USER if row["sender"] == "user" else MessageRole.ASSISTANT,
+        content=row["content"] or ""
+    )
+
+async def fetch_recent_messages(
+    conversation_id: str,
+    limit: int,
+    exclude_id: Optional[str] = None
+) -> List[ChatMessage]:
+    """
+    Los `limit` mensajes más recientes de la conversación, en orden cronológico
+    """
+    query = get_async_service_client().table("messages") \
+        .select("id, sender, content, created_at") \
+        .eq("conversation_id", conversation_id)
+    if exclude_id:
+        query = query.neq("id", exclude_id)
+    result = await order_by_key(query, "created_at", desc=True).limit(limit).execute()
+    return [_to_chat_message(row) for row in reversed(result.data or [])]
+
+async def build_conversation_context(
+    conversation_id: str,
+    system_prompt: str,
+    current: ChatMessage,
+    exclude_id: Optional[str] = None
+) -> List[ChatMessage]:
+    """
+    Contexto para responder a `current`; `exclude_id` es el id con el que ya se
+    guardó el mensaje actual, para no enviarlo dos veces
+    """
+    ai_settings = get_ai_settings()
+    history = await fetch_recent_messages(conversation_id, ai_settings.CHAT_CONTEXT_MAX_MESSAGES, exclude_id)
+    return build_chat_context(system_prompt, history, current, ai_settings.CHAT_CONTEXT_MAX_TOKENS)
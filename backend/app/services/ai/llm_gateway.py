@@ -0,0 +1,123 @@
+"""
+Pasarela única hacia OpenRouter para todo el proceso.
+
+La configuración (API key, URL, referer) se lee una vez y todas las llamadas
+comparten un AsyncOpenAI sobre un httpx.AsyncClient con conexiones keep-alive,
+así que solo la primera petición paga el handshake TLS. Cada llamada lleva su
+propio timeout (REQUEST_TIMEOUT_SECONDS por defecto). El cliente se cierra en
+el lifespan de la aplicación.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from httpx import AsyncClient, Limits, Timeout
+from openai import AsyncOpenAI
+
+from app.core.ai_config import get_ai_settings
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class LLMGateway:
+    def __init__(self):
+        ai_settings = get_ai_settings()
+        self.base_url = ai_settings.OPENROUTER_BASE_URL
+        self.default_model = ai_settings.OPENROUTER_DEFAULT_MODEL
+        self.referer = ai_settings.OPENROUTER_REFERER
+        self.timeout = ai_settings.REQUEST_TIMEOUT_SECONDS
+        self.limits = Limits(
+            max_connections=ai_settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=ai_settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=ai_settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+
+        # AISettings ya lee el .env del backend; settings queda como respaldo
+        if ai_settings.OPENROUTER_API_KEY:
+            self.api_key, self.api_key_source = ai_settings.OPENROUTER_API_KEY, "ai_settings"
+        elif settings.OPENROUTER_API_KEY:
+            self.api_key, self.api_key_source = settings.OPENROUTER_API_KEY, "settings"
+        else:
+            self.api_key, self.api_key_source = None, None
+            logger.error("No se encontró la API key de OpenRouter")
+
+        self._client: Optional[AsyncOpenAI] = None
+
+    def check_api_key_status(self) -> Tuple[bool, str]:
+        """
+        (está_configurada, mensaje_de_estado)
+        """
+        if not self.api_key:
+            return False, "API key no configurada"
+        return True, f"API key configurada (fuente: {self.api_key_source})"
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        """
+        Cliente compartido, creado en la primera llamada
+        """
+        if self._client is None:
+            is_configured, status = self.check_api_key_status()
+            if not is_configured:
+                raise ValueError(status)
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                default_headers={"HTTP-Referer": self.referer},
+                timeout=self.timeout,
+                http_client=AsyncClient(limits=self.limits, timeout=Timeout(self.timeout)),
+            )
+        return self._client
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 800,
+        stream: bool = False,
+        title: Optional[str] = None,
+        referer: Optional[str] = None,
+        allow_fallbacks: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        chat.completions.create sobre el cliente compartido. `title` y `referer`
+        identifican a la aplicación que llama en OpenRouter
+        """
+        headers: Dict[str, str] = {}
+        if title:
+            headers["X-Title"] = title
+        if referer:
+            headers["HTTP-Referer"] = referer
+
+        try:
+            return await self.client.chat.completions.create(
+                model=model or self.default_model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                timeout=timeout or self.timeout,
+                extra_headers=headers or None,
+                extra_body={
+                    "provider": {
+                        "order": ["Groq", "Fireworks"],
+                        "allow_fallbacks": allow_fallbacks
+                    }
+                }
+            )
+        except Exception as e:
+            logger.error(f"Error en OpenRouter API: {str(e)}")
+            raise
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        try:
+            await self._client.close()
+        except Exception as e:
+            logger.error(f"Error al cerrar el cliente de OpenRouter: {e}")
+        self._client = None
+
+llm_gateway = LLMGateway()
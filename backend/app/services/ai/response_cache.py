@@ -0,0 +1,158 @@
+"""
+Caché de respuestas para llamadas de IA con temperatura baja.
+
+Detección de metas, planes de metas y planes de entrenamiento reciben a menudo
+la misma entrada (o la misma salvo mayúsculas y espacios) y cada llamada a
+OpenRouter tarda segundos. La clave es un hash de (modelo, plantilla del
+prompt, parámetros, entrada normalizada, temperatura): cambiar el prompt
+invalida sus entradas. Solo se guardan resultados ya validados; un error o
+una respuesta no interpretable no se cachea.
+
+Las entradas viven en un TTLCache (LRU + TTL). Con AI_RESPONSE_CACHE_PATH se
+vuelcan a un JSON al apagar y se recargan al arrancar con su vida restante.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+import unicodedata
+
+from app.core.ai_config import get_ai_settings
+from app.core.identity_cache import TTLCache
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+PERSISTENCE_FORMAT_VERSION = 1
+
+def normalize_input(value: Any) -> str:
+    """
+    Texto canónico de la entrada: Unicode NFC, minúsculas y espacios colapsados;
+    los dicts y listas se serializan con las claves ordenadas
+    """
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    value = unicodedata.normalize("NFC", value).casefold()
+    return " ".join(value.split())
+
+def cache_key(model: str, template: str, user_input: Any, temperature: float, **params: Any) -> str:
+    payload = json.dumps(
+        [model, template, normalize_input(user_input), round(float(temperature), 3), sorted(params.items())],
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class AIResponseCache:
+    def __init__(self, maxsize: int, ttl: float, max_temperature: float, path: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.max_temperature = max_temperature
+        self.path = path or None
+        self._responses = TTLCache(maxsize, ttl)
+        self._calls = SingleFlight("ai_response")
+        self.bypassed = 0
+        self.stored = 0
+
+    def cacheable(self, temperature: float) -> bool:
+        return self.enabled and temperature <= self.max_temperature
+
+    async def get_or_call(
+        self,
+        model: str,
+        template: str,
+        user_input: Any,
+        temperature: float,
+        call: Callable[[], Awaitable[Any]],
+        **params: Any
+    ) -> Any:
+        """
+        Resultado cacheado para la clave o el de `call()`. `call` debe lanzar una
+        excepción o devolver None cuando la respuesta no sirve, y devolver un
+        valor serializable en JSON cuando sí. Las llamadas idénticas en curso se
+        comparten.
+        """
+        if not self.cacheable(temperature):
+            self.bypassed += 1
+            return await call()
+
+        key = cache_key(model, template, user_input, temperature, **params)
+        cached = self._responses.get(key)
+        if cached is not None:
+            # Copia: quien llama puede modificar el dict devuelto
+            return copy.deepcopy(cached)
+
+        async def load() -> Any:
+            result = await call()
+            if result is not None:
+                self._responses.set(key, result)
+                self.stored += 1
+            return result
+
+        return copy.deepcopy(await self._calls.do(key, load))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._responses.stats(),
+            "enabled": self.enabled,
+            "bypassed": self.bypassed,
+            "stored": self.stored,
+            "calls": self._calls.stats(),
+        }
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+    def save(self) -> int:
+        """
+        Vuelca las entradas vigentes a `path` (escritura atómica). Devuelve cuántas
+        """
+        if not self.path:
+            return 0
+        now = time.time()
+        entries = [[key, value, now + remaining] for key, value, remaining in self._responses.snapshot()]
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": PERSISTENCE_FORMAT_VERSION, "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"No se pudo guardar la caché de respuestas de IA en {self.path}: {e}")
+            return 0
+        logger.info(f"Caché de respuestas de IA guardada: {len(entries)} entradas")
+        return len(entries)
+
+    def load(self) -> int:
+        """
+        Carga las entradas no caducadas de `path`. Devuelve cuántas
+        """
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer la caché de respuestas de IA de {self.path}: {e}")
+            return 0
+        if data.get("version") != PERSISTENCE_FORMAT_VERSION:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for key, value, expires_at in data.get("entries", []):
+            if expires_at > now:
+                self._responses.set(key, value, expires_at - now)
+                loaded += 1
+        logger.info(f"Caché de respuestas de IA cargada: {loaded} entradas")
+        return loaded
+
+ai_response_cache = AIResponseCache(
+    maxsize=get_ai_settings().AI_RESPONSE_CACHE_MAX_SIZE,
+    ttl=get_ai_settings().AI_RESPONSE_CACHE_TTL_SECONDS,
+    max_temperature=get_ai_settings().AI_RESPONSE_CACHE_MAX_TEMPERATURE,
+    path=get_ai_settings().AI_RESPONSE_CACHE_PATH,
+    enabled=get_ai_settings().AI_RESPONSE_CACHE_ENABLED,
+)
@@ -6,6 +6,8 @@ from fastapi.security import OAuth2PasswordBearer
 from pydantic import ValidationError
 
 from app.core.config import settings
+from app.core.identity_cache import identity_cache, identity_resolutions
+from starlette.concurrency import run_in_threadpool
 from app.db.database import get_supabase_client
 from app.schemas.user import User, TokenPayload
 from app.utils.security import verify_password
@@ -51,19 +53,49 @@ async def authenticate_user(email: str, password: str) -> Optional[User]:
         print(f"Error de autenticación: {e}")
         return None
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+def get_or_create_profile(supabase, user) -> dict:
     """
-    Obtiene el usuario actual a partir del token JWT de Supabase
+    Obtiene el perfil del usuario, creándolo si no existe
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="No se pudieron validar las credenciales",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    profile_response = supabase.table("profiles").select("*").eq("id", user.id).execute()
     
-    if not token:
-        raise credentials_exception
+    if profile_response.data:
+        profile = profile_response.data[0]
+        identity_cache.set_profile(user.id, profile)
+        return profile
     
+    # Intenta crear un perfil básico para el usuario
+    try:
+        supabase.table("profiles").insert({
+            "id": user.id,
+            "full_name": user.user_metadata.get("full_name") if user.user_metadata else "",
+            "email": user.email,
+            "avatar_url": "",
+            "email_notifications": True,
+            "subscription_tier": "free",
+        }).execute()
+        
+        # Obtener el perfil recién creado
+        profile_response = supabase.table("profiles").select("*").eq("id", user.id).execute()
+        if profile_response.data:
+            profile = profile_response.data[0]
+            identity_cache.set_profile(user.id, profile)
+            return profile
+    except Exception as e:
+        print(f"Error al crear perfil: {e}")
+    
+    # Si no se puede crear el perfil, usar datos básicos
+    return {
+        "full_name": user.user_metadata.get("full_name") if user.user_metadata else "",
+        "avatar_url": "",
+        "email_notifications": True,
+        "subscription_tier": "free",
+    }
+
+def resolve_user(token: str, credentials_exception: HTTPException) -> User:
+    """
+    Valida el token con Supabase y construye el usuario (llamadas síncronas)
+    """
     # Obtener el usuario de la base de datos usando el token de Supabase directamente
     supabase = get_supabase_client()
     
@@ -74,36 +106,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         
         if not user:
             raise credentials_exception
+        identity_cache.mark_revalidated(token)
         
         # Obtener datos del perfil
-        profile_response = supabase.table("profiles").select("*").eq("id", user.id).execute()
-        
-        if not profile_response.data:
-            # Intenta crear un perfil básico para el usuario
-            try:
-                supabase.table("profiles").insert({
-                    "id": user.id,
-                    "full_name": user.user_metadata.get("full_name") if user.user_metadata else "",
-                    "email": user.email,
-                    "avatar_url": "",
-                    "email_notifications": True,
-                    "subscription_tier": "free",
-                }).execute()
-                
-                # Obtener el perfil recién creado
-                profile_response = supabase.table("profiles").select("*").eq("id", user.id).execute()
-                if not profile_response.data:
-                    raise credentials_exception
-            except:
-                # Si no se puede crear el perfil, usar datos básicos
-                profile = {
-                    "full_name": user.user_metadata.get("full_name") if user.user_metadata else "",
-                    "avatar_url": "",
-                    "email_notifications": True,
-                    "subscription_tier": "free",
-                }
-        else:
-            profile = profile_response.data[0]
+        profile = identity_cache.get_profile(user.id)
+        if profile is None:
+            profile = get_or_create_profile(supabase, user)
         
         # Crear objeto de usuario
         user_data = {
@@ -117,7 +125,33 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
             "updated_at": profile.get("updated_at")
         }
         
-        return User(**user_data)
+        current_user = User(**user_data)
+        identity_cache.set_user(token, current_user)
+        return current_user
     except Exception as e:
         print(f"Error al obtener usuario: {e}")
         raise credentials_exception
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """
+    Obtiene el usuario actual a partir del token JWT de Supabase
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="No se pudieron validar las credenciales",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    if not token:
+        raise credentials_exception
+    
+    # Usuario ya resuelto para este token (caché compartida de identidad)
+    cached_user = identity_cache.get_user(token)
+    if cached_user is not None:
+        return cached_user
+    
+    # Peticiones concurrentes con el mismo token comparten una sola resolución
+    return await identity_resolutions.do(
+        ("services.auth", token),
+        lambda: run_in_threadpool(resolve_user, token, credentials_exception)
+    )
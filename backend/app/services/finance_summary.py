@@ -0,0 +1,247 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.identity_cache import TTLCache
+from app.core.resource_versions import resource_versions
+from app.core.singleflight import SingleFlight
+from app.db import pg_pool
+from app.db.database import get_supabase_client, run_query
+from app.schemas.finance import FinanceCategoryTotal, FinanceMonthSummary, FinanceSummary
+from app.utils.pagination import order_by_key
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de página al leer transacciones por PostgREST (límite por defecto)
+SUMMARY_PAGE_SIZE = 1000
+
+# Columnas necesarias para el resumen: no se leen descripciones ni metadatos
+SUMMARY_COLUMNS = "date, type, category, amount"
+
+def _month_index(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[M]")
+
+def group_transactions(
+    rows: Iterable[Dict[str, Any]],
+    from_date: date,
+    to_date: date
+) -> Tuple[float, List[Dict[str, Any]]]:
+    """
+    Agrega transacciones en bruto con NumPy: (saldo anterior a `from_date`,
+    totales por mes, categoría y tipo dentro del rango)
+    """
+    days, types, categories, amounts = [], [], [], []
+    for row in rows:
+        days.append(str(row["date"])[:10])
+        types.append(row["type"])
+        categories.append(row.get("category") or "")
+        amounts.append(row["amount"] or 0)
+
+    if not days:
+        return 0.0, []
+
+    days_arr = np.array(days, dtype="datetime64[D]")
+    amounts_arr = np.array(amounts, dtype=np.float64)
+    is_income = np.array(types) == "income"
+    signed = np.where(is_income, amounts_arr, -amounts_arr)
+
+    before = days_arr < np.datetime64(from_date, "D")
+    opening_balance = float(signed[before].sum())
+
+    in_range = ~before & (days_arr <= np.datetime64(to_date, "D"))
+    months = _month_index(days_arr[in_range])
+    group_keys = np.rec.fromarrays(
+        [months.astype(np.int64), np.array(categories, dtype=object)[in_range].astype(str), is_income[in_range]],
+        names="month,category,income"
+    )
+    if not len(group_keys):
+        return opening_balance, []
+
+    unique_keys, inverse = np.unique(group_keys, return_inverse=True)
+    totals = np.bincount(inverse, weights=amounts_arr[in_range], minlength=len(unique_keys))
+    counts = np.bincount(inverse, minlength=len(unique_keys))
+
+    groups = [
+        {
+            "month": str(np.datetime64(int(key.month), "M")),
+            "category": key.category,
+            "type": "income" if key.income else "expense",
+            "total": float(total),
+            "count": int(count),
+        }
+        for key, total, count in zip(unique_keys, totals, counts)
+    ]
+    return opening_balance, groups
+
+def build_summary(
+    opening_balance: float,
+    groups: Iterable[Dict[str, Any]],
+    from_date: date,
+    to_date: date
+) -> FinanceSummary:
+    """
+    Resumen a partir de los totales agrupados (de NumPy o de SQL): meses del
+    rango con saldo acumulado y desglose por categoría
+    """
+    month_range = np.arange(
+        np.datetime64(from_date, "M"), np.datetime64(to_date, "M") + 1, dtype="datetime64[M]"
+    )
+    month_position = {str(month): i for i, month in enumerate(month_range)}
+    income = np.zeros(len(month_range))
+    expense = np.zeros(len(month_range))
+    categories: Dict[Tuple[str, str], List[float]] = {}
+
+    for group in groups:
+        position = month_position.get(group["month"])
+        if position is None:
+            continue
+        total = float(group["total"])
+        if group["type"] == "income":
+            income[position] += total
+        else:
+            expense[position] += total
+        category = categories.setdefault((group["category"], group["type"]), [0.0, 0])
+        category[0] += total
+        category[1] += int(group["count"])
+
+    net = income - expense
+    balance = opening_balance + np.cumsum(net)
+
+    return FinanceSummary(
+        from_date=from_date,
+        to_date=to_date,
+        opening_balance=round(opening_balance, 2),
+        closing_balance=round(float(balance[-1]) if len(balance) else opening_balance, 2),
+        income=round(float(income.sum()), 2),
+        expense=round(float(expense.sum()), 2),
+        months=[
+            FinanceMonthSummary(
+                month=str(month),
+                income=round(float(month_income), 2),
+                expense=round(float(month_expense), 2),
+                net=round(float(month_net), 2),
+                balance=round(float(month_balance), 2),
+            )
+            for month, month_income, month_expense, month_net, month_balance
+            in zip(month_range, income, expense, net, balance)
+        ],
+        categories=sorted(
+            (
+                FinanceCategoryTotal(category=category, type=kind, total=round(total, 2), count=count)
+                for (category, kind), (total, count) in categories.items()
+            ),
+            key=lambda item: (item.type, -item.total, item.category)
+        ),
+    )
+
+def _end_exclusive(to_date: date) -> date:
+    # `date` es timestamptz: el rango incluye todo el día to_date, no solo su medianoche
+    return to_date + timedelta(days=1)
+
+async def _grouped_from_sql(user_id: str, from_date: date, to_date: date) -> Tuple[float, List[Dict[str, Any]]]:
+    opening_balance = await pg_pool.fetchval(
+        "SELECT COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END), 0)"
+        " FROM transactions WHERE user_id = $1 AND is_deleted = false AND date < $2::date",
+        user_id,
+        from_date,
+    )
+    groups = await pg_pool.fetch(
+        "SELECT to_char(date_trunc('month', date), 'YYYY-MM') AS month,"
+        " COALESCE(category, '') AS category, type, SUM(amount) AS total, COUNT(*) AS count"
+        " FROM transactions WHERE user_id = $1 AND is_deleted = false AND date >= $2::date AND date < $3::date"
+        " GROUP BY 1, 2, 3",
+        user_id,
+        from_date,
+        _end_exclusive(to_date),
+    )
+    return float(opening_balance or 0), groups
+
+async def _grouped_from_postgrest(user_id: str, from_date: date, to_date: date) -> Tuple[float, List[Dict[str, Any]]]:
+    # Sin agregados en PostgREST: se leen solo las columnas necesarias hasta to_date.
+    # El orden lleva id de desempate para que las páginas no se solapen; en
+    # postgrest-py el final de range() es exclusivo.
+    supabase = get_supabase_client()
+    rows: List[Dict[str, Any]] = []
+    while True:
+        query = supabase.table("transactions") \
+            .select(SUMMARY_COLUMNS) \
+            .eq("user_id", user_id) \
+            .eq("is_deleted", False) \
+            .lt("date", _end_exclusive(to_date).isoformat())
+        response = await run_query(
+            order_by_key(query, "date").range(len(rows), len(rows) + SUMMARY_PAGE_SIZE)
+        )
+        rows.extend(response.data)
+        if len(response.data) < SUMMARY_PAGE_SIZE:
+            break
+    return group_transactions(rows, from_date, to_date)
+
+async def fetch_transactions_stamp(user_id: str) -> Tuple[int, Optional[str]]:
+    """
+    Sello (número de filas, último updated_at) de las transacciones del
+    usuario. Cambia con las escrituras que no pasan por el backend (el frontend
+    inserta, edita y borra directamente en Supabase): el trigger de
+    20250606000000_transactions_updated_at_trigger.sql mantiene updated_at.
+    """
+    if pg_pool.pg_pool_available():
+        row = await pg_pool.fetchrow(
+            "SELECT COUNT(*) AS count, MAX(updated_at) AS updated_at FROM transactions WHERE user_id = $1",
+            user_id,
+        )
+        return int(row["count"]), str(row["updated_at"]) if row["updated_at"] else None
+    query = get_supabase_client().table("transactions") \
+        .select("updated_at", count="exact").eq("user_id", user_id)
+    # postgrest-py no expone nullslast: en DESC los NULL irían primero
+    query.params = query.params.add("order", "updated_at.desc.nullslast")
+    response = await run_query(query.limit(1))
+    updated_at = response.data[0]["updated_at"] if response.data else None
+    return response.count or 0, str(updated_at) if updated_at else None
+
+class FinanceSummaryCache:
+    """
+    Resúmenes por (usuario, rango). La clave incluye la versión de las
+    transacciones del usuario (app.core.resource_versions), así que las
+    escrituras del backend invalidan sus resúmenes sin recorrer la caché, y el
+    sello de la tabla (fetch_transactions_stamp) para las que hace el frontend.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self._summaries = TTLCache(maxsize, ttl)
+        self._loads = SingleFlight("finance_summary")
+
+    async def get_or_compute(self, user_id: str, from_date: date, to_date: date) -> FinanceSummary:
+        user_id = str(user_id)
+        key = (
+            user_id,
+            from_date,
+            to_date,
+            resource_versions.version(user_id, "transactions"),
+            await fetch_transactions_stamp(user_id),
+        )
+        summary = self._summaries.get(key)
+        if summary is not None:
+            return summary
+
+        async def compute() -> FinanceSummary:
+            if pg_pool.pg_pool_available():
+                opening_balance, groups = await _grouped_from_sql(user_id, from_date, to_date)
+            else:
+                opening_balance, groups = await _grouped_from_postgrest(user_id, from_date, to_date)
+            result = build_summary(opening_balance, groups, from_date, to_date)
+            self._summaries.set(key, result)
+            return result
+
+        return await self._loads.do(key, compute)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"summaries": self._summaries.stats(), "loads": self._loads.stats()}
+
+    def clear(self) -> None:
+        self._summaries.clear()
+
+finance_summaries = FinanceSummaryCache(
+    maxsize=settings.FINANCE_SUMMARY_CACHE_MAX_SIZE,
+    ttl=settings.FINANCE_SUMMARY_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,55 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+class HabitCompletionEngine:
+    """
+    Motor de analíticas de hábitos sobre arrays de NumPy.
+
+    Convierte los logs una sola vez en dos arrays paralelos (índice del hábito y
+    días transcurridos desde `today`) y los agrupa por (hábito, día) con unique
+    en lugar de recorrer los logs por hábito. Los rollups de
+    app.services.habit_rollups se construyen con esos conteos, y de ellos salen
+    el heatmap, los completados diarios y las tasas de los endpoints.
+    """
+    def __init__(
+        self,
+        habit_ids: Sequence[str],
+        logs: Iterable[Dict[str, Any]],
+        today: Optional[date] = None
+    ):
+        self.habit_ids = list(habit_ids)
+        self.today = np.datetime64(today or date.today(), "D")
+
+        habit_index = {habit_id: i for i, habit_id in enumerate(self.habit_ids)}
+        habit_idx = []
+        log_dates = []
+        for log in logs:
+            idx = habit_index.get(log["habit_id"])
+            if idx is not None:
+                habit_idx.append(idx)
+                # completed_date es DATE, pero se tolera un timestamp ISO
+                log_dates.append(str(log["completed_date"])[:10])
+
+        self.habit_idx = np.array(habit_idx, dtype=np.int64)
+        # Días transcurridos: 0 = hoy, 1 = ayer... (negativos si la fecha es futura)
+        self.days_ago = (self.today - np.array(log_dates, dtype="datetime64[D]")).astype(np.int64)
+
+    def dates(self, days_ago: np.ndarray) -> List[str]:
+        """
+        Convierte desplazamientos en días a fechas ISO
+        """
+        return np.datetime_as_string(self.today - days_ago.astype("timedelta64[D]"), unit="D").tolist()
+
+    def habit_day_counts(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Logs agrupados por (hábito, día), ordenados por fecha y, a igual fecha,
+        por el orden de `habit_ids`. Devuelve (índices de hábito, días, conteos).
+        """
+        n_habits = max(len(self.habit_ids), 1)
+        # Fecha ascendente = days_ago descendente
+        keys = -self.days_ago * n_habits + self.habit_idx
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        habit_idx = unique_keys % n_habits
+        days_ago = -(unique_keys - habit_idx) // n_habits
+        return habit_idx, days_ago, counts
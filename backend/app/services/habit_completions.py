@@ -0,0 +1,179 @@
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+import logging
+
+from app.db.database import get_service_client, run_query
+from app.utils.pagination import order_by_key
+
+logger = logging.getLogger(__name__)
+
+# 366 bits por año (día del año 0..365) -> 46 bytes
+BYTES_PER_YEAR = 46
+
+# Tamaño de página al leer habit_logs (límite por defecto de PostgREST)
+LOGS_PAGE_SIZE = 1000
+
+def _to_date(value: Union[str, date]) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _year_start(year: int) -> int:
+    return date(year, 1, 1).toordinal()
+
+class HabitCompletions:
+    """
+    Días completados de un hábito como un bitset por año (bit i = día i del año).
+
+    Las consultas (rachas, tasas, heatmaps) trabajan sobre un único entero que
+    concatena los años, así son operaciones de bits en lugar de recorrer fechas.
+    Se cargan desde habit_logs (fetch_user_logs) a través de los rollups de
+    app.services.habit_rollups, que los endpoints de logs mantienen al día.
+    """
+    def __init__(self, years: Optional[Mapping[int, int]] = None):
+        self._years: Dict[int, int] = {year: bits for year, bits in (years or {}).items() if bits}
+        self._combined: Optional[Tuple[int, int]] = None
+
+    @classmethod
+    def from_dates(cls, days: Iterable[Union[str, date]]) -> "HabitCompletions":
+        completions = cls()
+        for day in days:
+            day = _to_date(day)
+            completions._years[day.year] = completions._years.get(day.year, 0) | completions._bit(day)
+        return completions
+
+    @classmethod
+    def from_bytes(cls, years: Mapping[int, bytes]) -> "HabitCompletions":
+        return cls({year: int.from_bytes(data, "little") for year, data in years.items()})
+
+    def to_bytes(self) -> Dict[int, bytes]:
+        """
+        Representación compacta: BYTES_PER_YEAR bytes por año con algún completado
+        """
+        return {year: bits.to_bytes(BYTES_PER_YEAR, "little") for year, bits in sorted(self._years.items())}
+
+    def add(self, day: Union[str, date]) -> bool:
+        """
+        Marca el día como completado. Devuelve False si ya lo estaba.
+        """
+        day = _to_date(day)
+        if day in self:
+            return False
+        self._years[day.year] = self._years.get(day.year, 0) | self._bit(day)
+        self._combined = None
+        return True
+
+    def remove(self, day: Union[str, date]) -> bool:
+        day = _to_date(day)
+        if day not in self:
+            return False
+        bits = self._years[day.year] & ~self._bit(day)
+        if bits:
+            self._years[day.year] = bits
+        else:
+            del self._years[day.year]
+        self._combined = None
+        return True
+
+    def __contains__(self, day: Union[str, date]) -> bool:
+        day = _to_date(day)
+        return bool(self._years.get(day.year, 0) & self._bit(day))
+
+    def __len__(self) -> int:
+        return sum(bits.bit_count() for bits in self._years.values())
+
+    def dates(self) -> List[date]:
+        origin, bits = self._bits()
+        days = []
+        while bits:
+            low = bits & -bits
+            days.append(date.fromordinal(origin + low.bit_length() - 1))
+            bits ^= low
+        return days
+
+    def count(self, start: date, end: date) -> int:
+        """
+        Días completados entre `start` y `end`, ambos incluidos
+        """
+        origin, bits = self._bits()
+        lo = max(start.toordinal() - origin, 0)
+        hi = end.toordinal() - origin
+        if hi < lo:
+            return 0
+        return ((bits >> lo) & ((1 << (hi - lo + 1)) - 1)).bit_count()
+
+    def rate(self, end: date, days: int) -> float:
+        """
+        Porcentaje de días completados en los `days` días que terminan en `end`
+        """
+        start = date.fromordinal(end.toordinal() - days + 1)
+        return self.count(start, end) / days * 100 if days > 0 else 0.0
+
+    def current_streak(self, today: Optional[date] = None) -> int:
+        """
+        Días consecutivos completados que terminan hoy o, si hoy aún no, ayer
+        """
+        origin, bits = self._bits()
+        today_index = (today or date.today()).toordinal() - origin
+        for anchor in (today_index, today_index - 1):
+            if anchor >= 0 and bits >> anchor & 1:
+                # Bits a cero por debajo del ancla: el más alto marca el fin de la racha
+                gaps = ~bits & ((1 << (anchor + 1)) - 1)
+                return anchor + 1 - gaps.bit_length()
+        return 0
+
+    def best_streak(self) -> int:
+        """
+        Racha más larga: cada `bits & (bits >> 1)` acorta todas las rachas en un día
+        """
+        _, bits = self._bits()
+        streak = 0
+        while bits:
+            bits &= bits >> 1
+            streak += 1
+        return streak
+
+    def heatmap(self, year: int) -> List[int]:
+        """
+        0/1 por cada día del año
+        """
+        days = date(year + 1, 1, 1).toordinal() - _year_start(year)
+        bits = self._years.get(year, 0)
+        return [bits >> i & 1 for i in range(days)]
+
+    def _bit(self, day: date) -> int:
+        return 1 << (day.toordinal() - _year_start(day.year))
+
+    def _bits(self) -> Tuple[int, int]:
+        # (ordinal del 1 de enero del primer año, bitset concatenado de todos los años)
+        if self._combined is None:
+            if not self._years:
+                self._combined = (0, 0)
+            else:
+                origin = _year_start(min(self._years))
+                combined = 0
+                for year, bits in self._years.items():
+                    combined |= bits << (_year_start(year) - origin)
+                self._combined = (origin, combined)
+        return self._combined
+
+async def fetch_user_logs(user_id: str, columns: str = "habit_id, completed_date") -> List[Dict[str, Any]]:
+    """
+    Lee todos los logs del usuario por páginas. El orden lleva id de desempate
+    para que las páginas no se solapen; en postgrest-py el final de range() es
+    exclusivo.
+    """
+    supabase_service = get_service_client()
+    logs: List[Dict[str, Any]] = []
+    while True:
+        query = supabase_service.table("habit_logs") \
+            .select(columns) \
+            .eq("user_id", user_id)
+        response = await run_query(
+            order_by_key(query, "completed_date").range(len(logs), len(logs) + LOGS_PAGE_SIZE)
+        )
+        logs.extend(response.data)
+        if len(response.data) < LOGS_PAGE_SIZE:
+            return logs
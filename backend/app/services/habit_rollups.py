@@ -0,0 +1,169 @@
+from datetime import date
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import logging
+
+from app.core.config import settings
+from app.core.identity_cache import TTLCache
+from app.core.singleflight import SingleFlight
+from app.services.habit_analytics import HabitCompletionEngine
+from app.services.habit_completions import HabitCompletions, fetch_user_logs
+
+logger = logging.getLogger(__name__)
+
+def _to_date(value: Union[str, date]) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+class HabitRollup:
+    """
+    Contadores de un hábito: completados por día y total. Las rachas se
+    calculan sobre el bitset de días completados (HabitCompletions).
+    """
+    def __init__(self):
+        self.daily: Dict[int, int] = {}
+        self.total = 0
+        self.completions = HabitCompletions()
+
+    def add(self, day: int, count: int = 1) -> None:
+        """
+        Registra `count` completados en el día `day` (ordinal)
+        """
+        self.total += count
+        if day in self.daily:
+            self.daily[day] += count
+            return
+        self.daily[day] = count
+        self.completions.add(date.fromordinal(day))
+
+    @property
+    def best_streak(self) -> int:
+        return self.completions.best_streak()
+
+    def current_streak(self, today: int) -> int:
+        """
+        Días consecutivos completados que terminan hoy o ayer
+        """
+        return self.completions.current_streak(date.fromordinal(today))
+
+    def window(self, today: int, days: int) -> List[Tuple[int, int]]:
+        """
+        (día, completados) de los últimos `days` días en orden ascendente
+        """
+        return [
+            (day, self.daily[day])
+            for day in range(today - days + 1, today + 1)
+            if day in self.daily
+        ]
+
+    def window_count(self, today: int, days: int) -> int:
+        return sum(count for _, count in self.window(today, days))
+
+class UserHabitRollup:
+    """
+    Rollups de todos los hábitos de un usuario más el contador diario agregado
+    """
+    def __init__(self):
+        self.habits: Dict[str, HabitRollup] = {}
+        self.daily: Dict[int, int] = {}
+
+    def add(self, habit_id: str, day: int, count: int = 1) -> None:
+        self.habits.setdefault(habit_id, HabitRollup()).add(day, count)
+        self.daily[day] = self.daily.get(day, 0) + count
+
+    def habit(self, habit_id: str) -> HabitRollup:
+        return self.habits.get(habit_id) or HabitRollup()
+
+    def daily_count(self, day: int) -> int:
+        return self.daily.get(day, 0)
+
+def build_user_rollup(logs: Iterable[Dict[str, Any]], today: Optional[date] = None) -> UserHabitRollup:
+    """
+    Construye el rollup de un usuario a partir de sus logs en bruto
+    (agrupados por hábito y día con HabitCompletionEngine)
+    """
+    logs = list(logs)
+    today = today or date.today()
+    habit_ids = list(dict.fromkeys(log["habit_id"] for log in logs))
+    engine = HabitCompletionEngine(habit_ids, logs, today)
+    habit_idx, days_ago, counts = engine.habit_day_counts()
+
+    rollup = UserHabitRollup()
+    today_ordinal = today.toordinal()
+    for idx, day, count in zip(habit_idx.tolist(), days_ago.tolist(), counts.tolist()):
+        rollup.add(habit_ids[idx], today_ordinal - day, count)
+    return rollup
+
+class HabitRollupStore:
+    """
+    Rollups por usuario mantenidos de forma incremental: se construyen una vez
+    desde habit_logs y create_habit_log los actualiza, así las analíticas no
+    vuelven a leer los logs en cada petición.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self._rollups = TTLCache(maxsize, ttl)
+        self._loads = SingleFlight("habit_rollups")
+        # Generación por usuario: una carga iniciada antes de una escritura no se guarda
+        self._generations: Dict[str, int] = {}
+        self._lock = Lock()
+
+    def get(self, user_id: str) -> Optional[UserHabitRollup]:
+        return self._rollups.get(str(user_id))
+
+    async def get_or_load(self, user_id: str) -> UserHabitRollup:
+        user_id = str(user_id)
+        rollup = self.get(user_id)
+        if rollup is not None:
+            return rollup
+        return await self._loads.do(user_id, lambda: self.rebuild(user_id))
+
+    async def rebuild(self, user_id: str) -> UserHabitRollup:
+        """
+        Regenera el rollup del usuario desde habit_logs
+        """
+        user_id = str(user_id)
+        generation = self._generation(user_id)
+        rollup = build_user_rollup(await fetch_user_logs(user_id))
+        if self._generation(user_id) == generation:
+            self._rollups.set(user_id, rollup)
+        else:
+            logger.debug(f"Rollup de hábitos de {user_id} descartado: hubo escrituras durante la carga")
+        return rollup
+
+    def record_log(self, user_id: str, habit_id: str, completed_date: Union[str, date]) -> None:
+        """
+        Aplica un log nuevo al rollup del usuario si está cargado
+        """
+        user_id = str(user_id)
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            rollup = self._rollups.get(user_id)
+            if rollup is not None:
+                rollup.add(str(habit_id), _to_date(completed_date).toordinal())
+
+    def invalidate(self, user_id: str) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        self._rollups.delete(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"rollups": self._rollups.stats(), "loads": self._loads.stats()}
+
+    def clear(self) -> None:
+        self._rollups.clear()
+        with self._lock:
+            self._generations.clear()
+
+    def _generation(self, user_id: str) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+habit_rollups = HabitRollupStore(
+    maxsize=settings.HABIT_ROLLUP_MAX_USERS,
+    ttl=settings.HABIT_ROLLUP_TTL_SECONDS,
+)
+
+def ordinal_to_iso(day: int) -> str:
+    return date.fromordinal(day).isoformat()
@@ -0,0 +1,255 @@
+"""
+Consultas de los insights del usuario.
+
+Cada métrica es una consulta independiente: se lanzan a la vez con
+asyncio.gather, así que la latencia es la de la más lenta. Los conteos usan
+count=exact (PostgREST devuelve el total en Content-Range y como mucho una
+fila) y las sumas se calculan en SQL: con el pool asyncpg directamente y sin
+él con una función SQL llamada por RPC.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Dict, List, Optional
+import asyncio
+import logging
+
+from app.db import pg_pool
+from app.db.database import get_supabase_client, run_query
+
+logger = logging.getLogger(__name__)
+
+# Tablas con columna amount que admite sum_amount (el nombre va en el SQL)
+SUMMABLE_TABLES = ("transactions",)
+
+# Funciones SQL que suman sin pool asyncpg y filtros de igualdad que aceptan
+# (supabase/migrations/20250605000000_sum_transaction_amounts.sql)
+SUM_RPC_FUNCTIONS = {"transactions": "sum_transaction_amounts"}
+SUM_RPC_FILTERS = ("type", "category")
+
+async def count_rows(
+    table: str,
+    range_column: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    **filters: Any
+) -> int:
+    """
+    Número de filas que cumplen los filtros de igualdad (y el rango
+    [start, end) sobre `range_column`), sin traer las filas
+    """
+    query = get_supabase_client().table(table).select("id", count="exact")
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    if range_column and start is not None:
+        query = query.gte(range_column, start.isoformat())
+    if range_column and end is not None:
+        query = query.lt(range_column, end.isoformat())
+    response = await run_query(query.limit(1))
+    return response.count or 0
+
+async def sum_amount(
+    table: str,
+    user_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    **filters: Any
+) -> Dict[str, float]:
+    """
+    {"total": suma de amount, "count": filas} con filtros de igualdad y un rango
+    opcional [start, end) sobre `date`
+    """
+    if table not in SUMMABLE_TABLES:
+        raise ValueError(f"Tabla no soportada: {table}")
+
+    if pg_pool.pg_pool_available():
+        conditions = ["user_id = $1"]
+        args: List[Any] = [user_id]
+        for column, value in filters.items():
+            args.append(value)
+            conditions.append(f"{column} = ${len(args)}")
+        if start is not None:
+            args.append(start)
+            conditions.append(f"date >= ${len(args)}")
+        if end is not None:
+            args.append(end)
+            conditions.append(f"date < ${len(args)}")
+        row = await pg_pool.fetchrow(
+            f"SELECT COALESCE(SUM(amount), 0) AS total, COUNT(*) AS count FROM {table}"
+            f" WHERE {' AND '.join(conditions)}",
+            *args,
+        )
+        return {"total": float(row["total"]), "count": int(row["count"])}
+
+    # Sin pool: la suma la hace la función SQL, no se leen las filas
+    unsupported = set(filters) - set(SUM_RPC_FILTERS)
+    if unsupported:
+        raise ValueError(f"Filtros no soportados por {SUM_RPC_FUNCTIONS[table]}: {sorted(unsupported)}")
+    params = {
+        "p_user_id": user_id,
+        **{f"p_{column}": value for column, value in filters.items()},
+        "p_start": start.isoformat() if start is not None else None,
+        "p_end": end.isoformat() if end is not None else None,
+    }
+    response = await run_query(get_supabase_client().rpc(SUM_RPC_FUNCTIONS[table], params))
+    row = response.data[0] if response.data else {"total": 0, "count": 0}
+    return {"total": float(row["total"] or 0), "count": int(row["count"] or 0)}
+
+async def gather_metrics(metrics: Dict[str, Awaitable[Any]]) -> Dict[str, Any]:
+    """
+    Ejecuta las consultas a la vez. Una métrica que falla queda en None (con
+    un aviso en el log) sin tumbar las demás.
+    """
+    names = list(metrics)
+    results = await asyncio.gather(*metrics.values(), return_exceptions=True)
+    values: Dict[str, Any] = {}
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Error al obtener la métrica {name} de insights: {str(result)}")
+            values[name] = None
+        else:
+            values[name] = result
+    return values
+
+async def _active_habit_titles(user_id: str) -> List[str]:
+    response = await run_query(
+        get_supabase_client().table("habits").select("title").eq("user_id", user_id)
+    )
+    return [habit["title"] for habit in response.data]
+
+async def overview_metrics(user_id: str) -> Dict[str, Any]:
+    """
+    Métricas de GET /insights: tareas de alta prioridad completadas, gastos
+    totales y hábitos del usuario
+    """
+    return await gather_metrics({
+        "completed_tasks": count_rows("tasks", user_id=user_id, priority="high", status="completed"),
+        "expenses": sum_amount("transactions", user_id, type="expense"),
+        "habits": _active_habit_titles(user_id),
+    })
+
+def build_overview_insights(user_id: str, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Insights de GET /insights a partir de overview_metrics; sin datos se
+    devuelve un insight de bienvenida
+    """
+    now = datetime.now().isoformat()
+    insights: List[Dict[str, Any]] = []
+
+    # 1. Tareas de alta prioridad completadas
+    tasks_count = metrics["completed_tasks"]
+    if tasks_count:
+        insights.append({
+            "id": "1",
+            "user_id": user_id,
+            "insight_type": "productivity",
+            "description": f"Has completado {tasks_count} tareas de alta prioridad",
+            "data": {
+                "completedTasks": tasks_count
+            },
+            "relevance": 80,
+            "created_at": now
+        })
+
+    # 2. Gastos totales
+    expenses = metrics["expenses"]
+    if expenses and expenses["count"]:
+        total_expenses = expenses["total"]
+        insights.append({
+            "id": "2",
+            "user_id": user_id,
+            "insight_type": "financial",
+            "description": f"Has registrado gastos por un total de ${total_expenses}",
+            "data": {
+                "totalExpenses": total_expenses
+            },
+            "relevance": 75,
+            "created_at": now
+        })
+
+    # 3. Hábitos activos
+    habits = metrics["habits"]
+    if habits:
+        insights.append({
+            "id": "3",
+            "user_id": user_id,
+            "insight_type": "habits",
+            "description": f"Tienes {len(habits)} hábitos activos",
+            "data": {
+                "habitsCount": len(habits),
+                "habits": habits
+            },
+            "relevance": 85,
+            "created_at": now
+        })
+
+    # Si no hay insights, devolver un insight genérico
+    if not insights:
+        insights.append({
+            "id": "default",
+            "user_id": user_id,
+            "insight_type": "productivity",
+            "description": "¡Bienvenido! Comienza a registrar tus actividades para obtener insights personalizados.",
+            "data": {
+                "message": "Bienvenido",
+                "completedTasks": 0
+            },
+            "relevance": 50,
+            "created_at": now
+        })
+
+    return insights
+
+async def compute_overview_insights(user_id: str) -> List[Dict[str, Any]]:
+    return build_overview_insights(user_id, await overview_metrics(user_id))
+
+async def _habit_streak(user_id: str, title: str, today: datetime) -> int:
+    habit = await run_query(
+        get_supabase_client().table("habits").select("id")
+        .eq("user_id", user_id)
+        .eq("title", title)
+        .limit(1)
+    )
+    if not habit.data:
+        return 0
+
+    habit_logs = await run_query(
+        get_supabase_client().table("habit_logs").select("completed_date")
+        .eq("habit_id", habit.data[0]["id"])
+        .order("completed_date", desc=True)
+        .limit(14)
+    )
+    # Racha actual: días consecutivos hasta hoy
+    streak = 0
+    for i, log in enumerate(sorted(habit_logs.data, key=lambda x: x["completed_date"], reverse=True)):
+        if (today - datetime.fromisoformat(log["completed_date"])).days == i:
+            streak += 1
+        else:
+            break
+    return streak
+
+async def weekly_metrics(user_id: str, today: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Comparativas semana/mes: tareas de alta prioridad completadas, gastos en
+    ocio y racha del hábito de meditación
+    """
+    today = today or datetime.now()
+    start_of_this_week = today - timedelta(days=today.weekday())
+    start_of_last_week = start_of_this_week - timedelta(days=7)
+    start_of_month = today.replace(day=1).date()
+    task_filters = {"user_id": user_id, "priority": "high", "status": "completed"}
+
+    return await gather_metrics({
+        "tasks_this_week": count_rows(
+            "tasks", "completed_at", start_of_this_week, start_of_this_week + timedelta(days=7), **task_filters
+        ),
+        "tasks_last_week": count_rows(
+            "tasks", "completed_at", start_of_last_week, start_of_this_week, **task_filters
+        ),
+        "expenses_this_month": sum_amount(
+            "transactions", user_id, start=start_of_month, type="expense", category="ocio"
+        ),
+        "expenses_last_month": sum_amount(
+            "transactions", user_id, start=start_of_month - timedelta(days=30), end=start_of_month,
+            type="expense", category="ocio"
+        ),
+        "meditation_streak": _habit_streak(user_id, "Meditación", today),
+    })
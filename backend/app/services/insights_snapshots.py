@@ -0,0 +1,270 @@
+"""
+Insights precalculados con stale-while-revalidate.
+
+Los insights cambian como mucho una vez al día, así que se guardan en la fila
+de user_analytics del día (columnas insights / insights_computed_at) y
+GET /insights sirve esa instantánea:
+
+- reciente (< INSIGHTS_SNAPSHOT_MAX_AGE_SECONDS): se devuelve tal cual;
+- antigua (< INSIGHTS_SNAPSHOT_STALE_SECONDS): se devuelve y se recalcula en
+  segundo plano;
+- inexistente o demasiado antigua: se calcula antes de responder.
+
+InsightsScheduler recalcula cada día, fuera de horas punta, a los usuarios con
+actividad reciente, por lotes y con concurrencia acotada.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.db import pg_pool
+from app.db.database import get_service_client, run_query
+from app.services.insights import compute_overview_insights
+
+logger = logging.getLogger(__name__)
+
+# Tablas cuya actividad (updated_at) marca a un usuario como activo
+ACTIVITY_TABLES = ("tasks", "transactions", "habits")
+
+# Filas por página al buscar usuarios activos por PostgREST
+ACTIVE_USERS_PAGE_SIZE = 1000
+
+Snapshot = Tuple[List[Dict[str, Any]], datetime]
+
+def _parse_snapshot(row: Optional[Dict[str, Any]]) -> Optional[Snapshot]:
+    if not row or row.get("insights") is None or not row.get("insights_computed_at"):
+        return None
+    insights = row["insights"]
+    if isinstance(insights, str):
+        # asyncpg devuelve JSONB como texto
+        insights = json.loads(insights)
+    computed_at = datetime.fromisoformat(str(row["insights_computed_at"]))
+    if computed_at.tzinfo is None:
+        computed_at = computed_at.replace(tzinfo=timezone.utc)
+    return insights, computed_at
+
+class InsightsSnapshots:
+    def __init__(self, max_age: float, stale_age: float):
+        self.max_age = max_age
+        self.stale_age = stale_age
+        self._refreshes = SingleFlight("insights_snapshot")
+        # Tareas de refresco en segundo plano (referencia fuerte hasta que terminan)
+        self._background: Set["asyncio.Task[Any]"] = set()
+        self.fresh = 0
+        self.stale = 0
+        self.misses = 0
+
+    async def load(self, user_id: str) -> Optional[Snapshot]:
+        """
+        Última instantánea guardada del usuario
+        """
+        if pg_pool.pg_pool_available():
+            row = await pg_pool.fetchrow(
+                "SELECT insights, insights_computed_at FROM user_analytics"
+                " WHERE user_id = $1 AND insights IS NOT NULL ORDER BY date DESC LIMIT 1",
+                user_id,
+            )
+            return _parse_snapshot(row)
+        response = await run_query(
+            get_service_client().table("user_analytics")
+            .select("insights, insights_computed_at")
+            .eq("user_id", user_id)
+            .not_.is_("insights", "null")
+            .order("date", desc=True)
+            .limit(1)
+        )
+        return _parse_snapshot(response.data[0] if response.data else None)
+
+    async def store(self, user_id: str, insights: List[Dict[str, Any]]) -> None:
+        now = datetime.now(timezone.utc)
+        await run_query(
+            get_service_client().table("user_analytics").upsert(
+                {
+                    "user_id": user_id,
+                    "date": now.date().isoformat(),
+                    "insights": insights,
+                    "insights_computed_at": now.isoformat(),
+                },
+                on_conflict="user_id,date",
+                returning="minimal",
+            )
+        )
+
+    async def refresh(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Recalcula y guarda los insights; las llamadas concurrentes para el mismo
+        usuario comparten el cálculo
+        """
+        async def compute() -> List[Dict[str, Any]]:
+            insights = await compute_overview_insights(user_id)
+            try:
+                await self.store(user_id, insights)
+            except Exception as e:
+                # Sin instantánea se recalculará en la próxima petición
+                logger.warning(f"No se pudo guardar la instantánea de insights de {user_id}: {str(e)}")
+            return insights
+
+        return await self._refreshes.do(user_id, compute)
+
+    def _refresh_in_background(self, user_id: str) -> None:
+        async def run() -> None:
+            try:
+                await self.refresh(user_id)
+            except Exception as e:
+                logger.warning(f"Error al refrescar los insights de {user_id}: {str(e)}")
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_or_refresh(self, user_id: str) -> List[Dict[str, Any]]:
+        user_id = str(user_id)
+        try:
+            snapshot = await self.load(user_id)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la instantánea de insights de {user_id}: {str(e)}")
+            snapshot = None
+
+        if snapshot is not None:
+            insights, computed_at = snapshot
+            age = (datetime.now(timezone.utc) - computed_at).total_seconds()
+            if age < self.max_age:
+                self.fresh += 1
+                return insights
+            if age < self.stale_age:
+                self.stale += 1
+                self._refresh_in_background(user_id)
+                return insights
+
+        self.misses += 1
+        return await self.refresh(user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fresh": self.fresh,
+            "stale": self.stale,
+            "misses": self.misses,
+            "background_refreshes": len(self._background),
+            "refreshes": self._refreshes.stats(),
+        }
+
+insights_snapshots = InsightsSnapshots(
+    max_age=settings.INSIGHTS_SNAPSHOT_MAX_AGE_SECONDS,
+    stale_age=settings.INSIGHTS_SNAPSHOT_STALE_SECONDS,
+)
+
+async def fetch_active_user_ids(since: datetime) -> List[str]:
+    """
+    Usuarios con tareas, transacciones o hábitos modificados desde `since`
+    """
+    if pg_pool.pg_pool_available():
+        rows = await pg_pool.fetch(
+            " UNION ".join(f"SELECT user_id FROM {table} WHERE updated_at >= $1" for table in ACTIVITY_TABLES),
+            since,
+        )
+        return sorted({str(row["user_id"]) for row in rows if row["user_id"]})
+
+    user_ids: Set[str] = set()
+    supabase_service = get_service_client()
+    for table in ACTIVITY_TABLES:
+        offset = 0
+        while True:
+            response = await run_query(
+                supabase_service.table(table)
+                .select("user_id")
+                .gte("updated_at", since.isoformat())
+                .order("id")
+                # En postgrest-py el final de range() es exclusivo
+                .range(offset, offset + ACTIVE_USERS_PAGE_SIZE)
+            )
+            user_ids.update(str(row["user_id"]) for row in response.data if row.get("user_id"))
+            offset += len(response.data)
+            if len(response.data) < ACTIVE_USERS_PAGE_SIZE:
+                break
+    return sorted(user_ids)
+
+class InsightsScheduler:
+    """
+    Refresco diario de las instantáneas de insights dentro del propio proceso
+    """
+    def __init__(self, snapshots: InsightsSnapshots, batch_size: int, concurrency: int):
+        self.snapshots = snapshots
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def run_once(self, active_days: int = settings.INSIGHTS_ACTIVE_DAYS) -> Dict[str, Any]:
+        """
+        Recalcula los insights de los usuarios activos por lotes de batch_size,
+        con como mucho `concurrency` usuarios a la vez
+        """
+        started = datetime.now(timezone.utc)
+        user_ids = await fetch_active_user_ids(started - timedelta(days=active_days))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        failed = 0
+
+        async def refresh(user_id: str) -> bool:
+            async with semaphore:
+                try:
+                    await self.snapshots.refresh(user_id)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Error al precalcular los insights de {user_id}: {str(e)}")
+                    return False
+
+        for start in range(0, len(user_ids), self.batch_size):
+            batch = user_ids[start:start + self.batch_size]
+            results = await asyncio.gather(*(refresh(user_id) for user_id in batch))
+            failed += results.count(False)
+
+        self.last_run = {
+            "started_at": started.isoformat(),
+            "seconds": round((datetime.now(timezone.utc) - started).total_seconds(), 2),
+            "users": len(user_ids),
+            "failed": failed,
+        }
+        logger.info(f"Insights precalculados: {self.last_run}")
+        return self.last_run
+
+    @staticmethod
+    def seconds_until(hour: int, now: Optional[datetime] = None) -> float:
+        """
+        Segundos hasta la próxima vez que sean las `hour`:00 UTC
+        """
+        now = now or datetime.now(timezone.utc)
+        next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def _loop(self, hour: int) -> None:
+        while True:
+            await asyncio.sleep(self.seconds_until(hour))
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error en el refresco diario de insights: {str(e)}")
+
+    def start(self, hour: int) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(hour))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+insights_scheduler = InsightsScheduler(
+    insights_snapshots,
+    batch_size=settings.INSIGHTS_REFRESH_BATCH_SIZE,
+    concurrency=settings.INSIGHTS_REFRESH_CONCURRENCY,
+)
@@ -0,0 +1,201 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.identity_cache import TTLCache
+from app.core.resource_versions import resource_versions
+from app.core.singleflight import SingleFlight
+from app.db import pg_pool
+from app.db.database import get_supabase_client, run_query
+from app.schemas.finance import SubscriptionCharge, SubscriptionMonthTotal, SubscriptionProjection
+
+logger = logging.getLogger(__name__)
+
+# Meses entre cobros por ciclo de facturación (weekly se proyecta en días)
+BILLING_CYCLE_MONTHS = {
+    "monthly": 1,
+    "quarterly": 3,
+    "yearly": 12,
+    "annual": 12,
+}
+WEEKLY_CYCLES = ("weekly",)
+
+SUBSCRIPTION_COLUMNS = "id, name, amount, currency, billing_cycle, category, auto_renewal, next_billing_date"
+
+def _add_months(anchor: np.ndarray, steps: np.ndarray) -> np.ndarray:
+    """
+    Suma `steps` meses a cada fecha conservando el día del mes; si el mes es más
+    corto se usa su último día (31 ene + 1 mes = 28/29 feb)
+    """
+    months = anchor.astype("datetime64[M]") + steps.astype("timedelta64[M]")
+    month_start = months.astype("datetime64[D]")
+    month_length = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    day = (anchor - anchor.astype("datetime64[M]").astype("datetime64[D]")).astype(np.int64)
+    return month_start + np.minimum(day, month_length - 1).astype("timedelta64[D]")
+
+def project_charges(
+    subscriptions: Iterable[Dict[str, Any]],
+    today: date,
+    months: int
+) -> SubscriptionProjection:
+    """
+    Expande las suscripciones activas en cobros fechados desde hoy hasta
+    `months` meses después. Cada suscripción parte de su next_billing_date (si ya
+    pasó, se avanza ciclo a ciclo) y sin renovación automática solo cuenta ese cobro.
+    """
+    start = np.datetime64(today, "D")
+    end = _add_months(np.array([start]), np.array([months]))[0] - np.timedelta64(1, "D")
+
+    subscription_idx: List[np.ndarray] = []
+    charge_dates: List[np.ndarray] = []
+    subscriptions = list(subscriptions)
+    for i, subscription in enumerate(subscriptions):
+        cycle = str(subscription.get("billing_cycle") or "").lower()
+        anchor = np.datetime64(str(subscription["next_billing_date"])[:10], "D")
+        if anchor > end:
+            continue
+
+        if not subscription.get("auto_renewal", True):
+            dates = np.array([anchor]) if anchor >= start else np.array([], dtype="datetime64[D]")
+        elif cycle in WEEKLY_CYCLES:
+            # Primer cobro >= hoy y todos los siguientes hasta el final del horizonte
+            first = max(0, int(np.ceil((start - anchor).astype(np.int64) / 7)))
+            last = int((end - anchor).astype(np.int64) // 7)
+            dates = anchor + (np.arange(first, last + 1) * 7).astype("timedelta64[D]")
+        elif cycle in BILLING_CYCLE_MONTHS:
+            step = BILLING_CYCLE_MONTHS[cycle]
+            elapsed = (end.astype("datetime64[M]") - anchor.astype("datetime64[M]")).astype(np.int64)
+            steps = np.arange(0, elapsed // step + 1) * step
+            dates = _add_months(np.full(len(steps), anchor), steps)
+            dates = dates[(dates >= start) & (dates <= end)]
+        else:
+            logger.warning(f"Ciclo de facturación desconocido en la suscripción {subscription.get('id')}: {cycle!r}")
+            continue
+
+        subscription_idx.append(np.full(len(dates), i, dtype=np.int64))
+        charge_dates.append(dates)
+
+    if subscription_idx:
+        idx = np.concatenate(subscription_idx)
+        dates = np.concatenate(charge_dates)
+    else:
+        idx = np.array([], dtype=np.int64)
+        dates = np.array([], dtype="datetime64[D]")
+
+    order = np.lexsort((idx, dates))
+    idx, dates = idx[order], dates[order]
+    amounts = np.array([float(subscriptions[i]["amount"] or 0) for i in idx.tolist()])
+    currencies = [subscriptions[i].get("currency") or "USD" for i in idx.tolist()]
+
+    charges = [
+        SubscriptionCharge(
+            subscription_id=str(subscriptions[i]["id"]),
+            name=subscriptions[i]["name"],
+            date=day,
+            amount=round(float(amount), 2),
+            currency=currency,
+            category=subscriptions[i].get("category"),
+        )
+        for i, day, amount, currency in zip(idx.tolist(), np.datetime_as_string(dates).tolist(), amounts, currencies)
+    ]
+
+    # Totales por (mes, moneda)
+    monthly_totals: List[SubscriptionMonthTotal] = []
+    if len(dates):
+        month_labels = np.datetime_as_string(dates.astype("datetime64[M]"))
+        keys = np.rec.fromarrays([month_labels, np.array(currencies)], names="month,currency")
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts, minlength=len(unique_keys))
+        counts = np.bincount(inverse, minlength=len(unique_keys))
+        monthly_totals = [
+            SubscriptionMonthTotal(month=str(key.month), currency=str(key.currency), total=round(float(total), 2), count=int(count))
+            for key, total, count in zip(unique_keys, totals, counts)
+        ]
+
+    return SubscriptionProjection(
+        from_date=today,
+        to_date=date.fromisoformat(str(end)),
+        charges=charges,
+        monthly_totals=monthly_totals,
+    )
+
+async def fetch_active_subscriptions(user_id: str) -> List[Dict[str, Any]]:
+    if pg_pool.pg_pool_available():
+        return await pg_pool.fetch(
+            f"SELECT {SUBSCRIPTION_COLUMNS} FROM subscriptions_tracker"
+            " WHERE user_id = $1 AND status = 'active'",
+            user_id,
+        )
+    response = await run_query(
+        get_supabase_client().table("subscriptions_tracker")
+        .select(SUBSCRIPTION_COLUMNS)
+        .eq("user_id", user_id)
+        .eq("status", "active")
+    )
+    return response.data
+
+async def fetch_subscriptions_stamp(user_id: str) -> Tuple[int, Optional[str]]:
+    """
+    (número, max(updated_at)) de las suscripciones activas del usuario. Cambia
+    con cualquier alta, baja, cancelación o edición (el trigger de
+    subscriptions_tracker actualiza updated_at), también si la escritura llega
+    directamente desde el frontend y no pasa por la API.
+    """
+    if pg_pool.pg_pool_available():
+        row = await pg_pool.fetchrow(
+            "SELECT COUNT(*) AS count, MAX(updated_at) AS updated_at FROM subscriptions_tracker"
+            " WHERE user_id = $1 AND status = 'active'",
+            user_id,
+        )
+        return int(row["count"]), str(row["updated_at"]) if row["updated_at"] else None
+    query = get_supabase_client().table("subscriptions_tracker") \
+        .select("updated_at", count="exact") \
+        .eq("user_id", user_id) \
+        .eq("status", "active")
+    # postgrest-py no expone nullslast: en DESC los NULL irían primero
+    query.params = query.params.add("order", "updated_at.desc.nullslast")
+    response = await run_query(query.limit(1))
+    updated_at = response.data[0]["updated_at"] if response.data else None
+    return response.count or 0, str(updated_at) if updated_at else None
+
+class SubscriptionProjectionCache:
+    """
+    Proyecciones por (usuario, horizonte, día). La clave lleva la marca de las
+    suscripciones activas (fetch_subscriptions_stamp), no solo la versión en
+    memoria de resource_versions: el frontend escribe en subscriptions_tracker
+    directamente, sin pasar por los endpoints que la incrementan. Cada lectura
+    cuesta una consulta de agregado en lugar de la lista completa.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self._projections = TTLCache(maxsize, ttl)
+        self._loads = SingleFlight("subscription_projection")
+
+    async def get_or_compute(self, user_id: str, months: int, today: Optional[date] = None) -> SubscriptionProjection:
+        user_id = str(user_id)
+        today = today or date.today()
+        stamp = await fetch_subscriptions_stamp(user_id)
+        key = (user_id, months, today, resource_versions.version(user_id, "subscriptions"), stamp)
+        projection = self._projections.get(key)
+        if projection is not None:
+            return projection
+
+        async def compute() -> SubscriptionProjection:
+            result = project_charges(await fetch_active_subscriptions(user_id), today, months)
+            self._projections.set(key, result)
+            return result
+
+        return await self._loads.do(key, compute)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"projections": self._projections.stats(), "loads": self._loads.stats()}
+
+    def clear(self) -> None:
+        self._projections.clear()
+
+subscription_projections = SubscriptionProjectionCache(
+    maxsize=settings.SUBSCRIPTION_PROJECTION_CACHE_MAX_SIZE,
+    ttl=settings.SUBSCRIPTION_PROJECTION_CACHE_TTL_SECONDS,
+)
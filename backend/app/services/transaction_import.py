@@ -0,0 +1,306 @@
+"""
+Importación masiva de transacciones desde extractos bancarios CSV u OFX.
+
+El fichero se lee fila a fila y se procesa por bloques de IMPORT_CHUNK_SIZE:
+cada bloque se valida con TransactionCreate, se descartan los duplicados
+(misma fecha, importe y descripción, ya sea en el propio fichero o en la base
+de datos) y las filas nuevas se insertan en una sola escritura. Un bloque que
+falla no deshace los anteriores: el informe indica qué se importó.
+"""
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import csv
+import hashlib
+import io
+import logging
+import re
+import uuid
+
+from pydantic import ValidationError
+
+from app.db.database import get_supabase_client, run_query
+from app.utils.pagination import order_by_key
+from app.schemas.finance import (
+    ImportFormat, TransactionCreate, TransactionImportChunk, TransactionImportError, TransactionImportReport
+)
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque: una lectura de duplicados (por páginas) y una inserción por bloque
+IMPORT_CHUNK_SIZE = 500
+
+# Límite de filas por fichero
+IMPORT_MAX_ROWS = 50000
+
+# Tamaño de página al leer las transacciones existentes (límite por defecto de PostgREST)
+EXISTING_PAGE_SIZE = 1000
+
+# Errores detallados en el informe; el resto solo cuenta
+MAX_REPORTED_ERRORS = 100
+
+DEFAULT_CATEGORY = "Otros"
+
+# Nombres de columna habituales en los extractos (en minúsculas y sin tildes)
+CSV_COLUMN_ALIASES = {
+    "date": ("date", "fecha", "fecha operacion", "fecha valor", "booking date"),
+    "amount": ("amount", "monto", "importe", "cantidad", "valor"),
+    "description": ("description", "descripcion", "concepto", "detalle", "glosa", "memo"),
+    "category": ("category", "categoria"),
+    "type": ("type", "tipo"),
+    "payment_method": ("payment_method", "metodo de pago", "medio de pago"),
+}
+
+INCOME_TYPES = {"income", "ingreso", "abono", "credit", "credito"}
+EXPENSE_TYPES = {"expense", "gasto", "cargo", "debit", "debito"}
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y", "%Y%m%d")
+
+DedupeKey = Tuple[str, str, str]
+
+def _normalize_header(header: str) -> str:
+    header = header.strip().lower()
+    for accented, plain in zip("áéíóú", "aeiou"):
+        header = header.replace(accented, plain)
+    return header
+
+def parse_amount(value: Any) -> Decimal:
+    """
+    Importe con separadores de miles y decimales en formato europeo o anglosajón
+    """
+    text = re.sub(r"[^\d,.\-+]", "", str(value or ""))
+    if "," in text and "." in text:
+        # El último separador es el decimal
+        if text.rfind(",") > text.rfind("."):
+            text = text.replace(".", "").replace(",", ".")
+        else:
+            text = text.replace(",", "")
+    elif "," in text:
+        text = text.replace(",", ".")
+    try:
+        return Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Importe no válido: {value!r}")
+
+def parse_date(value: Any) -> date:
+    text = str(value or "").strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text[:10] if date_format != "%Y%m%d" else text[:8], date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Fecha no válida: {value!r}")
+
+def dedupe_key(day: Any, amount: Any, description: Optional[str]) -> DedupeKey:
+    """
+    (fecha, importe, hash de la descripción normalizada)
+    """
+    normalized = " ".join((description or "").lower().split())
+    return (
+        str(day)[:10],
+        f"{Decimal(str(amount)):.2f}",
+        hashlib.sha256(normalized.encode()).hexdigest(),
+    )
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    (número de línea, fila con las columnas normalizadas) de un CSV; el
+    separador se detecta con las primeras líneas
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.DictReader(text, dialect=dialect)
+    columns: Dict[str, str] = {}
+    for header in reader.fieldnames or []:
+        normalized = _normalize_header(header)
+        for field, aliases in CSV_COLUMN_ALIASES.items():
+            if normalized in aliases and field not in columns:
+                columns[field] = header
+
+    missing = {"date", "amount"} - set(columns)
+    if missing:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(sorted(missing))}")
+
+    for row in reader:
+        yield reader.line_num, {field: row.get(header) for field, header in columns.items()}
+
+def iter_ofx_rows(stream: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Movimientos (<STMTTRN>) de un OFX 1.x (SGML) o 2.x (XML), leídos línea a línea
+    """
+    text = io.TextIOWrapper(stream, encoding="latin-1", newline=None)
+    current: Optional[Dict[str, str]] = None
+    start_line = 0
+    for line_number, line in enumerate(text, start=1):
+        # En SGML las etiquetas pueden ir varias por línea y sin cierre
+        for tag, value in re.findall(r"<(/?[A-Za-z0-9.]+)>([^<]*)", line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                current, start_line = {}, line_number
+            elif tag == "/STMTTRN" and current is not None:
+                amount = current.get("TRNAMT")
+                description = " - ".join(filter(None, (current.get("NAME"), current.get("MEMO"))))
+                yield start_line, {
+                    "date": current.get("DTPOSTED"),
+                    "amount": amount,
+                    "description": description or None,
+                }
+                current = None
+            elif current is not None and not tag.startswith("/"):
+                current[tag] = value.strip()
+
+def to_transaction(row: Dict[str, Any]) -> TransactionCreate:
+    """
+    Valida una fila ya normalizada. Sin columna de tipo, el signo del importe
+    decide si es ingreso o gasto.
+    """
+    amount = parse_amount(row.get("amount"))
+    raw_type = _normalize_header(row.get("type") or "")
+    if raw_type in INCOME_TYPES:
+        transaction_type = "income"
+    elif raw_type in EXPENSE_TYPES:
+        transaction_type = "expense"
+    else:
+        transaction_type = "expense" if amount < 0 else "income"
+
+    return TransactionCreate(
+        amount=float(abs(amount)),
+        type=transaction_type,
+        category=(row.get("category") or "").strip() or DEFAULT_CATEGORY,
+        description=(row.get("description") or "").strip() or None,
+        date=parse_date(row.get("date")).isoformat(),
+        payment_method=(row.get("payment_method") or "").strip() or None,
+    )
+
+def _chunks(rows: Iterable[Tuple[int, Dict[str, Any]]], size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class TransactionImporter:
+    """
+    Importa las filas de un extracto para un usuario y construye el informe
+    """
+    def __init__(self, user_id: str, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.report = TransactionImportReport()
+        # Claves ya vistas en el fichero (solo los hashes, no las filas)
+        self._seen: Set[DedupeKey] = set()
+
+    async def run(self, import_format: ImportFormat, stream: BinaryIO) -> TransactionImportReport:
+        rows = iter_ofx_rows(stream) if import_format == ImportFormat.ofx else iter_csv_rows(stream)
+        for chunk in _chunks(rows, self.chunk_size):
+            if self.report.total_rows + len(chunk) > IMPORT_MAX_ROWS:
+                chunk = chunk[:IMPORT_MAX_ROWS - self.report.total_rows]
+                self.report.truncated = True
+            await self._import_chunk(chunk)
+            if self.report.truncated:
+                break
+        return self.report
+
+    def _reject(self, line: int, error: str) -> None:
+        self.report.rejected += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(TransactionImportError(row=line, error=error))
+
+    async def _existing_keys(self, supabase: Any, days: Set[str]) -> Set[DedupeKey]:
+        """
+        Claves de las transacciones del usuario en los días del bloque. `date` es
+        timestamptz: se lee el rango [primer día, último día + 1) por páginas y
+        se compara por día, porque un día suelto no coincide con un timestamp.
+        """
+        start = date.fromisoformat(min(days))
+        end = date.fromordinal(date.fromisoformat(max(days)).toordinal() + 1)
+        keys: Set[DedupeKey] = set()
+        offset = 0
+        while True:
+            query = supabase.table("transactions") \
+                .select("date, amount, description") \
+                .eq("user_id", self.user_id) \
+                .eq("is_deleted", False) \
+                .gte("date", start.isoformat()) \
+                .lt("date", end.isoformat())
+            # En postgrest-py el final de range() es exclusivo
+            response = await run_query(
+                order_by_key(query, "date").range(offset, offset + EXISTING_PAGE_SIZE)
+            )
+            keys.update(
+                dedupe_key(row["date"], row["amount"], row.get("description"))
+                for row in response.data
+                if str(row["date"])[:10] in days
+            )
+            offset += len(response.data)
+            if len(response.data) < EXISTING_PAGE_SIZE:
+                return keys
+
+    async def _import_chunk(self, rows: List[Tuple[int, Dict[str, Any]]]) -> None:
+        summary = TransactionImportChunk(index=len(self.report.chunks), rows=len(rows))
+        self.report.total_rows += len(rows)
+
+        valid: List[Tuple[int, TransactionCreate, DedupeKey]] = []
+        for line, row in rows:
+            try:
+                transaction = to_transaction(row)
+            except ValidationError as e:
+                self._reject(line, "; ".join(error["msg"] for error in e.errors()))
+                summary.rejected += 1
+                continue
+            except ValueError as e:
+                self._reject(line, str(e))
+                summary.rejected += 1
+                continue
+            valid.append((line, transaction, dedupe_key(transaction.date, transaction.amount, transaction.description)))
+
+        supabase = get_supabase_client()
+        existing = set()
+        if valid:
+            existing = await self._existing_keys(supabase, {key[0] for _, _, key in valid})
+
+        now = datetime.utcnow().isoformat()
+        to_insert = []
+        inserted_keys = []
+        for line, transaction, key in valid:
+            if key in existing or key in self._seen:
+                summary.duplicates += 1
+                continue
+            self._seen.add(key)
+            inserted_keys.append(key)
+            to_insert.append({
+                **transaction.dict(),
+                "id": str(uuid.uuid4()),
+                "user_id": self.user_id,
+                "created_at": now,
+                "updated_at": now,
+                "is_deleted": False
+            })
+
+        if to_insert:
+            try:
+                await run_query(supabase.table("transactions").insert(to_insert))
+                summary.imported = len(to_insert)
+            except Exception as e:
+                logger.error(f"Error al insertar el bloque {summary.index} de la importación: {str(e)}")
+                self._seen.difference_update(inserted_keys)
+                summary.rejected += len(to_insert)
+                self.report.rejected += len(to_insert)
+                if len(self.report.errors) < MAX_REPORTED_ERRORS:
+                    self.report.errors.append(TransactionImportError(
+                        row=rows[0][0],
+                        error=f"No se pudo guardar el bloque {summary.index}: {str(e)}"
+                    ))
+
+        self.report.imported += summary.imported
+        self.report.duplicates += summary.duplicates
+        self.report.chunks.append(summary)
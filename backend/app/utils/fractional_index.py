@@ -0,0 +1,182 @@
+"""
+Claves de orden fraccionales (lexicográficas) para listas ordenables.
+
+Entre dos claves siempre existe otra, así que insertar o mover un elemento solo
+escribe su propia fila. Formato de rocicorp/fractional-indexing: una parte
+entera de longitud variable (la primera letra indica cuántos dígitos tiene) y
+una parte fraccional en base 62 sin ceros finales. Las claves se comparan byte
+a byte: en Postgres la columna debe usar COLLATE "C".
+"""
+import secrets
+import time
+from typing import List, Optional
+
+BASE_62_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+ZERO = BASE_62_DIGITS[0]
+SMALLEST_INTEGER = "A" + ZERO * 26
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """
+    Parte fraccional entre `a` y `b` (b None = sin límite superior)
+    """
+    if b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+    if a.endswith(ZERO) or (b is not None and b.endswith(ZERO)):
+        raise ValueError("Parte fraccional con cero final")
+
+    if b:
+        # Prefijo común: la clave comparte esos dígitos
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else ZERO) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = BASE_62_DIGITS.index(a[0]) if a else 0
+    digit_b = BASE_62_DIGITS.index(b[0]) if b else len(BASE_62_DIGITS)
+    if digit_b - digit_a > 1:
+        return BASE_62_DIGITS[round(0.5 * (digit_a + digit_b))]
+    # Dígitos consecutivos
+    if b and len(b) > 1:
+        return b[:1]
+    return BASE_62_DIGITS[digit_a] + _midpoint(a[1:], None)
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"Cabecera de clave no válida: {head!r}")
+
+def _integer_part(key: str) -> str:
+    length = _integer_length(key[0])
+    if length > len(key):
+        raise ValueError(f"Clave no válida: {key!r}")
+    return key[:length]
+
+def validate_key(key: str) -> None:
+    if not key or key == SMALLEST_INTEGER:
+        raise ValueError(f"Clave no válida: {key!r}")
+    integer = _integer_part(key)
+    if key[len(integer):].endswith(ZERO):
+        raise ValueError(f"Clave no válida: {key!r}")
+    if any(char not in BASE_62_DIGITS for char in key):
+        raise ValueError(f"Clave no válida: {key!r}")
+
+def _increment_integer(x: str) -> Optional[str]:
+    head, digits = x[0], list(x[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        d = BASE_62_DIGITS.index(digits[i]) + 1
+        if d < len(BASE_62_DIGITS):
+            digits[i] = BASE_62_DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = ZERO
+    # Acarreo: la parte entera crece un dígito
+    if head == "Z":
+        return "a" + ZERO
+    if head == "z":
+        return None
+    head = chr(ord(head) + 1)
+    if head > "a":
+        digits.append(ZERO)
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+def _decrement_integer(x: str) -> Optional[str]:
+    head, digits = x[0], list(x[1:])
+    for i in range(len(digits) - 1, -1, -1):
+        d = BASE_62_DIGITS.index(digits[i]) - 1
+        if d >= 0:
+            digits[i] = BASE_62_DIGITS[d]
+            return head + "".join(digits)
+        digits[i] = BASE_62_DIGITS[-1]
+    if head == "a":
+        return "Z" + BASE_62_DIGITS[-1]
+    if head == "A":
+        return None
+    head = chr(ord(head) - 1)
+    if head < "Z":
+        digits.append(BASE_62_DIGITS[-1])
+    else:
+        digits.pop()
+    return head + "".join(digits)
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """
+    Clave estrictamente entre `a` y `b`. None significa principio / final de la lista.
+    """
+    if a is not None:
+        validate_key(a)
+    if b is not None:
+        validate_key(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+
+    if a is None:
+        if b is None:
+            return "a" + ZERO
+        integer_b = _integer_part(b)
+        fraction_b = b[len(integer_b):]
+        if integer_b == SMALLEST_INTEGER:
+            return integer_b + _midpoint("", fraction_b)
+        if integer_b < b:
+            return integer_b
+        result = _decrement_integer(integer_b)
+        if result is None:
+            raise ValueError("No hay claves anteriores disponibles")
+        return result
+
+    integer_a = _integer_part(a)
+    fraction_a = a[len(integer_a):]
+    if b is None:
+        result = _increment_integer(integer_a)
+        return integer_a + _midpoint(fraction_a, None) if result is None else result
+
+    integer_b = _integer_part(b)
+    fraction_b = b[len(integer_b):]
+    if integer_a == integer_b:
+        return integer_a + _midpoint(fraction_a, fraction_b)
+    result = _increment_integer(integer_a)
+    if result is None:
+        raise ValueError("No hay claves posteriores disponibles")
+    if result < b:
+        return result
+    return integer_a + _midpoint(fraction_a, None)
+
+def keys_between(a: Optional[str], b: Optional[str], n: int) -> List[str]:
+    """
+    `n` claves ordenadas entre `a` y `b`, repartidas para que no crezcan en exceso
+    """
+    if n <= 0:
+        return []
+    if n == 1:
+        return [key_between(a, b)]
+    if b is None:
+        keys = [key_between(a, None)]
+        while len(keys) < n:
+            keys.append(key_between(keys[-1], None))
+        return keys
+    if a is None:
+        keys = [key_between(None, b)]
+        while len(keys) < n:
+            keys.insert(0, key_between(None, keys[0]))
+        return keys
+    mid = n // 2
+    c = key_between(a, b)
+    return keys_between(a, c, mid) + [c] + keys_between(c, b, n - mid - 1)
+
+def append_key() -> str:
+    """
+    Clave para añadir al final sin leer la última: parte entera con el instante
+    actual en milisegundos y una fracción aleatoria para evitar empates entre
+    creaciones concurrentes. Es posterior a cualquier clave generada antes.
+    """
+    millis = int(time.time() * 1000)
+    digits = ""
+    while millis:
+        millis, remainder = divmod(millis, len(BASE_62_DIGITS))
+        digits = BASE_62_DIGITS[remainder] + digits
+    head = chr(ord("a") + len(digits) - 1)
+    fraction = "".join(secrets.choice(BASE_62_DIGITS) for _ in range(3)) + secrets.choice(BASE_62_DIGITS[1:])
+    return head + digits + fraction
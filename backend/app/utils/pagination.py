@@ -0,0 +1,111 @@
+"""
+Paginación por cursor (keyset) sobre (clave de orden, id).
+
+El cursor es opaco para el cliente: codifica la clave de orden y el id de la
+última fila devuelta, y la página siguiente se pide con `(clave, id) > cursor`
+(o `<` en orden descendente). A diferencia de OFFSET, el coste no crece con la
+página y las inserciones concurrentes no desplazan filas entre páginas.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    data = json.dumps(list(values), default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    (clave de orden, id) codificados en el cursor; 400 si el cursor no es válido
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, last_id = json.loads(data)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación no válido"
+        )
+    if value is None or not isinstance(last_id, str):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación no válido"
+        )
+    return value, last_id
+
+def page_limit(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """
+    Tamaño de página acotado a PAGINATION_MAX_LIMIT, o None para devolver todo
+    (comportamiento anterior) si está activado PAGINATION_LEGACY_UNPAGED y la
+    petición no pide paginar
+    """
+    if limit is None and cursor is None and settings.PAGINATION_LEGACY_UNPAGED:
+        return None
+    if limit is None:
+        limit = settings.PAGINATION_DEFAULT_LIMIT
+    return max(1, min(limit, settings.PAGINATION_MAX_LIMIT))
+
+def _quote(value: Any) -> str:
+    # Entre comillas dobles los valores pueden contener , . : ( ) sin romper el filtro
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def order_by_key(query, column: str, desc: bool = False):
+    """
+    ORDER BY column, id en un único parámetro: PostgREST no combina varios `order`
+    """
+    direction = "desc" if desc else "asc"
+    query.params = query.params.add("order", f"{column}.{direction},id.{direction}")
+    return query
+
+def apply_keyset(query, column: str, desc: bool, cursor: Optional[str], limit: int):
+    """
+    Ordena la consulta de PostgREST por (column, id), continúa tras el cursor y
+    pide una fila de más para saber si hay página siguiente
+    """
+    if cursor is not None:
+        value, last_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        # postgrest-py no expone or_: se añade el parámetro directamente
+        query.params = query.params.add(
+            "or",
+            f"({column}.{op}.{_quote(value)},and({column}.eq.{_quote(value)},id.{op}.{_quote(last_id)}))"
+        )
+    return order_by_key(query, column, desc).limit(limit + 1)
+
+def keyset_sql(column: str, desc: bool, first_param: int, cast: str = "text") -> str:
+    """
+    Condición SQL equivalente para asyncpg: los parámetros `first_param` y
+    `first_param + 1` son la clave y el id del cursor (NULL = primera página)
+    """
+    op = "<" if desc else ">"
+    key, last_id = f"${first_param}", f"${first_param + 1}"
+    return f"({key}::text IS NULL OR ({column}, id) {op} ({key}::text::{cast}, {last_id}::text::uuid))"
+
+def cursor_params(cursor: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    if cursor is None:
+        return None, None
+    value, last_id = decode_cursor(cursor)
+    return str(value), last_id
+
+def finish_page(
+    rows: List[Dict[str, Any]],
+    column: str,
+    limit: Optional[int],
+    response: Response,
+) -> List[Dict[str, Any]]:
+    """
+    Recorta la fila de más y, si hay página siguiente, publica su cursor en la cabecera
+    """
+    if limit is None or len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    last = rows[-1]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor([last[column], str(last["id"])])
+    return rows
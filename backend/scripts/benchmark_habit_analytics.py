@@ -0,0 +1,91 @@
+"""
+Micro-benchmark de las analíticas de hábitos: rollup construido con el motor de
+NumPy (app.services.habit_analytics) y leído como en los endpoints, frente al
+cálculo anterior en Python puro.
+
+Uso (desde backend/):
+    python -m scripts.benchmark_habit_analytics --habits 1000 --days 365
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from app.services.habit_rollups import build_user_rollup
+
+def make_logs(habits: int, days: int, density: float):
+    today = date.today()
+    dates = [(today - timedelta(days=i)).isoformat() for i in range(days)]
+    random.seed(42)
+    return [
+        {"habit_id": f"habit-{h}", "completed_date": day}
+        for h in range(habits)
+        for day in dates
+        if random.random() < density
+    ]
+
+def legacy_analytics(habit_ids, logs):
+    # Implementación anterior de app/api/v1/habits/routes.py
+    daily_completions = {}
+    completion_heatmap = {}
+    for i in range(30):
+        date_str = (datetime.now() - timedelta(days=i)).date().isoformat()
+        daily_completions[date_str] = {"completed_count": 0, "total_count": len(habit_ids)}
+    for i in range(365):
+        completion_heatmap[(datetime.now() - timedelta(days=i)).date().isoformat()] = 0
+    for log in logs:
+        date_str = log["completed_date"]
+        if date_str in daily_completions:
+            daily_completions[date_str]["completed_count"] += 1
+        if date_str in completion_heatmap:
+            completion_heatmap[date_str] += 1
+
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    rates = [
+        sum(
+            1 for log in logs
+            if log["habit_id"] == habit_id
+            and datetime.fromisoformat(log["completed_date"]) >= thirty_days_ago
+        ) / 30 * 100
+        for habit_id in habit_ids
+    ]
+    return daily_completions, completion_heatmap, rates
+
+def rollup_analytics(habit_ids, logs):
+    rollup = build_user_rollup(logs)
+    today = date.today().toordinal()
+    daily_completions = [rollup.daily_count(day) for day in range(today, today - 30, -1)]
+    completion_heatmap = [rollup.daily_count(day) for day in range(today, today - 365, -1)]
+    rates = [rollup.habit(habit_id).window_count(today, 30) / 30 * 100 for habit_id in habit_ids]
+    return daily_completions, completion_heatmap, rates
+
+def timed(fn, *args, repeat: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--habits", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--density", type=float, default=0.6, help="Probabilidad de completar cada día")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="No medir la versión anterior (O(hábitos × logs))")
+    args = parser.parse_args()
+
+    habit_ids = [f"habit-{h}" for h in range(args.habits)]
+    logs = make_logs(args.habits, args.days, args.density)
+    print(f"{args.habits} hábitos × {args.days} días -> {len(logs)} logs")
+
+    rollup_time = timed(rollup_analytics, habit_ids, logs, repeat=args.repeat)
+    print(f"Rollup: {rollup_time * 1000:.1f} ms")
+
+    if not args.skip_legacy:
+        legacy_time = timed(legacy_analytics, habit_ids, logs)
+        print(f"Python: {legacy_time * 1000:.1f} ms ({legacy_time / rollup_time:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Regenera los rollups de hábitos desde habit_logs y los compara con los contadores
+guardados en `habits` (total_completions, current_streak, best_streak).
+
+Uso (desde backend/):
+    python -m scripts.rebuild_habit_rollups                 # todos los usuarios, solo informe
+    python -m scripts.rebuild_habit_rollups --user-id <id>  # un usuario
+    python -m scripts.rebuild_habit_rollups --fix           # corrige las diferencias
+
+Las rachas solo se comparan para hábitos diarios; el resto se calcula en SQL
+según su frecuencia.
+"""
+import argparse
+import asyncio
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.db.database import get_service_client, run_query
+from app.services.habit_completions import LOGS_PAGE_SIZE
+from app.services.habit_rollups import habit_rollups
+
+async def fetch_habits(user_id: Optional[str]) -> List[Dict[str, Any]]:
+    supabase_service = get_service_client()
+    habits: List[Dict[str, Any]] = []
+    while True:
+        query = supabase_service.table("habits") \
+            .select("id, user_id, frequency, total_completions, current_streak, best_streak")
+        if user_id:
+            query = query.eq("user_id", user_id)
+        # id es único, así que las páginas no se solapan; en postgrest-py el final de range() es exclusivo
+        response = await run_query(query.order("id").range(len(habits), len(habits) + LOGS_PAGE_SIZE))
+        habits.extend(response.data)
+        if len(response.data) < LOGS_PAGE_SIZE:
+            return habits
+
+async def rebuild(user_id: Optional[str], fix: bool) -> int:
+    habits = await fetch_habits(user_id)
+    habits_by_user: Dict[str, List[Dict[str, Any]]] = {}
+    for habit in habits:
+        habits_by_user.setdefault(habit["user_id"], []).append(habit)
+
+    today = date.today().toordinal()
+    mismatches = 0
+    for owner_id, user_habits in habits_by_user.items():
+        rollup = await habit_rollups.rebuild(owner_id)
+        for habit in user_habits:
+            habit_rollup = rollup.habit(habit["id"])
+            expected = {"total_completions": habit_rollup.total}
+            if str(habit.get("frequency") or "daily") == "daily":
+                expected["current_streak"] = habit_rollup.current_streak(today)
+                expected["best_streak"] = habit_rollup.best_streak
+
+            diff = {field: value for field, value in expected.items() if (habit.get(field) or 0) != value}
+            if not diff:
+                continue
+
+            mismatches += 1
+            stored = {field: habit.get(field) for field in diff}
+            print(f"Usuario {owner_id} / hábito {habit['id']}: guardado {stored} -> rollup {diff}")
+            if fix:
+                await run_query(get_service_client().table("habits").update(diff).eq("id", habit["id"]))
+
+    print(f"{len(habits_by_user)} usuarios, {len(habits)} hábitos, {mismatches} con diferencias")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", help="Regenerar solo este usuario")
+    parser.add_argument("--fix", action="store_true", help="Escribir los valores del rollup en `habits`")
+    args = parser.parse_args()
+
+    mismatches = asyncio.run(rebuild(args.user_id, args.fix))
+    raise SystemExit(1 if mismatches and not args.fix else 0)
+
+if __name__ == "__main__":
+    main()
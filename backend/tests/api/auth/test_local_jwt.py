@@ -0,0 +1,127 @@
+import asyncio
+import time
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.api import deps
+from app.core.identity_cache import identity_cache
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def eq(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        self.client.profile_queries += 1
+        return type("Response", (), {"data": [{"full_name": "Ana", "subscription_tier": "pro"}]})()
+
+
+class FakeAuth:
+    def __init__(self, client):
+        self.client = client
+
+    def get_user(self, token):
+        self.client.remote_checks += 1
+        user = type("AuthUser", (), {
+            "id": "user-1",
+            "email": "ana@example.com",
+            "user_metadata": {},
+            "created_at": None,
+        })()
+        return type("UserResponse", (), {"user": user})()
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.remote_checks = 0
+        self.profile_queries = 0
+        self.auth = FakeAuth(self)
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def make_token(secret=None, exp_offset=3600):
+    payload = {"sub": "user-1", "email": "ana@example.com", "aud": "authenticated", "exp": int(time.time()) + exp_offset}
+    return jwt.encode(payload, secret or deps.JWT_SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(deps, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(deps, "LOCAL_JWT_VERIFICATION", True)
+    identity_cache.clear()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_local_verification_skips_remote_within_interval(fake_supabase):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token())
+
+    first = await deps.get_current_user(credentials)
+    second = await deps.get_current_user(credentials)
+
+    assert first.id == second.id == "user-1"
+    assert second.subscription_tier == "pro"
+    assert fake_supabase.remote_checks == 1
+    assert fake_supabase.profile_queries == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected_locally(fake_supabase):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token(exp_offset=-60))
+
+    with pytest.raises(HTTPException) as exc:
+        await deps.get_current_user(credentials)
+
+    assert exc.value.status_code == 401
+    assert fake_supabase.remote_checks == 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_signature_falls_back_to_supabase(fake_supabase):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token(secret="otro-secreto"))
+
+    user = await deps.get_current_user(credentials)
+
+    assert user.email == "ana@example.com"
+    assert fake_supabase.remote_checks == 1
+
+
+@pytest.mark.asyncio
+async def test_profile_invalidation_rebuilds_user_without_remote_check(fake_supabase):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token())
+
+    await deps.get_current_user(credentials)
+    identity_cache.invalidate_user("user-1")
+    await deps.get_current_user(credentials)
+
+    assert fake_supabase.remote_checks == 1
+    assert fake_supabase.profile_queries == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_resolution(fake_supabase, monkeypatch):
+    original_get_user = fake_supabase.auth.get_user
+
+    def slow_get_user(token):
+        time.sleep(0.05)
+        return original_get_user(token)
+
+    monkeypatch.setattr(fake_supabase.auth, "get_user", slow_get_user)
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=make_token())
+
+    users = await asyncio.gather(*[deps.get_current_user(credentials) for _ in range(8)])
+
+    assert {user.id for user in users} == {"user-1"}
+    assert fake_supabase.remote_checks == 1
+    assert fake_supabase.profile_queries == 1
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.endpoints import finance_subscriptions
+from app.schemas.user import User
+
+USER = User(id="user-1", email="ana@example.com")
+
+
+class FakeQuery:
+    def __init__(self, client, table, action, data=None):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.data = data
+        self.filters = {}
+
+    def eq(self, field, value):
+        self.filters[field] = value
+        return self
+
+    def execute(self):
+        self.client.queries.append(self.action)
+        rows = self.client.tables[self.table]
+        matched = [row for row in rows if all(row.get(k) == v for k, v in self.filters.items())]
+        for row in matched:
+            if self.action == "update":
+                row.update(self.data)
+            elif self.action == "delete":
+                rows.remove(row)
+        return type("Response", (), {"data": [dict(row) for row in matched]})()
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def select(self, columns="*"):
+        return FakeQuery(self.client, self.name, "select")
+
+    def update(self, data):
+        return FakeQuery(self.client, self.name, "update", data)
+
+    def delete(self):
+        return FakeQuery(self.client, self.name, "delete")
+
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.tables = tables
+        self.queries = []
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+def make_client():
+    return FakeSupabase(subscriptions_tracker=[
+        {"id": "s1", "user_id": "user-1", "name": "Música", "status": "active"},
+        {"id": "s2", "user_id": "user-2", "name": "Vídeo", "status": "active"},
+    ])
+
+
+@pytest.mark.asyncio
+async def test_update_and_delete_are_single_owned_writes():
+    client = make_client()
+
+    updated = await finance_subscriptions.update_subscription(
+        "s1", finance_subscriptions.SubscriptionUpdate(amount=9.99), db=client, current_user=USER
+    )
+    await finance_subscriptions.delete_subscription("s1", db=client, current_user=USER)
+
+    assert updated["amount"] == 9.99
+    assert client.queries == ["update", "delete"]
+    assert [row["id"] for row in client.tables["subscriptions_tracker"]] == ["s2"]
+
+    with pytest.raises(HTTPException) as error:
+        await finance_subscriptions.delete_subscription("s2", db=client, current_user=USER)
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_toggle_only_applies_to_the_status_it_read(monkeypatch):
+    client = make_client()
+
+    toggled = await finance_subscriptions.toggle_subscription_status("s1", db=client, current_user=USER)
+    assert toggled["status"] == "cancelled"
+
+    # Otra petición reactiva la suscripción entre la lectura y la escritura
+    read_status = FakeQuery.execute
+
+    def racing_execute(self):
+        response = read_status(self)
+        if self.action == "select":
+            client.tables["subscriptions_tracker"][0]["status"] = "active"
+        return response
+
+    monkeypatch.setattr(FakeQuery, "execute", racing_execute)
+    with pytest.raises(HTTPException) as error:
+        await finance_subscriptions.toggle_subscription_status("s1", db=client, current_user=USER)
+
+    assert error.value.status_code == 409
+    assert client.tables["subscriptions_tracker"][0]["status"] == "active"
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.api.endpoints import finance as finance_endpoints
+from app.schemas.user import User
+from app.services.auth import get_current_user
+from app.utils.pagination import cursor_params, decode_cursor, finish_page
+
+USER = User(id="user-1", email="ana@example.com")
+
+
+def make_transactions(count):
+    return [
+        {
+            "id": f"tx-{i:04d}", "user_id": "user-1", "amount": float(i), "type": "expense",
+            "category": "comida", "description": "=HYPERLINK()" if i == 0 else f"compra {i}",
+            "date": f"2024-01-{i % 28 + 1:02d}", "payment_method": None,
+            "created_at": "2024-01-01T00:00:00", "updated_at": "2024-01-01T00:00:00", "is_deleted": False,
+        }
+        for i in range(count)
+    ]
+
+
+def make_client(monkeypatch, transactions):
+    rows = sorted(transactions, key=lambda row: (row["date"], row["id"]), reverse=True)
+    reads = []
+
+    async def fake_fetch(user_id, transaction_type, cursor, limit):
+        start = 0
+        if cursor is not None:
+            key = decode_cursor(cursor)
+            start = next(i for i, row in enumerate(rows) if (row["date"], row["id"]) < key)
+        reads.append(start)
+        return rows[start:start + limit + 1]
+
+    monkeypatch.setattr(finance_endpoints, "_fetch_transactions", fake_fetch)
+    monkeypatch.setattr(finance_endpoints, "EXPORT_PAGE_SIZE", 10)
+
+    app = FastAPI()
+    app.include_router(finance_endpoints.router, prefix="/finance")
+    app.dependency_overrides[get_current_user] = lambda: USER
+    return TestClient(app), reads
+
+
+def test_csv_export_streams_every_page(monkeypatch):
+    client, reads = make_client(monkeypatch, make_transactions(25))
+
+    response = client.get("/finance/transactions/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 25
+    assert len({row["id"] for row in rows}) == 25
+    assert reads == [0, 10, 20]
+    assert next(row for row in rows if row["id"] == "tx-0000")["description"] == "'=HYPERLINK()"
+
+
+def test_ndjson_export(monkeypatch):
+    client, _ = make_client(monkeypatch, make_transactions(3))
+
+    response = client.get("/finance/transactions/export", params={"format": "ndjson"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == ["tx-0002", "tx-0001", "tx-0000"]
+    assert lines[0]["amount"] == 2.0
+
+
+@pytest.mark.asyncio
+async def test_sql_cursor_keeps_the_time_of_day(monkeypatch):
+    # Dos movimientos el mismo día: el cursor no debe truncarse a medianoche
+    rows = [
+        {"id": "00000000-0000-0000-0000-00000000000b", "date": datetime(2024, 5, 1, 18, tzinfo=timezone.utc)},
+        {"id": "00000000-0000-0000-0000-00000000000a", "date": datetime(2024, 5, 1, 10, tzinfo=timezone.utc)},
+    ]
+    casts = {"timestamptz": datetime.fromisoformat, "date": lambda value: datetime.fromisoformat(value[:10]).replace(tzinfo=timezone.utc)}
+
+    async def fake_fetch(sql, user_id, transaction_type, cursor_date, cursor_id, limit):
+        # Aplica el cursor como lo haría Postgres con el cast de la consulta
+        matching = rows
+        if cursor_date is not None:
+            key = casts[re.search(r"\$3::text::(\w+)", sql).group(1)](cursor_date)
+            matching = [row for row in rows if (row["date"], row["id"]) < (key, cursor_id)]
+        return matching[:limit]
+
+    monkeypatch.setattr(finance_endpoints.pg_pool, "pg_pool_available", lambda: True)
+    monkeypatch.setattr(finance_endpoints.pg_pool, "fetch", fake_fetch)
+
+    first = Response()
+    page = finish_page(await finance_endpoints._fetch_transactions("user-1", None, None, 1), "date", 1, first)
+    cursor = first.headers["X-Next-Cursor"]
+    assert cursor_params(cursor)[0].startswith("2024-05-01 18:00:00")
+    second = await finance_endpoints._fetch_transactions("user-1", None, cursor, 1)
+
+    assert [row["id"] for row in page + second] == [row["id"] for row in rows]
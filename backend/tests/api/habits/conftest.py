@@ -0,0 +1,109 @@
+import httpx
+import pytest
+
+from app.api.endpoints import habits as habits_endpoints
+from app.services import habit_completions
+from app.services.habit_rollups import habit_rollups
+
+
+class FakeQuery:
+    """
+    Builder de PostgREST en memoria: filtra al encadenar y cuenta consultas al ejecutar
+    """
+    def __init__(self, client, name, rows, columns="*", inserted=None):
+        self.client = client
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.inserted = inserted
+        # order_by_key añade el orden como parámetro, igual que en postgrest-py
+        self.params = httpx.QueryParams()
+
+    def _filter(self, rows):
+        query = FakeQuery(self.client, self.name, rows, self.columns, self.inserted)
+        query.params = self.params
+        return query
+
+    def select(self, columns="*"):
+        return FakeQuery(self.client, self.name, self.rows, columns, self.inserted)
+
+    def eq(self, field, value):
+        return self._filter([row for row in self.rows if row.get(field) == value])
+
+    def in_(self, field, values):
+        return self._filter([row for row in self.rows if row.get(field) in values])
+
+    def gte(self, field, value):
+        return self._filter([row for row in self.rows if row[field] >= value])
+
+    def order(self, field, desc=False):
+        return self._filter(sorted(self.rows, key=lambda row: row[field], reverse=desc))
+
+    def range(self, start, end):
+        # En postgrest-py el final es exclusivo
+        return self._filter(self._ordered()[start:end])
+
+    def _ordered(self):
+        rows = self.rows
+        if "order" in self.params:
+            for key in reversed(self.params["order"].split(",")):
+                field, direction = key.rsplit(".", 1)
+                rows = sorted(rows, key=lambda row: str(row.get(field)), reverse=direction == "desc")
+        return rows
+
+    def insert(self, data):
+        rows = data if isinstance(data, list) else [data]
+        return FakeQuery(self.client, self.name, self.rows, self.columns, [dict(row) for row in rows])
+
+    def upsert(self, data, on_conflict="", ignore_duplicates=False):
+        # Solo ON CONFLICT DO NOTHING: se descartan las filas que chocan con el índice único
+        assert ignore_duplicates
+        fields = on_conflict.split(",")
+        existing = {tuple(row.get(field) for field in fields) for row in self.client.tables[self.name]}
+        inserted = []
+        for row in (data if isinstance(data, list) else [data]):
+            key = tuple(row.get(field) for field in fields)
+            if key not in existing:
+                existing.add(key)
+                inserted.append(dict(row))
+        return FakeQuery(self.client, self.name, self.rows, self.columns, inserted)
+
+    def execute(self):
+        self.client.queries += 1
+        if self.inserted is not None:
+            self.client.tables[self.name].extend(self.inserted)
+            return type("Response", (), {"data": self.inserted})()
+        rows = self._ordered()
+        if self.columns != "*":
+            fields = [field.strip() for field in self.columns.split(",")]
+            rows = [{field: row[field] for field in fields} for row in rows]
+        return type("Response", (), {"data": rows})()
+
+
+class FakeSupabase:
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = 0
+
+    def table(self, name):
+        return FakeQuery(self, name, list(self.tables[name]))
+
+
+@pytest.fixture(autouse=True)
+def clear_rollups():
+    habit_rollups.clear()
+    yield
+    habit_rollups.clear()
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch):
+    """
+    Instala un cliente en memoria con las tablas dadas en los endpoints de hábitos
+    """
+    def install(**tables):
+        client = FakeSupabase(tables)
+        monkeypatch.setattr(habits_endpoints, "get_service_client", lambda: client)
+        monkeypatch.setattr(habit_completions, "get_service_client", lambda: client)
+        return client
+    return install
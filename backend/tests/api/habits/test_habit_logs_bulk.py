@@ -0,0 +1,91 @@
+from datetime import date
+import pytest
+
+from app.api.endpoints import habits as habits_endpoints
+from app.schemas.habits import HabitLogBulkCreate, HabitLogCreate
+from app.schemas.user import User
+from app.services.habit_rollups import habit_rollups
+
+USER = User(id="user-1", email="ana@example.com")
+
+
+@pytest.mark.asyncio
+async def test_bulk_logs_checks_ownership_once_and_dedupes(fake_supabase):
+    client = fake_supabase(
+        habits=[
+            {"id": "habit-1", "user_id": "user-1"},
+            {"id": "habit-2", "user_id": "user-1"},
+            {"id": "foreign", "user_id": "user-2"},
+        ],
+        habit_logs=[
+            {"id": "old", "habit_id": "habit-1", "user_id": "user-1", "completed_date": "2024-03-01"},
+        ],
+    )
+    bulk_in = HabitLogBulkCreate(logs=[
+        {"habit_id": "habit-1", "completed_date": "2024-03-01"},
+        {"habit_id": "habit-1", "completed_date": "2024-03-02", "notes": "offline"},
+        {"habit_id": "habit-2", "completed_date": date(2024, 3, 2)},
+        {"habit_id": "habit-2", "completed_date": "2024-03-02"},
+        {"habit_id": "foreign", "completed_date": "2024-03-02"},
+        {"habit_id": "habit-2", "completed_date": "no es fecha"},
+    ])
+
+    result = await habits_endpoints.create_habit_logs_bulk(bulk_in, current_user=USER)
+
+    assert [item.status for item in result.results] == [
+        "duplicate", "created", "created", "duplicate", "not_found", "invalid",
+    ]
+    assert (result.created, result.duplicates, result.rejected) == (2, 2, 2)
+    assert result.results[1].log.notes == "offline"
+    # Propiedad + una inserción que ignora los días ya registrados
+    assert client.queries == 2
+    assert len(client.tables["habit_logs"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_bulk_logs_update_loaded_rollups(fake_supabase):
+    fake_supabase(habits=[{"id": "habit-1", "user_id": "user-1"}], habit_logs=[])
+    await habit_rollups.get_or_load("user-1")
+    today = date.today()
+
+    await habits_endpoints.create_habit_logs_bulk(
+        HabitLogBulkCreate(logs=[{"habit_id": "habit-1"}]),
+        current_user=USER,
+    )
+
+    assert habit_rollups.get("user-1").habit("habit-1").current_streak(today.toordinal()) == 1
+
+
+@pytest.mark.asyncio
+async def test_logs_written_concurrently_are_reported_as_duplicates(fake_supabase):
+    client = fake_supabase(habits=[{"id": "habit-1", "user_id": "user-1"}], habit_logs=[])
+    await habit_rollups.get_or_load("user-1")
+    # Otra petición registra el mismo día después de que este lote se validara
+    client.tables["habit_logs"].append(
+        {"id": "racing", "habit_id": "habit-1", "user_id": "user-1", "completed_date": "2024-03-01"}
+    )
+
+    result = await habits_endpoints.create_habit_logs_bulk(
+        HabitLogBulkCreate(logs=[{"habit_id": "habit-1", "completed_date": "2024-03-01"}]),
+        current_user=USER,
+    )
+
+    assert [item.status for item in result.results] == ["duplicate"]
+    assert len(client.tables["habit_logs"]) == 1
+    assert habit_rollups.get("user-1").habit("habit-1").total == 0
+
+
+@pytest.mark.asyncio
+async def test_single_log_for_a_registered_day_returns_the_existing_one(fake_supabase):
+    existing = {
+        "id": "old", "habit_id": "habit-1", "user_id": "user-1", "completed_date": "2024-03-01",
+        "created_at": "2024-03-01T08:00:00",
+    }
+    client = fake_supabase(habits=[{"id": "habit-1", "user_id": "user-1"}], habit_logs=[existing])
+
+    log = await habits_endpoints.create_habit_log(
+        "habit-1", HabitLogCreate(completed_date="2024-03-01"), current_user=USER
+    )
+
+    assert log.id == "old"
+    assert len(client.tables["habit_logs"]) == 1
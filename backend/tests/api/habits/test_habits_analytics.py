@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+import pytest
+
+from app.api.endpoints import habits as habits_endpoints
+from app.schemas.user import User
+
+
+@pytest.mark.asyncio
+async def test_analytics_fetches_all_logs_in_one_query(fake_supabase):
+    today = date.today()
+    habits = [
+        {"id": f"habit-{i}", "user_id": "user-1", "title": f"Hábito {i}", "is_active": True,
+         "current_streak": i, "best_streak": i + 1}
+        for i in range(3)
+    ]
+    logs = [
+        {"habit_id": "habit-0", "user_id": "user-1", "completed_date": (today - timedelta(days=1)).isoformat()},
+        {"habit_id": "habit-0", "user_id": "user-1", "completed_date": today.isoformat()},
+        {"habit_id": "habit-2", "user_id": "user-1", "completed_date": today.isoformat()},
+        {"habit_id": "habit-2", "user_id": "user-1", "completed_date": (today - timedelta(days=45)).isoformat()},
+        {"habit_id": "other-habit", "user_id": "user-2", "completed_date": today.isoformat()},
+    ]
+    client = fake_supabase(habits=habits, habit_logs=logs)
+
+    result = await habits_endpoints.get_habits_analytics(current_user=User(id="user-1", email="ana@example.com"))
+
+    assert client.queries == 2
+    assert [streak["completion_rate"] for streak in result["habit_streaks"]] == [6.67, 0, 3.33]
+    # Rachas desde los logs, no desde las columnas current_streak/best_streak
+    assert [(streak["current_streak"], streak["best_streak"]) for streak in result["habit_streaks"]] == [
+        (2, 2), (0, 0), (1, 1),
+    ]
+    assert result["completion_heatmap"] == [
+        {"date": (today - timedelta(days=1)).isoformat(), "value": 1},
+        {"date": today.isoformat(), "value": 1},
+        {"date": today.isoformat(), "value": 1},
+    ]
+    assert [(day["date"], day["completed_count"], day["total_count"]) for day in result["daily_completions"]] == [
+        ((today - timedelta(days=1)).isoformat(), 1, 3),
+        (today.isoformat(), 1, 3),
+        (today.isoformat(), 1, 3),
+    ]
+
+    # Las siguientes lecturas usan el rollup y no vuelven a leer habit_logs
+    await habits_endpoints.get_habits_analytics(current_user=User(id="user-1", email="ana@example.com"))
+    assert client.queries == 3
@@ -0,0 +1,116 @@
+import pytest
+from fastapi import HTTPException, Request, Response
+from postgrest import SyncPostgrestClient
+
+from app.api.endpoints import tasks as tasks_endpoints
+from app.schemas.task import TaskReorder
+from app.schemas.user import User
+
+USER = User(id="user-1", email="ana@example.com")
+
+
+class FakeQuery:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    def select(self, columns="*"):
+        return self
+
+    def eq(self, field, value):
+        return FakeQuery(self.client, [row for row in self.rows if row.get(field) == value])
+
+    def in_(self, field, values):
+        return FakeQuery(self.client, [row for row in self.rows if row.get(field) in values])
+
+    def execute(self):
+        self.client.queries += 1
+        return type("Response", (), {"data": self.rows})()
+
+
+class FakeRpc:
+    def __init__(self, client, params):
+        self.client = client
+        self.params = params
+
+    def execute(self):
+        self.client.queries += 1
+        tasks = {task["id"]: task for task in self.client.tasks}
+        updated = []
+        for move in self.params["p_moves"]:
+            task = tasks[move["id"]]
+            task["sort_key"] = move["sort_key"]
+            task["status"] = move["status"] or task["status"]
+            updated.append(task)
+        return type("Response", (), {"data": updated})()
+
+
+class FakeSupabase:
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.queries = 0
+
+    def table(self, name):
+        return FakeQuery(self, self.tasks)
+
+    def rpc(self, name, params):
+        assert name == "reorder_tasks"
+        return FakeRpc(self, params)
+
+
+def make_tasks():
+    return [
+        {"id": "t1", "user_id": "user-1", "status": "pending", "sort_key": "a0", "is_deleted": False},
+        {"id": "t2", "user_id": "user-1", "status": "pending", "sort_key": "a1", "is_deleted": False},
+        {"id": "t3", "user_id": "user-1", "status": "in_progress", "sort_key": "a0", "is_deleted": False},
+        {"id": "other", "user_id": "user-2", "status": "pending", "sort_key": "a2", "is_deleted": False},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reorder_applies_session_in_one_write(monkeypatch):
+    client = FakeSupabase(make_tasks())
+    monkeypatch.setattr(tasks_endpoints, "get_supabase_client", lambda: client)
+
+    reorder_in = TaskReorder(moves=[
+        # t2 pasa delante de t1, luego t3 entra en pendientes detrás de t2
+        {"id": "t2", "before_id": "t1"},
+        {"id": "t3", "status": "pending", "after_id": "t2", "before_id": "t1"},
+    ])
+    result = await tasks_endpoints.reorder_tasks(reorder_in, current_user=USER)
+
+    pending = sorted((task for task in client.tasks if task["status"] == "pending" and task["user_id"] == "user-1"),
+                     key=lambda task: task["sort_key"])
+    assert [task["id"] for task in pending] == ["t2", "t3", "t1"]
+    assert [task["id"] for task in result] == ["t2", "t3"]
+    assert client.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_reorder_rejects_foreign_tasks(monkeypatch):
+    client = FakeSupabase(make_tasks())
+    monkeypatch.setattr(tasks_endpoints, "get_supabase_client", lambda: client)
+
+    with pytest.raises(HTTPException) as error:
+        await tasks_endpoints.reorder_tasks(TaskReorder(moves=[{"id": "t1", "after_id": "other"}]), current_user=USER)
+
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_read_tasks_sends_a_single_order_param(monkeypatch):
+    queries = []
+
+    async def capture(query):
+        queries.append(query)
+        return type("Response", (), {"data": []})()
+
+    monkeypatch.setattr(tasks_endpoints.pg_pool, "pg_pool_available", lambda: False)
+    monkeypatch.setattr(tasks_endpoints, "get_supabase_client", lambda: SyncPostgrestClient("http://localhost"))
+    monkeypatch.setattr(tasks_endpoints, "run_query", capture)
+    request = Request({"type": "http", "method": "GET", "path": "/tasks/", "query_string": b"", "headers": []})
+
+    await tasks_endpoints.read_tasks(request, Response(), status=None, limit=None, cursor=None, current_user=USER)
+
+    # PostgREST no combina varios `order`: el orden completo va en uno solo
+    assert queries[0].params.get_list("order") == ["sort_key.asc,id.asc"]
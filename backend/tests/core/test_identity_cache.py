@@ -0,0 +1,49 @@
+import time
+
+from app.core.identity_cache import IdentityCache, TTLCache
+from app.schemas.user import User
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_and_count_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0)
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+    assert len(cache) == 0
+
+
+def test_invalidate_user_drops_profile_and_cached_users():
+    cache = IdentityCache(maxsize=10, token_ttl=60, profile_ttl=60)
+    user = User(id="user-1", email="ana@example.com")
+    cache.set_profile("user-1", {"full_name": "Ana"})
+    cache.set_user("token-1", user)
+    cache.set_user("token-2", user)
+    cache.mark_revalidated("token-1")
+
+    cache.invalidate_user("user-1")
+
+    assert cache.get_profile("user-1") is None
+    assert cache.get_user("token-1") is None
+    assert cache.get_user("token-2") is None
+    assert cache.is_revalidated("token-1")
+
+
+def test_claims_never_outlive_token_expiration():
+    cache = IdentityCache(maxsize=10, token_ttl=60, profile_ttl=60)
+    cache.set_claims("token-1", {"sub": "user-1", "exp": time.time() - 1})
+
+    assert cache.get_claims("token-1") is None
@@ -0,0 +1,66 @@
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.core.resource_versions import ResourceVersions, conditional_get, resource_versions
+
+
+def test_etag_changes_only_when_version_is_bumped():
+    versions = ResourceVersions(maxsize=10)
+    etag = versions.etag("user-1", "tasks")
+
+    assert versions.etag("user-1", "tasks") == etag
+    assert versions.etag("user-1", "tasks", "status=done") != etag
+
+    versions.bump("user-2", "tasks")
+    assert versions.etag("user-1", "tasks") == etag
+
+    versions.bump("user-1", "tasks")
+    assert versions.etag("user-1", "tasks") != etag
+
+
+def test_evicted_versions_never_match_old_etags():
+    versions = ResourceVersions(maxsize=1)
+    untouched = versions.etag("user-3", "tasks")
+    versions.bump("user-1", "tasks")
+    written = versions.etag("user-1", "tasks")
+
+    # Desaloja user-1: la versión mínima sube hasta la última desalojada
+    versions.bump("user-2", "tasks")
+    assert versions.etag("user-1", "tasks") == written
+    # Una clave nunca escrita no conserva su ETag inicial tras un desalojo
+    assert versions.etag("user-3", "tasks") != untouched
+
+
+def test_conditional_get_skips_handler_work():
+    resource_versions.clear()
+    app = FastAPI()
+    calls = []
+
+    @app.get("/items")
+    async def read_items(request: Request, http_response: Response):
+        not_modified = conditional_get(request, http_response, "user-1", "items")
+        if not_modified is not None:
+            return not_modified
+        calls.append(1)
+        return [1, 2, 3]
+
+    @app.post("/items")
+    async def create_item():
+        resource_versions.bump("user-1", "items")
+        return {}
+
+    client = TestClient(app)
+    first = client.get("/items")
+    etag = first.headers["etag"]
+
+    cached = client.get("/items", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert len(calls) == 1
+
+    client.post("/items")
+    fresh = client.get("/items", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json() == [1, 2, 3]
+    assert len(calls) == 2
@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_with_same_key_run_once():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def resolve():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    results = await asyncio.gather(*[flight.do("token", resolve) for _ in range(10)])
+
+    assert results == ["ok"] * 10
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 9}
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("token inválido")
+
+    results = await asyncio.gather(flight.do("token", fail), flight.do("token", fail), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flight.do("token", succeed) == "ok"
@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.db import async_client
+from app.db.async_client import close_async_clients, get_async_service_client, with_access_token
+
+
+@pytest.fixture
+def requests_seen(monkeypatch):
+    """
+    Sustituye la red por un MockTransport y guarda las cabeceras de cada petición
+    """
+    seen = []
+    sessions = []
+
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        seen.append(request.headers.get("authorization"))
+        return httpx.Response(200, json=[])
+
+    def create(**kwargs):
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler), **kwargs)
+        sessions.append(session)
+        return session
+
+    monkeypatch.setattr(async_client, "AsyncClient", create)
+    monkeypatch.setattr(async_client, "ASYNC_CLIENTS", {})
+    return seen, sessions
+
+
+@pytest.mark.asyncio
+async def test_client_and_connection_pool_are_reused(requests_seen):
+    _, sessions = requests_seen
+
+    client = get_async_service_client()
+    await client.table("tasks").select("*").execute()
+    await get_async_service_client().table("habits").select("*").execute()
+
+    assert get_async_service_client() is client
+    assert len(sessions) == 1
+    await close_async_clients()
+
+
+@pytest.mark.asyncio
+async def test_per_request_tokens_do_not_leak(requests_seen):
+    seen, _ = requests_seen
+    client = get_async_service_client()
+    service_header = client.session.headers["authorization"]
+
+    await asyncio.gather(
+        with_access_token(client.table("tasks").select("*"), "token-ana").execute(),
+        with_access_token(client.table("tasks").select("*"), "token-luis").execute(),
+    )
+    await client.table("tasks").select("*").execute()
+
+    assert sorted(seen[:2]) == ["Bearer token-ana", "Bearer token-luis"]
+    assert seen[2] == service_header
+    assert client.session.headers["authorization"] == service_header
+    with pytest.raises(RuntimeError):
+        client.auth("token-ana")
+    await close_async_clients()
+
+
+@pytest.mark.asyncio
+async def test_close_async_clients_closes_and_forgets_clients(requests_seen):
+    _, sessions = requests_seen
+    client = get_async_service_client()
+
+    await close_async_clients()
+
+    assert sessions[0].is_closed
+    assert async_client.ASYNC_CLIENTS == {}
+    assert get_async_service_client() is not client
+    await close_async_clients()
@@ -0,0 +1,92 @@
+import pytest
+from fastapi import HTTPException
+
+from app.db.database import delete_owned, update_owned
+
+
+class FakeQuery:
+    def __init__(self, client, table, action, data=None):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.data = data
+        self.filters = {}
+
+    def eq(self, field, value):
+        self.filters[field] = value
+        return self
+
+    def execute(self):
+        self.client.queries += 1
+        rows = self.client.tables[self.table]
+        matched = [row for row in rows if all(row.get(k) == v for k, v in self.filters.items())]
+        for row in matched:
+            if self.action == "update":
+                row.update(self.data)
+            else:
+                rows.remove(row)
+        return type("Response", (), {"data": [dict(row) for row in matched]})()
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def update(self, data):
+        return FakeQuery(self.client, self.name, "update", data)
+
+    def delete(self):
+        return FakeQuery(self.client, self.name, "delete")
+
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.tables = tables
+        self.queries = 0
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+def make_client():
+    return FakeSupabase(tasks=[
+        {"id": "t1", "user_id": "user-1", "title": "A", "is_deleted": False},
+        {"id": "t2", "user_id": "user-2", "title": "B", "is_deleted": False},
+        {"id": "t3", "user_id": "user-1", "title": "C", "is_deleted": True},
+    ])
+
+
+@pytest.mark.asyncio
+async def test_update_owned_is_a_single_round_trip():
+    client = make_client()
+
+    task = await update_owned(client, "tasks", "t1", "user-1", {"title": "A2"}, "Tarea no encontrada", is_deleted=False)
+
+    assert task["title"] == "A2"
+    assert client.queries == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("task_id", ["t2", "t3", "missing"])
+async def test_update_owned_maps_no_rows_to_404(task_id):
+    client = make_client()
+
+    with pytest.raises(HTTPException) as error:
+        await update_owned(client, "tasks", task_id, "user-1", {"title": "X"}, "Tarea no encontrada", is_deleted=False)
+
+    assert error.value.status_code == 404
+    assert error.value.detail == "Tarea no encontrada"
+    assert {task["title"] for task in client.tables["tasks"]} == {"A", "B", "C"}
+
+
+@pytest.mark.asyncio
+async def test_delete_owned_returns_deleted_row():
+    client = make_client()
+
+    task = await delete_owned(client, "tasks", "t1", "user-1", "Tarea no encontrada")
+
+    assert task["id"] == "t1"
+    assert [task["id"] for task in client.tables["tasks"]] == ["t2", "t3"]
+    with pytest.raises(HTTPException):
+        await delete_owned(client, "tasks", "t2", "user-1", "Tarea no encontrada")
@@ -0,0 +1,38 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+import pytest
+
+from app.core.config import settings
+from app.db import pg_pool
+
+
+def test_records_match_postgrest_json_types():
+    habit_id = uuid4()
+    row = {
+        "habit_id": habit_id,
+        "completed_date": date(2024, 3, 1),
+        "created_at": datetime(2024, 3, 1, 8, 30, tzinfo=timezone.utc),
+        "amount": Decimal("12.50"),
+        "tags": ["salud"],
+        "notes": None,
+    }
+
+    assert pg_pool.record_to_dict(row) == {
+        "habit_id": str(habit_id),
+        "completed_date": "2024-03-01",
+        "created_at": "2024-03-01T08:30:00+00:00",
+        "amount": 12.5,
+        "tags": ["salud"],
+        "notes": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_pool_is_optional_without_database_url(monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", None)
+
+    assert await pg_pool.init_pg_pool() is None
+    assert not pg_pool.pg_pool_available()
+    with pytest.raises(RuntimeError):
+        await pg_pool.fetch("SELECT 1")
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import pytest
+
+from app.db import database
+from app.db.database import QueryExecutorMetrics, run_query
+
+
+class FakeQuery:
+    def __init__(self, result):
+        self.result = result
+        self.thread = None
+
+    def execute(self):
+        self.thread = threading.current_thread().name
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_builders_execute_in_dedicated_pool(monkeypatch):
+    monkeypatch.setattr(database, "query_executor_metrics", QueryExecutorMetrics(4))
+    query = FakeQuery("ok")
+
+    assert await run_query(query) == "ok"
+    assert query.thread.startswith("supabase-sync")
+
+    stats = database.get_query_executor_stats()
+    assert stats["submitted"] == 1
+    assert stats["completed"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failures_are_counted_and_propagated(monkeypatch):
+    monkeypatch.setattr(database, "query_executor_metrics", QueryExecutorMetrics(4))
+
+    def fail():
+        raise ValueError("42703")
+
+    with pytest.raises(ValueError):
+        await run_query(fail)
+
+    assert database.get_query_executor_stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_while_query_blocks(monkeypatch):
+    monkeypatch.setattr(database, "query_executor_metrics", QueryExecutorMetrics(4))
+    release = threading.Event()
+
+    query = asyncio.ensure_future(run_query(lambda: release.wait(1)))
+    await asyncio.sleep(0.01)
+
+    assert not query.done()
+    assert database.get_query_executor_stats()["active"] == 1
+    release.set()
+    assert await query is True
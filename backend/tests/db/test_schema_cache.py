@@ -0,0 +1,57 @@
+import pytest
+
+from app.db import schema_cache
+from app.db.schema_cache import TableColumnsCache, is_undefined_column_error
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"definitions": {"habits": {"properties": {"id": {}, "title": {}, "is_active": {}}}}}
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, path):
+        self.calls += 1
+        return FakeResponse()
+
+
+@pytest.mark.asyncio
+async def test_columns_are_read_from_postgrest_openapi(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(schema_cache, "get_async_service_client", lambda: type("Client", (), {"session": session})())
+    cache = TableColumnsCache(["habits"])
+
+    assert cache.columns("habits") is None
+    assert cache.has_column("habits", "cue")
+
+    await cache.refresh()
+
+    assert cache.columns("habits") == {"id", "title", "is_active"}
+    assert not cache.has_column("habits", "cue")
+    assert cache.filter_fields("habits", {"title": "Leer", "cue": "café"}) == {"title": "Leer"}
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_previous_columns(monkeypatch):
+    def broken_client():
+        raise RuntimeError("sin conexión")
+
+    monkeypatch.setattr(schema_cache, "get_async_service_client", broken_client)
+    cache = TableColumnsCache(["habits"])
+    cache._columns["habits"] = frozenset({"id"})
+
+    await cache.refresh()
+
+    assert cache.columns("habits") == {"id"}
+
+
+def test_undefined_column_errors():
+    assert is_undefined_column_error(Exception("{'code': '42703', 'message': 'column habits.is_active does not exist'}"))
+    assert is_undefined_column_error(Exception("{'code': 'PGRST204', 'message': \"Could not find the 'cue' column\"}"))
+    assert not is_undefined_column_error(Exception("{'code': '23505'}"))
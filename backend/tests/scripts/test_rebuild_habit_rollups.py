@@ -0,0 +1,23 @@
+import pytest
+from postgrest import SyncPostgrestClient
+
+from scripts import rebuild_habit_rollups
+
+
+@pytest.mark.asyncio
+async def test_fetch_habits_reads_past_the_first_page(monkeypatch):
+    habits = [{"id": f"habit-{i}", "user_id": "user-1"} for i in range(5)]
+    ranges = []
+
+    async def fake_run_query(query):
+        ranges.append(query.headers["Range"])
+        assert query.params["order"] == "id"
+        start, end = map(int, query.headers["Range"].split("-"))
+        return type("Response", (), {"data": habits[start:end + 1]})()
+
+    monkeypatch.setattr(rebuild_habit_rollups, "LOGS_PAGE_SIZE", 2)
+    monkeypatch.setattr(rebuild_habit_rollups, "get_service_client", lambda: SyncPostgrestClient("http://localhost"))
+    monkeypatch.setattr(rebuild_habit_rollups, "run_query", fake_run_query)
+
+    assert await rebuild_habit_rollups.fetch_habits(None) == habits
+    assert ranges == ["0-1", "2-3", "4-5"]
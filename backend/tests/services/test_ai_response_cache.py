@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+
+from app.services.ai.ai_service import AIService
+from app.services.ai.response_cache import AIResponseCache, ai_response_cache, cache_key
+
+
+def make_cache(**kwargs):
+    return AIResponseCache(**{"maxsize": 2, "ttl": 60, "max_temperature": 0.5, **kwargs})
+
+
+def counting_call(result):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return result
+
+    return call, calls
+
+
+def test_key_ignores_case_and_whitespace_but_not_template_or_temperature():
+    key = cache_key("model", "PROMPT", "Quiero  correr\nuna maratón", 0.2)
+
+    assert key == cache_key("model", "PROMPT", "quiero correr una maratón ", 0.2)
+    assert key != cache_key("model", "OTRO PROMPT", "quiero correr una maratón", 0.2)
+    assert key != cache_key("model", "PROMPT", "quiero correr una maratón", 0.3)
+    assert cache_key("m", "p", {"b": 1, "a": 2}, 0.2) == cache_key("m", "p", {"a": 2, "b": 1}, 0.2)
+
+
+@pytest.mark.asyncio
+async def test_normalized_identical_inputs_hit_the_cache():
+    cache = make_cache()
+    call, calls = counting_call({"has_goal": True})
+
+    first = await cache.get_or_call("model", "PROMPT", "Correr 10K", 0.2, call)
+    first["mutated"] = True
+    second = await cache.get_or_call("model", "PROMPT", "  correr 10k", 0.2, call)
+
+    assert second == {"has_goal": True}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_request():
+    cache = make_cache()
+    call, calls = counting_call("plan")
+
+    results = await asyncio.gather(*(cache.get_or_call("m", "p", "x", 0.3, call) for _ in range(3)))
+
+    assert results == ["plan"] * 3
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_high_temperature_and_failed_results_are_not_cached():
+    cache = make_cache()
+    call, calls = counting_call(None)
+    await cache.get_or_call("m", "p", "x", 0.2, call)
+    await cache.get_or_call("m", "p", "x", 0.2, call)
+
+    chat, chat_calls = counting_call("respuesta")
+    await cache.get_or_call("m", "p", "x", 0.7, chat)
+    await cache.get_or_call("m", "p", "x", 0.7, chat)
+
+    assert (len(calls), len(chat_calls)) == (2, 2)
+    assert cache.stats()["bypassed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_entries_survive_a_restart_when_persisted(tmp_path):
+    path = str(tmp_path / "ai_cache.json")
+    cache = make_cache(path=path)
+    call, _ = counting_call({"plan": [1, 2]})
+    await cache.get_or_call("m", "p", "x", 0.2, call)
+
+    assert cache.save() == 1
+
+    restored = make_cache(path=path)
+    assert restored.load() == 1
+    call, calls = counting_call({"plan": []})
+    assert await restored.get_or_call("m", "p", "x", 0.2, call) == {"plan": [1, 2]}
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_joined_goal_plan_callers_get_the_parse_error(monkeypatch):
+    ai_response_cache.clear()
+    service = AIService()
+
+    async def bad_json(**kwargs):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="no es json"))])
+
+    monkeypatch.setattr(service, "_send_request", bad_json)
+    goal = {"has_goal": True, "goal": {"title": "Correr una maratón"}}
+
+    results = await asyncio.gather(service.generate_goal_plan(goal), service.generate_goal_plan(goal))
+
+    assert all(result["error"].startswith("Error procesando respuesta") for result in results)
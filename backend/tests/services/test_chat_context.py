@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from app.schemas.ai import ChatMessage, MessageRole
+from app.services.ai import chat_context
+from app.services.ai.chat_context import TOKENS_PER_MESSAGE, TOKENS_PER_REPLY, TokenCounter, build_chat_context
+
+
+class WordCounter(TokenCounter):
+    def __init__(self):
+        super().__init__("test")
+
+    def count(self, text):
+        return len(text.split())
+
+
+def message(role, content):
+    return ChatMessage(role=role, content=content)
+
+
+def test_packs_most_recent_history_within_budget():
+    history = [
+        message(MessageRole.USER, "uno dos tres cuatro"),
+        message(MessageRole.ASSISTANT, "cinco seis"),
+        message(MessageRole.USER, "siete"),
+    ]
+    current = message(MessageRole.USER, "pregunta actual")
+    # sistema (2 palabras) + actual (2) + los dos mensajes más recientes (2 + 1)
+    budget = TOKENS_PER_REPLY + 4 * TOKENS_PER_MESSAGE + 2 + 2 + 2 + 1
+
+    context = build_chat_context("eres asistente", history, current, budget, counter=WordCounter())
+
+    assert [m.content for m in context] == ["eres asistente", "cinco seis", "siete", "pregunta actual"]
+    assert context[0].role == MessageRole.SYSTEM
+
+
+def test_system_and_current_message_are_always_sent():
+    context = build_chat_context(
+        "eres asistente", [message(MessageRole.USER, "antiguo")], message(MessageRole.USER, "hola"), 1,
+        counter=WordCounter()
+    )
+
+    assert [m.content for m in context] == ["eres asistente", "hola"]
+
+
+def test_counter_estimates_when_encoding_is_unavailable(monkeypatch):
+    def unavailable(name):
+        raise OSError("sin red")
+
+    monkeypatch.setattr(chat_context, "tiktoken", SimpleNamespace(get_encoding=unavailable))
+    counter = TokenCounter("cl100k_base")
+
+    assert counter.count("a" * 10) == 3
+    assert counter.count_message(message(MessageRole.USER, "abcd")) == TOKENS_PER_MESSAGE + 1
@@ -0,0 +1,132 @@
+from datetime import date
+import pytest
+from postgrest import SyncPostgrestClient
+
+from app.core.resource_versions import resource_versions
+from app.services import finance_summary
+from app.services.finance_summary import build_summary, group_transactions
+
+
+def test_summary_from_raw_transactions():
+    rows = [
+        {"date": "2023-12-20", "type": "income", "category": "Sueldo", "amount": 1000},
+        {"date": "2024-01-05", "type": "expense", "category": "Comida", "amount": 120.5},
+        {"date": "2024-01-15", "type": "expense", "category": "Comida", "amount": 79.5},
+        {"date": "2024-01-31", "type": "income", "category": "Sueldo", "amount": 1500},
+        {"date": "2024-03-02", "type": "expense", "category": "Ocio", "amount": 50},
+        {"date": "2024-04-01", "type": "expense", "category": "Ocio", "amount": 999},
+    ]
+    from_date, to_date = date(2024, 1, 1), date(2024, 3, 31)
+
+    opening_balance, groups = group_transactions(rows, from_date, to_date)
+    summary = build_summary(opening_balance, groups, from_date, to_date)
+
+    assert summary.opening_balance == 1000
+    assert (summary.income, summary.expense) == (1500, 250)
+    assert summary.closing_balance == 2250
+    assert [(m.month, m.income, m.expense, m.balance) for m in summary.months] == [
+        ("2024-01", 1500, 200, 2300),
+        ("2024-02", 0, 0, 2300),
+        ("2024-03", 0, 50, 2250),
+    ]
+    assert [(c.category, c.type.value, c.total, c.count) for c in summary.categories] == [
+        ("Comida", "expense", 200, 2),
+        ("Ocio", "expense", 50, 1),
+        ("Sueldo", "income", 1500, 1),
+    ]
+
+
+def test_sql_groups_produce_same_summary():
+    groups = [
+        {"month": "2024-01", "category": "Comida", "type": "expense", "total": 200, "count": 2},
+        {"month": "2024-01", "category": "Sueldo", "type": "income", "total": 1500, "count": 1},
+    ]
+    summary = build_summary(1000.0, groups, date(2024, 1, 1), date(2024, 1, 31))
+
+    assert [(m.month, m.net, m.balance) for m in summary.months] == [("2024-01", 1300, 2300)]
+
+
+def test_empty_history():
+    opening_balance, groups = group_transactions([], date(2024, 1, 1), date(2024, 2, 1))
+    summary = build_summary(opening_balance, groups, date(2024, 1, 1), date(2024, 2, 1))
+
+    assert summary.closing_balance == 0
+    assert len(summary.months) == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_is_invalidated_by_transaction_writes(monkeypatch):
+    loads = []
+
+    async def fake_grouped(user_id, from_date, to_date):
+        loads.append(user_id)
+        return 0.0, []
+
+    async def fake_stamp(user_id):
+        return stamp
+
+    stamp = (3, "2024-01-10T10:00:00+00:00")
+    monkeypatch.setattr(finance_summary.pg_pool, "pg_pool_available", lambda: False)
+    monkeypatch.setattr(finance_summary, "_grouped_from_postgrest", fake_grouped)
+    monkeypatch.setattr(finance_summary, "fetch_transactions_stamp", fake_stamp)
+    cache = finance_summary.FinanceSummaryCache(maxsize=10, ttl=60)
+    from_date, to_date = date(2024, 1, 1), date(2024, 1, 31)
+
+    await cache.get_or_compute("user-1", from_date, to_date)
+    await cache.get_or_compute("user-1", from_date, to_date)
+    assert len(loads) == 1
+
+    resource_versions.bump("user-1", "transactions")
+    await cache.get_or_compute("user-1", from_date, to_date)
+    assert len(loads) == 2
+
+    # Escritura directa desde el frontend: solo cambia el sello de la tabla
+    stamp = (3, "2024-01-10T11:00:00+00:00")
+    await cache.get_or_compute("user-1", from_date, to_date)
+    assert len(loads) == 3
+
+
+@pytest.mark.asyncio
+async def test_transactions_stamp_from_postgrest(monkeypatch):
+    queries = []
+
+    async def fake_run_query(query):
+        queries.append(query)
+        return type("Response", (), {"data": [{"updated_at": "2024-01-10T10:00:00+00:00"}], "count": 4})()
+
+    monkeypatch.setattr(finance_summary.pg_pool, "pg_pool_available", lambda: False)
+    monkeypatch.setattr(finance_summary, "get_supabase_client", lambda: SyncPostgrestClient("http://localhost"))
+    monkeypatch.setattr(finance_summary, "run_query", fake_run_query)
+
+    stamp = await finance_summary.fetch_transactions_stamp("user-1")
+
+    assert stamp == (4, "2024-01-10T10:00:00+00:00")
+    assert queries[0].params.get_list("order") == ["updated_at.desc.nullslast"]
+    assert queries[0].params["user_id"] == "eq.user-1"
+
+
+@pytest.mark.asyncio
+async def test_postgrest_reads_all_of_to_date_in_stable_pages(monkeypatch):
+    rows = [
+        {"date": "2024-01-31T09:00:00+00:00", "type": "expense", "category": "Comida", "amount": 10},
+        {"date": "2024-01-31T21:30:00+00:00", "type": "expense", "category": "Comida", "amount": 5},
+        {"date": "2024-01-31T23:59:00+00:00", "type": "income", "category": "Sueldo", "amount": 100},
+    ]
+    queries = []
+
+    async def fake_run_query(query):
+        queries.append(query)
+        start, end = map(int, query.headers["Range"].split("-"))
+        return type("Response", (), {"data": rows[start:end + 1]})()
+
+    monkeypatch.setattr(finance_summary, "SUMMARY_PAGE_SIZE", 2)
+    monkeypatch.setattr(finance_summary, "get_supabase_client", lambda: SyncPostgrestClient("http://localhost"))
+    monkeypatch.setattr(finance_summary, "run_query", fake_run_query)
+
+    opening_balance, groups = await finance_summary._grouped_from_postgrest("user-1", date(2024, 1, 1), date(2024, 1, 31))
+    summary = build_summary(opening_balance, groups, date(2024, 1, 1), date(2024, 1, 31))
+
+    assert (summary.income, summary.expense) == (100, 15)
+    assert len(queries) == 2
+    assert queries[0].params["date"] == "lt.2024-02-01"
+    assert queries[0].params.get_list("order") == ["date.asc,id.asc"]
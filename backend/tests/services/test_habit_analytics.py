@@ -0,0 +1,38 @@
+from datetime import date, timedelta
+
+from app.services.habit_analytics import HabitCompletionEngine
+
+TODAY = date(2024, 3, 31)
+
+
+def day(days_ago):
+    return (TODAY - timedelta(days=days_ago)).isoformat()
+
+
+def make_engine():
+    logs = [
+        {"habit_id": "a", "completed_date": day(0)},
+        {"habit_id": "a", "completed_date": day(29)},
+        {"habit_id": "a", "completed_date": day(30)},
+        {"habit_id": "b", "completed_date": day(0)},
+        {"habit_id": "b", "completed_date": day(364)},
+        {"habit_id": "b", "completed_date": day(400)},
+        {"habit_id": "unknown", "completed_date": day(0)},
+    ]
+    return HabitCompletionEngine(["a", "b", "c"], logs, TODAY)
+
+
+def test_habit_day_counts_sorted_by_date_then_habit():
+    engine = make_engine()
+    habit_idx, days_ago, counts = engine.habit_day_counts()
+
+    assert engine.dates(days_ago) == [day(400), day(364), day(30), day(29), day(0), day(0)]
+    assert habit_idx.tolist() == [1, 1, 0, 0, 0, 1]
+    assert counts.tolist() == [1] * 6
+
+
+def test_empty_logs():
+    engine = HabitCompletionEngine([], [], TODAY)
+    habit_idx, days_ago, counts = engine.habit_day_counts()
+
+    assert (habit_idx.tolist(), days_ago.tolist(), counts.tolist()) == ([], [], [])
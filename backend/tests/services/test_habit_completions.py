@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+import pytest
+from postgrest import SyncPostgrestClient
+
+from app.services import habit_completions
+from app.services.habit_completions import BYTES_PER_YEAR, HabitCompletions
+
+TODAY = date(2024, 1, 2)
+
+
+def days_before(*offsets):
+    return [TODAY - timedelta(days=offset) for offset in offsets]
+
+
+def test_streaks_cross_year_boundaries():
+    completions = HabitCompletions.from_dates(days_before(0, 1, 2, 3, 10, 11))
+
+    assert completions.current_streak(TODAY) == 4
+    assert completions.current_streak(TODAY + timedelta(days=1)) == 4
+    assert completions.current_streak(TODAY + timedelta(days=2)) == 0
+    assert completions.best_streak() == 4
+    assert len(completions) == 6
+
+
+def test_counts_rates_and_heatmap():
+    completions = HabitCompletions.from_dates(["2023-12-31", "2024-01-01", "2024-02-29"])
+
+    assert completions.count(date(2023, 12, 1), date(2024, 1, 31)) == 2
+    assert completions.rate(date(2024, 1, 1), days=2) == 100
+    heatmap = completions.heatmap(2024)
+    assert len(heatmap) == 366
+    assert heatmap[0] == 1 and heatmap[59] == 1 and sum(heatmap) == 2
+    assert completions.dates() == [date(2023, 12, 31), date(2024, 1, 1), date(2024, 2, 29)]
+
+
+def test_round_trip_through_compact_bytes():
+    completions = HabitCompletions.from_dates(["2023-12-31", "2024-12-31"])
+    stored = completions.to_bytes()
+
+    assert {year: len(data) for year, data in stored.items()} == {2023: BYTES_PER_YEAR, 2024: BYTES_PER_YEAR}
+    assert HabitCompletions.from_bytes(stored).dates() == completions.dates()
+
+
+def test_add_and_remove_report_changes():
+    completions = HabitCompletions.from_dates(["2024-01-01"])
+
+    assert completions.add("2024-01-02")
+    assert not completions.add("2024-01-02")
+    assert completions.remove("2024-01-01")
+    assert not completions.remove("2024-01-01")
+    assert completions.dates() == [date(2024, 1, 2)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_user_logs_pages_by_date_and_id(monkeypatch):
+    logs = [{"habit_id": f"habit-{i}", "completed_date": "2024-01-01"} for i in range(5)]
+    queries = []
+
+    async def fake_run_query(query):
+        queries.append(query)
+        start, end = map(int, query.headers["Range"].split("-"))
+        return type("Response", (), {"data": logs[start:end + 1]})()
+
+    monkeypatch.setattr(habit_completions, "LOGS_PAGE_SIZE", 2)
+    monkeypatch.setattr(habit_completions, "get_service_client", lambda: SyncPostgrestClient("http://localhost"))
+    monkeypatch.setattr(habit_completions, "run_query", fake_run_query)
+
+    assert await habit_completions.fetch_user_logs("user-1") == logs
+    assert [query.headers["Range"] for query in queries] == ["0-1", "2-3", "4-5"]
+    assert queries[0].params.get_list("order") == ["completed_date.asc,id.asc"]
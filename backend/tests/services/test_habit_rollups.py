@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from app.services.habit_rollups import HabitRollup, HabitRollupStore, build_user_rollup
+
+TODAY = date(2024, 3, 31).toordinal()
+
+
+def test_streaks_merge_runs_in_any_order():
+    rollup = HabitRollup()
+    for day in (TODAY, TODAY - 2, TODAY - 10, TODAY - 1, TODAY - 3, TODAY):
+        rollup.add(day)
+
+    assert rollup.total == 6
+    assert rollup.daily[TODAY] == 2
+    assert rollup.current_streak(TODAY) == 4
+    assert rollup.current_streak(TODAY + 1) == 4
+    assert rollup.current_streak(TODAY + 2) == 0
+    assert rollup.best_streak == 4
+    assert rollup.window_count(TODAY, 3) == 4
+
+
+def test_build_from_raw_logs():
+    today = date.fromordinal(TODAY)
+    logs = [
+        {"habit_id": "a", "completed_date": (today - timedelta(days=i)).isoformat()}
+        for i in (0, 1, 2, 5)
+    ] + [{"habit_id": "b", "completed_date": today.isoformat()}]
+
+    rollup = build_user_rollup(logs, today)
+
+    assert rollup.habit("a").current_streak(TODAY) == 3
+    assert rollup.habit("a").total == 4
+    assert rollup.habit("b").best_streak == 1
+    assert rollup.daily_count(TODAY) == 2
+    assert rollup.habit("missing").total == 0
+
+
+def test_record_log_updates_loaded_rollups_only():
+    store = HabitRollupStore(maxsize=10, ttl=60)
+    store.record_log("user-1", "a", "2024-03-31")
+    assert store.get("user-1") is None
+
+    store._rollups.set("user-1", build_user_rollup([]))
+    store.record_log("user-1", "a", "2024-03-31")
+    assert store.get("user-1").habit("a").current_streak(TODAY) == 1
+
+    store.invalidate("user-1")
+    assert store.get("user-1") is None
@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+import pytest
+
+from app.services import insights
+
+
+class FakeQuery:
+    def __init__(self, table):
+        self.table = table
+        self.calls = []
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return method
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    state = {"queries": [], "in_flight": 0, "max_in_flight": 0}
+
+    async def fake_run_query(query):
+        state["queries"].append(query)
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        if query.table == "tasks":
+            return SimpleNamespace(data=[{"id": "t1"}], count=7)
+        if query.table == "rpc:sum_transaction_amounts":
+            return SimpleNamespace(data=[{"total": 12.5, "count": 2}], count=None)
+        raise RuntimeError("habits caído")
+
+    def rpc(name, params):
+        query = FakeQuery(f"rpc:{name}")
+        query.params = params
+        return query
+
+    client = SimpleNamespace(table=FakeQuery, rpc=rpc)
+    monkeypatch.setattr(insights, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(insights, "run_query", fake_run_query)
+    monkeypatch.setattr(insights.pg_pool, "pg_pool_available", lambda: False)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_overview_runs_queries_concurrently(fake_db):
+    metrics = await insights.overview_metrics("user-1")
+
+    assert fake_db["max_in_flight"] == 3
+    assert metrics["completed_tasks"] == 7
+    assert metrics["expenses"] == {"total": 12.5, "count": 2}
+    # Una métrica que falla no tumba las demás
+    assert metrics["habits"] is None
+
+
+@pytest.mark.asyncio
+async def test_counts_do_not_materialize_rows(fake_db):
+    await insights.count_rows("tasks", user_id="user-1", status="completed")
+
+    calls = fake_db["queries"][0].calls
+    assert ("select", ("id",), {"count": "exact"}) in calls
+    assert ("limit", (1,), {}) in calls
+
+
+@pytest.mark.asyncio
+async def test_sums_run_in_sql_without_the_pool(fake_db):
+    total = await insights.sum_amount(
+        "transactions", "user-1", start=date(2024, 5, 1), end=date(2024, 6, 1), type="expense", category="ocio"
+    )
+
+    assert total == {"total": 12.5, "count": 2}
+    assert fake_db["queries"][0].params == {
+        "p_user_id": "user-1", "p_type": "expense", "p_category": "ocio",
+        "p_start": "2024-05-01", "p_end": "2024-06-01",
+    }
+    with pytest.raises(ValueError):
+        await insights.sum_amount("transactions", "user-1", payment_method="card")
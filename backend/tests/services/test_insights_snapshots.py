@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from app.services import insights_snapshots as module
+from app.services.insights_snapshots import InsightsScheduler, InsightsSnapshots
+
+
+@pytest.fixture
+def snapshots(monkeypatch):
+    state = {"stored": {}, "computed": [], "snapshot": None}
+    snapshots = InsightsSnapshots(max_age=3600, stale_age=86400)
+
+    async def fake_load(user_id):
+        return state["snapshot"]
+
+    async def fake_store(user_id, insights):
+        state["stored"][user_id] = insights
+
+    async def fake_compute(user_id):
+        state["computed"].append(user_id)
+        await asyncio.sleep(0.01)
+        return [{"id": "new"}]
+
+    monkeypatch.setattr(snapshots, "load", fake_load)
+    monkeypatch.setattr(snapshots, "store", fake_store)
+    monkeypatch.setattr(module, "compute_overview_insights", fake_compute)
+    return snapshots, state
+
+
+def snapshot(age_seconds):
+    return [{"id": "old"}], datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+
+
+@pytest.mark.asyncio
+async def test_fresh_snapshot_is_served_without_recomputing(snapshots):
+    snapshots, state = snapshots
+    state["snapshot"] = snapshot(60)
+
+    assert await snapshots.get_or_refresh("u1") == [{"id": "old"}]
+    assert state["computed"] == []
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshot_is_served_and_revalidated(snapshots):
+    snapshots, state = snapshots
+    state["snapshot"] = snapshot(7200)
+
+    assert await snapshots.get_or_refresh("u1") == [{"id": "old"}]
+    await asyncio.gather(*snapshots._background)
+    assert state["stored"]["u1"] == [{"id": "new"}]
+
+
+@pytest.mark.asyncio
+async def test_missing_or_expired_snapshot_is_computed_once(snapshots):
+    snapshots, state = snapshots
+    state["snapshot"] = snapshot(2 * 86400)
+
+    results = await asyncio.gather(snapshots.get_or_refresh("u1"), snapshots.get_or_refresh("u1"))
+
+    assert results == [[{"id": "new"}], [{"id": "new"}]]
+    assert state["computed"] == ["u1"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_refreshes_active_users_with_bounded_concurrency(monkeypatch):
+    in_flight = {"now": 0, "max": 0}
+
+    class FakeSnapshots:
+        async def refresh(self, user_id):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            if user_id == "u3":
+                raise RuntimeError("fallo")
+
+    async def fake_active_users(since):
+        return [f"u{i}" for i in range(10)]
+
+    monkeypatch.setattr(module, "fetch_active_user_ids", fake_active_users)
+    result = await InsightsScheduler(FakeSnapshots(), batch_size=4, concurrency=2).run_once()
+
+    assert (result["users"], result["failed"]) == (10, 1)
+    assert in_flight["max"] == 2
+
+
+def test_seconds_until_next_off_peak_run():
+    now = datetime(2024, 1, 1, 5, 30, tzinfo=timezone.utc)
+
+    assert InsightsScheduler.seconds_until(4, now) == 22.5 * 3600
+    assert InsightsScheduler.seconds_until(6, now) == 1800
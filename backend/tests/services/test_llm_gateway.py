@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+import pytest
+
+from app.api.v1.ai.workout_recommendations import OpenRouterClient
+from app.services.ai.ai_service import AIService
+from app.services.ai.llm_gateway import LLMGateway
+
+
+@pytest.fixture
+def gateway():
+    gateway = LLMGateway()
+    gateway.api_key, gateway.api_key_source = "test-key", "test"
+    return gateway
+
+
+def test_client_is_created_once_and_reused(gateway):
+    first = gateway.client
+
+    assert gateway.client is first
+    assert first.api_key == "test-key"
+
+
+@pytest.mark.asyncio
+async def test_services_share_the_gateway_client(gateway):
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[])
+
+    gateway._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    service = AIService()
+    service.gateway = gateway
+
+    await service._send_request([{"role": "user", "content": "hola"}])
+    await OpenRouterClient(gateway)._send_request([{"role": "user", "content": "hola"}])
+
+    assert len(calls) == 2
+    assert all(call["timeout"] == gateway.timeout for call in calls)
+    assert calls[0]["extra_headers"] == {"X-Title": "SoulDream AI Assistant"}
+    assert calls[1]["model"] == "mistralai/mistral-7b-instruct"
+    assert calls[1]["extra_body"]["provider"]["allow_fallbacks"] is True
+
+
+def test_missing_api_key_is_reported(gateway):
+    gateway.api_key = None
+
+    assert gateway.check_api_key_status() == (False, "API key no configurada")
+    with pytest.raises(ValueError):
+        gateway.client
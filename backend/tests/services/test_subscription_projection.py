@@ -0,0 +1,83 @@
+from datetime import date
+import pytest
+
+from app.core.resource_versions import resource_versions
+from app.services import subscription_projection
+from app.services.subscription_projection import SubscriptionProjectionCache, project_charges
+
+
+def subscription(id, cycle, next_billing_date, amount=10.0, currency="USD", auto_renewal=True):
+    return {
+        "id": id, "name": id, "amount": amount, "currency": currency, "billing_cycle": cycle,
+        "category": "ocio", "auto_renewal": auto_renewal, "next_billing_date": next_billing_date,
+    }
+
+
+def test_monthly_charges_keep_day_of_month():
+    projection = project_charges([subscription("s1", "monthly", "2024-01-31T10:00:00+00:00")], date(2024, 2, 1), 4)
+
+    assert [str(charge.date) for charge in projection.charges] == ["2024-02-29", "2024-03-31", "2024-04-30", "2024-05-31"]
+    assert projection.to_date == date(2024, 5, 31)
+
+
+def test_mixed_cycles_and_monthly_totals():
+    projection = project_charges(
+        [
+            subscription("yearly", "annual", "2023-03-10", amount=120),
+            subscription("quarterly", "quarterly", "2024-01-15", amount=30),
+            subscription("weekly", "weekly", "2024-01-01", amount=5, currency="CLP"),
+            subscription("once", "monthly", "2024-02-20", auto_renewal=False),
+            subscription("past", "monthly", "2024-01-20", auto_renewal=False),
+        ],
+        date(2024, 2, 15),
+        3,
+    )
+
+    by_subscription = {}
+    for charge in projection.charges:
+        by_subscription.setdefault(charge.subscription_id, []).append(str(charge.date))
+
+    assert by_subscription["yearly"] == ["2024-03-10"]
+    assert by_subscription["quarterly"] == ["2024-04-15"]
+    assert by_subscription["once"] == ["2024-02-20"]
+    assert "past" not in by_subscription
+    assert by_subscription["weekly"][0] == "2024-02-19" and len(by_subscription["weekly"]) == 13
+    assert [str(charge.date) for charge in projection.charges] == sorted(str(charge.date) for charge in projection.charges)
+
+    totals = {(total.month, total.currency): total.total for total in projection.monthly_totals}
+    assert totals[("2024-03", "USD")] == 120
+    assert totals[("2024-04", "USD")] == 30
+
+
+@pytest.mark.asyncio
+async def test_projection_cache_is_invalidated_by_subscription_changes(monkeypatch):
+    loads = []
+
+    async def fake_fetch(user_id):
+        loads.append(user_id)
+        return [subscription("s1", "monthly", "2024-03-01")]
+
+    stamp = [1, "2024-01-15T10:00:00+00:00"]
+
+    async def fake_stamp(user_id):
+        return tuple(stamp)
+
+    monkeypatch.setattr(subscription_projection, "fetch_active_subscriptions", fake_fetch)
+    monkeypatch.setattr(subscription_projection, "fetch_subscriptions_stamp", fake_stamp)
+    cache = SubscriptionProjectionCache(maxsize=10, ttl=60)
+
+    first = await cache.get_or_compute("user-1", 12, today=date(2024, 2, 1))
+    await cache.get_or_compute("user-1", 12, today=date(2024, 2, 1))
+    assert len(loads) == 1
+    assert len(first.charges) == 11
+
+    resource_versions.bump("user-1", "subscriptions")
+    await cache.get_or_compute("user-1", 12, today=date(2024, 2, 1))
+    assert len(loads) == 2
+
+    # Escrituras directas del frontend: solo cambian updated_at o el número de activas
+    stamp[1] = "2024-02-01T09:00:00+00:00"
+    await cache.get_or_compute("user-1", 12, today=date(2024, 2, 1))
+    stamp[0] = 0
+    await cache.get_or_compute("user-1", 12, today=date(2024, 2, 1))
+    assert len(loads) == 4
@@ -0,0 +1,141 @@
+import io
+import httpx
+import pytest
+
+from app.schemas.finance import ImportFormat
+from app.services import transaction_import
+from app.services.transaction_import import TransactionImporter, iter_ofx_rows, parse_amount
+
+
+class FakeQuery:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.inserted = None
+        self.params = httpx.QueryParams()
+
+    def select(self, columns="*"):
+        return self
+
+    def eq(self, field, value):
+        return FakeQuery(self.client, [row for row in self.rows if row.get(field) == value])
+
+    def gte(self, field, value):
+        return FakeQuery(self.client, [row for row in self.rows if row[field] >= value])
+
+    def lt(self, field, value):
+        return FakeQuery(self.client, [row for row in self.rows if row[field] < value])
+
+    def range(self, start, end):
+        # En postgrest-py el final es exclusivo
+        assert self.params["order"] == "date.asc,id.asc"
+        return FakeQuery(self.client, sorted(self.rows, key=lambda row: (row["date"], row["id"]))[start:end])
+
+    def insert(self, rows):
+        query = FakeQuery(self.client, rows)
+        query.inserted = rows
+        return query
+
+    def execute(self):
+        if self.inserted is not None:
+            self.client.inserts.append(len(self.inserted))
+            self.client.transactions.extend(self.inserted)
+        else:
+            self.client.selects += 1
+        return type("Response", (), {"data": self.rows})()
+
+
+class FakeSupabase:
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.inserts = []
+        self.selects = 0
+
+    def table(self, name):
+        return FakeQuery(self, self.transactions)
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch):
+    def install(transactions):
+        client = FakeSupabase(transactions)
+        monkeypatch.setattr(transaction_import, "get_supabase_client", lambda: client)
+        return client
+    return install
+
+
+def test_parse_amount_formats():
+    assert parse_amount("1.234,56") == parse_amount("1,234.56") == parse_amount("$ 1234.56")
+    assert parse_amount("-12,5") < 0
+
+
+@pytest.mark.asyncio
+async def test_csv_import_dedupes_and_reports(fake_supabase):
+    client = fake_supabase([
+        {"id": "tx-1", "user_id": "user-1", "is_deleted": False, "date": "2024-03-01T09:30:00+00:00",
+         "amount": 12.5, "description": "Supermercado"},
+    ])
+    csv_file = io.BytesIO(
+        "Fecha;Concepto;Importe\n"
+        "01/03/2024;Supermercado;-12,50\n"
+        "02/03/2024;Nómina;1.500,00\n"
+        "02/03/2024;  nómina ;1500\n"
+        "no-es-fecha;Cine;-8\n"
+        "03/03/2024;Cine;-8\n".encode()
+    )
+
+    report = await TransactionImporter("user-1", chunk_size=2).run(ImportFormat.csv, csv_file)
+
+    assert (report.total_rows, report.imported, report.duplicates, report.rejected) == (5, 2, 2, 1)
+    assert [chunk.rows for chunk in report.chunks] == [2, 2, 1]
+    assert report.errors[0].row == 5
+    assert client.inserts == [1, 1]
+    imported = {row["description"]: row for row in client.transactions[1:]}
+    assert client.selects == 3
+    assert imported["Nómina"]["type"] == "income" and imported["Nómina"]["amount"] == 1500.0
+    assert imported["Cine"]["type"] == "expense" and imported["Cine"]["amount"] == 8.0
+
+
+@pytest.mark.asyncio
+async def test_existing_transactions_are_read_in_pages(fake_supabase, monkeypatch):
+    monkeypatch.setattr(transaction_import, "EXISTING_PAGE_SIZE", 2)
+    client = fake_supabase([
+        {"id": f"tx-{i}", "user_id": "user-1", "is_deleted": False, "date": f"2024-03-0{day}T{10 + i}:00:00+00:00",
+         "amount": 5.0, "description": f"Compra {i}"}
+        for i, day in enumerate([1, 1, 2, 3, 3])
+    ])
+    csv_file = io.BytesIO(
+        "Fecha;Concepto;Importe\n"
+        "01/03/2024;Compra 0;-5\n"
+        "03/03/2024;Compra 4;-5\n"
+        "03/03/2024;Compra 9;-5\n".encode()
+    )
+
+    report = await TransactionImporter("user-1").run(ImportFormat.csv, csv_file)
+
+    assert (report.imported, report.duplicates) == (1, 2)
+    assert client.selects == 3
+
+
+@pytest.mark.asyncio
+async def test_csv_without_required_columns_is_rejected(fake_supabase):
+    fake_supabase([])
+    with pytest.raises(ValueError):
+        await TransactionImporter("user-1").run(ImportFormat.csv, io.BytesIO(b"foo,bar\n1,2\n"))
+
+
+def test_ofx_rows():
+    ofx = io.BytesIO(
+        b"OFXHEADER:100\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+        b"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240105120000[-3:CLT]<TRNAMT>-25.00<NAME>Farmacia\n"
+        b"</STMTTRN>\n"
+        b"<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20240106\n<TRNAMT>100.00\n<MEMO>Transferencia\n</STMTTRN>\n"
+        b"</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+    )
+
+    rows = [row for _, row in iter_ofx_rows(ofx)]
+
+    assert rows == [
+        {"date": "20240105120000[-3:CLT]", "amount": "-25.00", "description": "Farmacia"},
+        {"date": "20240106", "amount": "100.00", "description": "Transferencia"},
+    ]
@@ -0,0 +1,43 @@
+import random
+import pytest
+
+from app.utils.fractional_index import append_key, key_between, keys_between, validate_key
+
+
+def test_random_inserts_stay_sorted_and_short():
+    random.seed(7)
+    keys = [key_between(None, None)]
+    for _ in range(1000):
+        i = random.randint(0, len(keys))
+        keys.insert(i, key_between(keys[i - 1] if i > 0 else None, keys[i] if i < len(keys) else None))
+
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    assert max(len(key) for key in keys) < 10
+
+
+def test_appending_grows_integer_part():
+    key = None
+    for _ in range(5000):
+        key = key_between(key, None)
+    assert len(key) <= 4
+
+
+def test_keys_between_are_ordered():
+    keys = keys_between("a0", "a1", 10)
+    assert keys == sorted(keys)
+    assert "a0" < keys[0] and keys[-1] < "a1"
+
+
+def test_append_key_sorts_after_backfilled_keys():
+    key = append_key()
+    validate_key(key)
+    assert key > "f999999"
+    assert "f000001" < key_between("f000001", key) < key
+
+
+def test_invalid_positions():
+    with pytest.raises(ValueError):
+        key_between("a1", "a0")
+    with pytest.raises(ValueError):
+        key_between("a10", None)
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException, Response
+from postgrest import SyncPostgrestClient
+
+from app.core.config import settings
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER, apply_keyset, decode_cursor, encode_cursor, finish_page, keyset_sql, page_limit
+)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["2024-05-01T10:00:00.123+00:00", "id-1"])
+    assert decode_cursor(cursor) == ("2024-05-01T10:00:00.123+00:00", "id-1")
+
+
+@pytest.mark.parametrize("cursor", ["no-es-base64!", encode_cursor(["solo-uno"]), encode_cursor([None, "id"])])
+def test_invalid_cursor_is_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_page_limit(monkeypatch):
+    monkeypatch.setattr(settings, "PAGINATION_LEGACY_UNPAGED", True)
+    assert page_limit(None, None) is None
+    assert page_limit(10, None) == 10
+    assert page_limit(None, "cursor") == settings.PAGINATION_DEFAULT_LIMIT
+    assert page_limit(10_000, None) == settings.PAGINATION_MAX_LIMIT
+
+    monkeypatch.setattr(settings, "PAGINATION_LEGACY_UNPAGED", False)
+    assert page_limit(None, None) == settings.PAGINATION_DEFAULT_LIMIT
+
+
+def test_apply_keyset_builds_postgrest_filter():
+    query = SyncPostgrestClient("http://localhost").table("transactions").select("*")
+    cursor = encode_cursor(["2024-05-01", "id-1"])
+
+    query = apply_keyset(query, "date", True, cursor, 20)
+
+    assert query.params["or"] == '(date.lt."2024-05-01",and(date.eq."2024-05-01",id.lt."id-1"))'
+    assert query.params["order"] == "date.desc,id.desc"
+    assert query.params["limit"] == "21"
+
+
+def test_keyset_sql():
+    assert keyset_sql("date", True, 3, "date") == \
+        "($3::text IS NULL OR (date, id) < ($3::text::date, $4::text::uuid))"
+
+
+def test_finish_page_sets_next_cursor():
+    rows = [{"id": f"id-{i}", "sort_key": f"a{i}"} for i in range(4)]
+    response = Response()
+
+    page = finish_page(rows, "sort_key", 3, response)
+
+    assert [row["id"] for row in page] == ["id-0", "id-1", "id-2"]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == ("a2", "id-2")
+
+    last_page = Response()
+    assert finish_page(rows[:2], "sort_key", 3, last_page) == rows[:2]
+    assert NEXT_CURSOR_HEADER not in last_page.headers
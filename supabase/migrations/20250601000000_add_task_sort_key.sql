@@ -0,0 +1,38 @@
+-- Orden fraccional de tareas (app/utils/fractional_index.py): insertar o mover
+-- una tarea solo escribe su fila. Las claves se comparan byte a byte (COLLATE "C").
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS sort_key TEXT COLLATE "C";
+
+-- Claves iniciales a partir de column_order: 'f' + 6 dígitos es una parte entera
+-- válida y anterior a las claves que genera append_key()
+WITH ordered AS (
+  SELECT
+    id,
+    ROW_NUMBER() OVER (
+      PARTITION BY user_id, status
+      ORDER BY column_order NULLS LAST, created_at
+    ) AS position
+  FROM tasks
+  WHERE sort_key IS NULL
+)
+UPDATE tasks
+SET sort_key = 'f' || LPAD(ordered.position::TEXT, 6, '0')
+FROM ordered
+WHERE tasks.id = ordered.id;
+
+CREATE INDEX IF NOT EXISTS tasks_user_status_sort_key_idx ON tasks(user_id, status, sort_key);
+
+-- Aplica en una sola sentencia los movimientos de una sesión de arrastre:
+-- p_moves = [{"id": "...", "status": "...", "sort_key": "..."}, ...]
+CREATE OR REPLACE FUNCTION reorder_tasks(p_user_id UUID, p_moves JSONB)
+RETURNS SETOF tasks AS $$
+  UPDATE tasks
+  SET
+    sort_key = moves.sort_key,
+    status = COALESCE(moves.status, tasks.status),
+    updated_at = NOW()
+  FROM jsonb_to_recordset(p_moves) AS moves(id UUID, status TEXT, sort_key TEXT)
+  WHERE tasks.id = moves.id
+    AND tasks.user_id = p_user_id
+    AND tasks.is_deleted = FALSE
+  RETURNING tasks.*;
+$$ LANGUAGE sql;
@@ -0,0 +1,19 @@
+-- Índices para la paginación por cursor (backend/app/utils/pagination.py):
+-- cada listado se recorre en el orden (clave, id) del propio índice.
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+  ON transactions(user_id, date DESC, id DESC) WHERE is_deleted = false;
+
+CREATE INDEX IF NOT EXISTS tasks_user_sort_key_id_idx
+  ON tasks(user_id, sort_key, id) WHERE is_deleted = false;
+
+CREATE INDEX IF NOT EXISTS habit_logs_habit_date_id_idx
+  ON habit_logs(habit_id, completed_date DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created_id
+  ON messages(conversation_id, created_at, id);
+
+-- El cursor no admite claves nulas: las tareas insertadas sin sort_key van al
+-- final de las backfilleadas ('f999999' < claves de append_key())
+UPDATE tasks SET sort_key = 'f999999' WHERE sort_key IS NULL;
+ALTER TABLE tasks ALTER COLUMN sort_key SET DEFAULT 'f999999';
+ALTER TABLE tasks ALTER COLUMN sort_key SET NOT NULL;
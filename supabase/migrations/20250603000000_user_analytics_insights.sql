@@ -0,0 +1,13 @@
+-- Instantáneas de insights precalculadas (backend/app/services/insights_snapshots.py):
+-- una por usuario y día en la fila de user_analytics de ese día.
+ALTER TABLE user_analytics ADD COLUMN IF NOT EXISTS insights JSONB;
+ALTER TABLE user_analytics ADD COLUMN IF NOT EXISTS insights_computed_at TIMESTAMP WITH TIME ZONE;
+
+-- Lectura de la última instantánea del usuario
+CREATE INDEX IF NOT EXISTS idx_user_analytics_user_insights
+  ON user_analytics(user_id, date DESC) WHERE insights IS NOT NULL;
+
+-- Usuarios activos para el refresco diario
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_updated_at ON transactions(updated_at);
+CREATE INDEX IF NOT EXISTS idx_habits_updated_at ON habits(updated_at);
@@ -0,0 +1,14 @@
+-- Un log por hábito y día: la ingesta por lotes y create_habit_log insertan con
+-- ON CONFLICT (habit_id, completed_date) DO NOTHING, así los reenvíos
+-- concurrentes de un cliente no pueden duplicar logs.
+
+-- Conservar el log más antiguo de cada (habit_id, completed_date) repetido
+DELETE FROM habit_logs duplicate
+USING habit_logs original
+WHERE duplicate.habit_id = original.habit_id
+  AND duplicate.completed_date = original.completed_date
+  AND (COALESCE(duplicate.created_at, 'infinity'), duplicate.id)
+    > (COALESCE(original.created_at, 'infinity'), original.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS habit_logs_habit_id_completed_date_key
+  ON habit_logs(habit_id, completed_date);
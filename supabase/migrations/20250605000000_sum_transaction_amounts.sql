@@ -0,0 +1,20 @@
+-- Suma de importes para los insights (backend/app/services/insights.py) cuando
+-- no hay pool asyncpg: PostgREST no tiene agregados, y leer cada fila para
+-- sumarla en Python además queda cortado por el límite de filas por respuesta.
+-- Los filtros NULL no se aplican; el rango es [p_start, p_end).
+CREATE OR REPLACE FUNCTION sum_transaction_amounts(
+  p_user_id UUID,
+  p_type TEXT DEFAULT NULL,
+  p_category TEXT DEFAULT NULL,
+  p_start DATE DEFAULT NULL,
+  p_end DATE DEFAULT NULL
+)
+RETURNS TABLE(total NUMERIC, count BIGINT) AS $$
+  SELECT COALESCE(SUM(amount), 0), COUNT(*)
+  FROM transactions
+  WHERE user_id = p_user_id
+    AND (p_type IS NULL OR type = p_type)
+    AND (p_category IS NULL OR category = p_category)
+    AND (p_start IS NULL OR date >= p_start)
+    AND (p_end IS NULL OR date < p_end);
+$$ LANGUAGE sql STABLE;
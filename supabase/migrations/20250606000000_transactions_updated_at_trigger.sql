@@ -0,0 +1,17 @@
+-- Mantener transactions.updated_at al día en cualquier UPDATE.
+-- El frontend actualiza transacciones directamente contra Supabase sin tocar
+-- updated_at, y la caché del resumen financiero usa MAX(updated_at) como sello.
+CREATE OR REPLACE FUNCTION update_transactions_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_transactions_timestamp ON transactions;
+
+CREATE TRIGGER update_transactions_timestamp
+  BEFORE UPDATE ON transactions
+  FOR EACH ROW
+  EXECUTE FUNCTION update_transactions_updated_at();